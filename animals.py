@@ -1,10 +1,61 @@
+import heapq
 import numpy as np
 import math
-import random
+from config import DEFAULT_CONFIG
 from neural_network import NeuralNetwork
+from population import Column, GenderColumn
+from spatial import PLANE, pairs_within, nearest_of_pairs, nearest_within, nearest_unbounded
+
+MATING_RANGE = 30
+
+
+def relative_angles(x, y, direction, target_x, target_y, targets, space=PLANE):
+    # Bearing of each animal's target (an index, -1 for none) relative to its
+    # heading, 0 where it has none
+    angles = np.zeros(len(x))
+    has = targets >= 0
+    target = targets[has]
+    angles[has] = space.angles(x[has], y[has], target_x[target], target_y[target]) - direction[has]
+    return angles
+
+
+def nearest_mates(population):
+    # Each row's mate in this tick's mating index (Population.index_mates),
+    # -1 for none, and the distance to it
+    mates = population.mates
+    x, y = population.with_halo('x'), population.with_halo('y')
+    dist = np.full(len(population), np.inf)
+    has = mates >= 0
+    dist[has] = population.space.distances(x[:len(population)][has], y[:len(population)][has],
+                                           x[mates[has]], y[mates[has]])
+    return mates, dist
 
 class Animal:
-    def __init__(self, x, y, world_width, world_height, gender=None):
+    # State kept in the species' Population while the animal is in a world
+    x = Column()
+    y = Column()
+    direction = Column()
+    speed = Column()
+    energy = Column()
+    age = Column(np.int64)
+    max_age = Column(np.int64)
+    fitness = Column()
+    children = Column(np.int64)
+    gender = GenderColumn()
+    mating_cooldown = Column(np.int64)
+    pregnancy_time = Column(np.int64)
+    is_pregnant = Column(np.bool_)
+    mate_seeking = Column(np.bool_)
+    alive = Column(np.bool_)
+
+    _population = None
+    _row = None
+    ghost = False  # See domains.Ghost
+
+    # rng is the numpy Generator every random draw of this animal (and its
+    # offspring) comes from, normally the World's
+    def __init__(self, x, y, world_width, world_height, gender=None, rng=None):
+        self.rng = rng if rng is not None else np.random.default_rng()
         self.x = x
         self.y = y
         self.world_width = world_width
@@ -13,123 +64,97 @@ class Animal:
         self.age = 0
         self.max_age = 2000  # Longer lifespan
         self.speed = 1.0  # Slower base speed
-        self.direction = random.uniform(0, 2 * math.pi)
+        self.direction = self.rng.uniform(0, 2 * math.pi)
         self.fitness = 0
         self.children = 0
-        self.gender = gender if gender else random.choice(['male', 'female'])
+        self.gender = gender if gender else ('male' if self.rng.random() < 0.5 else 'female')
         self.mating_cooldown = 0
         self.pregnancy_time = 0
         self.is_pregnant = False
         self.mate_seeking = False
         self.last_mate = None
-
-    def update(self, world):
-        self.age += 1
-        self.energy -= 0.2  # Slower energy loss
-
-        # Update breeding-related timers
-        if self.mating_cooldown > 0:
-            self.mating_cooldown -= 1
-        if self.pregnancy_time > 0:
-            self.pregnancy_time -= 1
-            if self.pregnancy_time == 0 and self.is_pregnant:
-                return self.give_birth()
-
-        # Determine if seeking mate
-        self.mate_seeking = (self.can_reproduce() and
-                           self.mating_cooldown == 0 and
-                           not self.is_pregnant)
-
-        # Get sensory input
-        inputs = self.get_inputs(world)
-
-        # Process through neural network
-        outputs = self.brain.forward(inputs)
-
-        # Interpret outputs as actions
-        self.process_outputs(outputs)
-
-        # Update position
-        self.move()
-
-        # Check boundaries
-        self.check_boundaries()
-
-        # Update fitness
-        self.fitness += 0.1 if self.energy > 0 else -1
-
-    def get_inputs(self, world):
-        # Basic sensory inputs (to be overridden by subclasses)
+        self.alive = True
+
+    @classmethod
+    def brood(cls, count, world_width, world_height, genders, rng):
+        # `count` detached animals without brains at random positions, the
+        # same as constructing them one by one: everything the constructor
+        # sets the same way comes from one prototype, its random draws are
+        # made for the whole brood at once
+        prototype = cls(0, 0, world_width, world_height, 'male', rng=np.random.default_rng(0))
+        template = {name: value for name, value in prototype.__dict__.items() if name != 'brain'}
+        template['rng'] = rng
+        xs = rng.uniform(50, world_width - 50, count).tolist()
+        ys = rng.uniform(50, world_height - 50, count).tolist()
+        directions = rng.uniform(0, 2 * math.pi, count).tolist()
+
+        animals = []
+        for x, y, direction, gender in zip(xs, ys, directions, genders):
+            animal = cls.__new__(cls)
+            animal.__dict__.update(template)
+            animal.__dict__.update(x=x, y=y, direction=direction, gender=gender)
+            animals.append(animal)
+        return animals
+
+    # While attached the weights live in the Population's BrainBank and this
+    # returns a view onto them
+    @property
+    def brain(self):
+        if self._population is None:
+            return self.__dict__['brain']
+        return self._population.brains.network(self._row)
+
+    @brain.setter
+    def brain(self, network):
+        if self._population is None:
+            self.__dict__['brain'] = network
+        else:
+            self._population.brains.store(self._row, network)
+
+    def act(self, world):
+        # Called for every animal once its species has moved (hunting etc.)
+        pass
+
+    @classmethod
+    def sense(cls, world, population):
+        # Basic sensory inputs of every row of the species at once, one
+        # array per input (extended by subclasses)
+        direction = population['direction']
         return [
-            self.x / self.world_width,  # Normalized position
-            self.y / self.world_height,
-            self.energy / 100,  # Normalized energy
-            math.cos(self.direction),  # Direction vector
-            math.sin(self.direction)
+            population['x'] / world.width,  # Normalized position
+            population['y'] / world.height,
+            population['energy'] / 100,  # Normalized energy
+            np.cos(direction),  # Direction vector
+            np.sin(direction)
         ]
 
-    def process_outputs(self, outputs):
-        # Interpret neural network outputs as actions
-        # outputs[0]: turn left/right (-1 to 1)
-        # outputs[1]: speed (0 to 1)
-
-        self.direction += (outputs[0] - 0.5) * 0.2  # Gentler turning
-        self.speed = outputs[1] * 2.0  # Slower max speed
-
-    def move(self):
-        dx = math.cos(self.direction) * self.speed
-        dy = math.sin(self.direction) * self.speed
-
-        self.x += dx
-        self.y += dy
-
-    def check_boundaries(self):
-        if self.x < 0:
-            self.x = 0
-            self.direction = math.pi - self.direction
-        elif self.x >= self.world_width:
-            self.x = self.world_width - 1
-            self.direction = math.pi - self.direction
-
-        if self.y < 0:
-            self.y = 0
-            self.direction = -self.direction
-        elif self.y >= self.world_height:
-            self.y = self.world_height - 1
-            self.direction = -self.direction
+    @classmethod
+    def decide(cls, world, population, rows, outputs):
+        # Act on the given rows of this tick's species-wide brain forward
+        # pass, straight on the columns. Sensing and inference run in
+        # World.update_population; ageing, breeding timers, movement,
+        # boundaries and fitness run for the whole species at once (see
+        # Population).
+        # outputs[:, 0]: turn left/right (-1 to 1)
+        # outputs[:, 1]: speed (0 to 1)
+        population['direction'][rows] += (outputs[rows, 0] - 0.5) * 0.2  # Gentler turning
+        population['speed'][rows] = outputs[rows, 1] * 2.0  # Slower max speed
 
     def is_alive(self):
-        return self.energy > 0 and self.age < self.max_age
+        return self.alive and self.energy > 0 and self.age < self.max_age
 
     def can_reproduce(self):
         return (self.energy > 120 and self.age > 200 and
                self.mating_cooldown == 0 and not self.is_pregnant)
 
-    def find_mate(self, potential_mates):
-        if not self.mate_seeking:
-            return None
-
-        best_mate = None
-        best_distance = float('inf')
-
-        for mate in potential_mates:
-            if (mate != self and mate.gender != self.gender and
-                mate.can_reproduce() and mate != self.last_mate):
-                distance = self.distance_to(mate)
-                if distance < 30 and distance < best_distance:  # Mating range
-                    best_mate = mate
-                    best_distance = distance
-
-        return best_mate
-
-    def mate_with(self, partner):
+    def mate_with(self, partner, config=DEFAULT_CONFIG):
         if self.gender == 'female':
             self.is_pregnant = True
-            self.pregnancy_time = 300  # 300 ticks gestation
+            self.pregnancy_time = config.gestation_ticks  # 300 ticks gestation by default
             self.energy -= 30
 
-        self.mating_cooldown = 500  # Cooldown period
-        partner.mating_cooldown = 500
+        self.mating_cooldown = config.mating_cooldown  # Cooldown period
+        partner.mating_cooldown = config.mating_cooldown
         self.last_mate = partner
         partner.last_mate = self
 
@@ -141,276 +166,378 @@ class Animal:
         self.energy -= 40
         return None  # To be overridden by subclasses
 
+    @property
+    def space(self):
+        # Geometry of the animal's world (spatial.Space); detached animals
+        # are on the plane
+        population = self._population
+        return population.space if population is not None else PLANE
+
     def distance_to(self, other):
+        space = self.space
+        if space.wrap:
+            return space.distance(self.x, self.y, other.x, other.y)
         return math.sqrt((self.x - other.x)**2 + (self.y - other.y)**2)
 
+    def angle_to(self, x, y):
+        # Direction from the animal towards the point (x, y)
+        dx, dy = self.space.delta(self.x, self.y, x, y)
+        return math.atan2(dy, dx)
+
 
 class Rabbit(Animal):
-    def __init__(self, x, y, world_width, world_height, gender=None):
-        super().__init__(x, y, world_width, world_height, gender)
-        self.brain = NeuralNetwork(input_size=10, hidden_sizes=[12, 10], output_size=2)
-        self.vision_range = 60
+    vision_range = 60
+
+    def __init__(self, x, y, world_width, world_height, gender=None, rng=None):
+        super().__init__(x, y, world_width, world_height, gender, rng)
+        self.brain = NeuralNetwork(input_size=10, hidden_sizes=[12, 10], output_size=2, rng=self.rng)
         self.reproduction_energy = 50
 
-    def get_inputs(self, world):
-        inputs = super().get_inputs(world)
-
-        # Find nearest food
-        nearest_food_dist = float('inf')
-        nearest_food_angle = 0
-        for food in world.food:
-            dist = self.distance_to(food)
-            if dist < nearest_food_dist:
-                nearest_food_dist = dist
-                angle = math.atan2(food.y - self.y, food.x - self.x)
-                nearest_food_angle = angle - self.direction
-
-        # Find nearest predator (fox)
-        nearest_predator_dist = float('inf')
-        nearest_predator_angle = 0
-        for fox in world.foxes:
-            dist = self.distance_to(fox)
-            if dist < nearest_predator_dist and dist < self.vision_range:
-                nearest_predator_dist = dist
-                angle = math.atan2(fox.y - self.y, fox.x - self.x)
-                nearest_predator_angle = angle - self.direction
-
-        # Find nearest potential mate
-        nearest_mate_dist = float('inf')
-        nearest_mate_angle = 0
-        if self.mate_seeking:
-            mate = self.find_mate(world.rabbits)
-            if mate:
-                nearest_mate_dist = self.distance_to(mate)
-                angle = math.atan2(mate.y - self.y, mate.x - self.x)
-                nearest_mate_angle = angle - self.direction
-
-        inputs.extend([
-            min(nearest_food_dist / self.vision_range, 1.0),
-            math.cos(nearest_food_angle),
-            min(nearest_predator_dist / self.vision_range, 1.0) if nearest_predator_dist < self.vision_range else 0,
-            math.cos(nearest_predator_angle) if nearest_predator_dist < self.vision_range else 0,
-            min(nearest_mate_dist / self.vision_range, 1.0) if self.mate_seeking and nearest_mate_dist < self.vision_range else 0,
+    @classmethod
+    def sense(cls, world, population):
+        x, y, direction = population['x'], population['y'], population['direction']
+        features = super().sense(world, population)
+        vision = cls.vision_range
+
+        # Nearest food
+        food_x, food_y = world.food.targets()
+        food_at, food_dist, checked = nearest_unbounded(x, y, food_x, food_y, vision, world.space)
+        world.food.distance_checks += checked
+
+        # Nearest predator (fox)
+        fox_x, fox_y = world.targets(world.fox_population)
+        fox_at, fox_dist, checked = nearest_within(x, y, fox_x, fox_y, vision, world.space)
+        world.fox_grid.distance_checks += checked
+        seen = fox_at >= 0
+
+        # Nearest potential mate
+        _, mate_dist = nearest_mates(population)
+
+        features.extend([
+            np.minimum(food_dist / vision, 1.0),
+            np.cos(relative_angles(x, y, direction, food_x, food_y, food_at, world.space)),
+            np.where(seen, np.minimum(fox_dist / vision, 1.0), 0),
+            np.where(seen, np.cos(relative_angles(x, y, direction, fox_x, fox_y, fox_at, world.space)), 0),
+            np.where(mate_dist < vision, np.minimum(mate_dist / vision, 1.0), 0),
         ])
-
-        return inputs
+        return features
 
     def give_birth(self):
         if not self.is_pregnant:
             return None
 
         # Create child with genetic combination
-        child = Rabbit(self.x + random.uniform(-15, 15),
-                      self.y + random.uniform(-15, 15),
-                      self.world_width, self.world_height)
+        child = Rabbit(self.x + self.rng.uniform(-15, 15),
+                      self.y + self.rng.uniform(-15, 15),
+                      self.world_width, self.world_height, rng=self.rng)
 
         # Child inherits from mother's brain with mutations
         child.brain = self.brain.copy()
-        child.brain.mutate(mutation_rate=0.1, mutation_strength=0.15)
+        child.brain.mutate(mutation_rate=0.1, mutation_strength=0.15, rng=self.rng)
 
         self.is_pregnant = False
         return child
 
 
 class Fox(Animal):
-    def __init__(self, x, y, world_width, world_height, gender=None):
-        super().__init__(x, y, world_width, world_height, gender)
-        self.brain = NeuralNetwork(input_size=9, hidden_sizes=[12, 10], output_size=2)
-        self.vision_range = 80
-        self.hunt_range = 18
+    kills = Column(np.int64)
+
+    vision_range = 80
+    hunt_range = 18
+
+    def __init__(self, x, y, world_width, world_height, gender=None, rng=None):
+        super().__init__(x, y, world_width, world_height, gender, rng)
+        self.brain = NeuralNetwork(input_size=9, hidden_sizes=[12, 10], output_size=2, rng=self.rng)
         self.reproduction_energy = 80
         self.kills = 0
 
-    def get_inputs(self, world):
-        inputs = super().get_inputs(world)
-
-        # Find nearest rabbit
-        nearest_prey_dist = float('inf')
-        nearest_prey_angle = 0
-        for rabbit in world.rabbits:
-            dist = self.distance_to(rabbit)
-            if dist < nearest_prey_dist and dist < self.vision_range:
-                nearest_prey_dist = dist
-                angle = math.atan2(rabbit.y - self.y, rabbit.x - self.x)
-                nearest_prey_angle = angle - self.direction
-
-        # Find nearest potential mate
-        nearest_mate_dist = float('inf')
-        nearest_mate_angle = 0
-        if self.mate_seeking:
-            mate = self.find_mate(world.foxes)
-            if mate:
-                nearest_mate_dist = self.distance_to(mate)
-                angle = math.atan2(mate.y - self.y, mate.x - self.x)
-                nearest_mate_angle = angle - self.direction
-
-        inputs.extend([
-            min(nearest_prey_dist / self.vision_range, 1.0) if nearest_prey_dist < self.vision_range else 0,
-            math.cos(nearest_prey_angle) if nearest_prey_dist < self.vision_range else 0,
-            min(nearest_mate_dist / self.vision_range, 1.0) if self.mate_seeking and nearest_mate_dist < self.vision_range else 0,
-            math.cos(nearest_mate_angle) if self.mate_seeking and nearest_mate_dist < self.vision_range else 0,
+    @classmethod
+    def sense(cls, world, population):
+        x, y, direction = population['x'], population['y'], population['direction']
+        features = super().sense(world, population)
+        vision = cls.vision_range
+
+        # Nearest rabbit
+        rabbit_x, rabbit_y = world.targets(world.rabbit_population)
+        prey_at, prey_dist, checked = nearest_within(x, y, rabbit_x, rabbit_y, vision, world.space)
+        world.rabbit_grid.distance_checks += checked
+        seen = prey_at >= 0
+
+        # Nearest potential mate
+        mates, mate_dist = nearest_mates(population)
+        near = mate_dist < vision
+
+        features.extend([
+            np.where(seen, np.minimum(prey_dist / vision, 1.0), 0),
+            np.where(seen, np.cos(relative_angles(x, y, direction, rabbit_x, rabbit_y, prey_at, world.space)), 0),
+            np.where(near, np.minimum(mate_dist / vision, 1.0), 0),
+            np.where(near, np.cos(relative_angles(x, y, direction, population.with_halo('x'),
+                                                  population.with_halo('y'), mates, world.space)), 0),
         ])
-
-        return inputs
+        return features
 
     def hunt(self, world):
-        for rabbit in world.rabbits[:]:
+        for rabbit in world.rabbit_grid.candidates(self.x, self.y, self.hunt_range):
             if self.distance_to(rabbit) < self.hunt_range:
-                world.rabbits.remove(rabbit)
-                self.energy += 50
-                self.kills += 1
-                self.fitness += 10
+                if world.kill_rabbit(rabbit, self):
+                    self.feast(world, rabbit)
                 break
 
+    def feast(self, world, rabbit):
+        # The reward for a kill; for a rabbit across a domain border only once
+        # its owner grants the claim
+        self.energy += 50
+        self.kills += 1
+        self.fitness += 10
+
     def give_birth(self):
         if not self.is_pregnant:
             return None
 
         # Create child with genetic combination
-        child = Fox(self.x + random.uniform(-20, 20),
-                   self.y + random.uniform(-20, 20),
-                   self.world_width, self.world_height)
+        child = Fox(self.x + self.rng.uniform(-20, 20),
+                   self.y + self.rng.uniform(-20, 20),
+                   self.world_width, self.world_height, rng=self.rng)
 
         # Child inherits from mother's brain with mutations
         child.brain = self.brain.copy()
-        child.brain.mutate(mutation_rate=0.1, mutation_strength=0.15)
+        child.brain.mutate(mutation_rate=0.1, mutation_strength=0.15, rng=self.rng)
 
         self.is_pregnant = False
         return child
 
-    def update(self, world):
-        super().update(world)
+    def act(self, world):
         self.hunt(world)
 
 
 class Pack:
     def __init__(self, pack_id):
         self.pack_id = pack_id
-        self.members = []
-        self.alpha_male = None
-        self.alpha_female = None
-        self.pack_center_x = 0
-        self.pack_center_y = 0
+        # Ordered set of member wolves (dict keys), for O(1) joins and leaves
+        self.members = {}
+        # Per-gender max-heaps of (-dominance, join order, wolf). Entries of
+        # wolves that have left stay behind until they reach the top.
+        self.heaps = {'male': [], 'female': []}
+        self.joined = {}  # member -> join order of its current membership
+        self.next_join = 0
         self.hunting_target = None
         self.pack_coordination = 0.5  # How well the pack works together
 
+        # Live member count and centroid, rebuilt once per tick by
+        # World.update_packs and lazily after the membership changed
+        self.live_count = 0
+        self._center_x = 0
+        self._center_y = 0
+        self.stale = False
+
+    def refresh(self):
+        self.live_count = sum(1 for wolf in self.members if wolf.is_alive())
+        self.update_pack_center()
+        self.stale = False
+
     def update_pack_center(self):
         if not self.members:
             return
-        self.pack_center_x = sum(wolf.x for wolf in self.members) / len(self.members)
-        self.pack_center_y = sum(wolf.y for wolf in self.members) / len(self.members)
+        anchor = next(iter(self.members))
+        space = anchor.space
+        if space.wrap:
+            # A pack straddling an edge of the torus: average the members'
+            # offsets from one of them rather than their coordinates
+            offsets = [space.delta(anchor.x, anchor.y, wolf.x, wolf.y) for wolf in self.members]
+            self._center_x, self._center_y = space.wrapped(
+                anchor.x + sum(dx for dx, _ in offsets) / len(offsets),
+                anchor.y + sum(dy for _, dy in offsets) / len(offsets))
+            return
+        self._center_x = sum(wolf.x for wolf in self.members) / len(self.members)
+        self._center_y = sum(wolf.y for wolf in self.members) / len(self.members)
+
+    @property
+    def pack_center_x(self):
+        if self.stale:
+            self.refresh()
+        return self._center_x
+
+    @pack_center_x.setter
+    def pack_center_x(self, value):
+        self._center_x = value
+
+    @property
+    def pack_center_y(self):
+        if self.stale:
+            self.refresh()
+        return self._center_y
+
+    @pack_center_y.setter
+    def pack_center_y(self, value):
+        self._center_y = value
 
     def add_member(self, wolf):
-        self.members.append(wolf)
+        self.members[wolf] = None
         wolf.pack = self
         wolf.pack_id = self.pack_id
-        self.update_hierarchy()
+        self.joined[wolf] = self.next_join
+        heapq.heappush(self.heaps[wolf.gender], (-wolf.pack_dominance, self.next_join, wolf))
+        self.next_join += 1
+        self.stale = True
 
     def remove_member(self, wolf):
         if wolf in self.members:
-            self.members.remove(wolf)
+            del self.members[wolf]
+            del self.joined[wolf]
             wolf.pack = None
             wolf.pack_id = None
-            self.update_hierarchy()
-
-    def update_hierarchy(self):
-        if not self.members:
-            self.alpha_male = None
-            self.alpha_female = None
-            return
+            self.stale = True
+            # Drop the dead entries once they make up most of the heaps
+            if sum(len(heap) for heap in self.heaps.values()) > 2 * len(self.members) + 16:
+                self.prune()
+
+    def prune(self):
+        for gender, heap in self.heaps.items():
+            heap[:] = [entry for entry in heap if self.joined.get(entry[2]) == entry[1]]
+            heapq.heapify(heap)
+
+    def alpha(self, gender):
+        # Most dominant living member of the gender, earliest joiner on ties
+        heap = self.heaps[gender]
+        dying = []
+        alpha = None
+        while heap:
+            entry = heap[0]
+            wolf = entry[2]
+            if self.joined.get(wolf) != entry[1]:
+                heapq.heappop(heap)  # Left the pack
+            elif not wolf.is_alive():
+                # Out of energy, but a kill this tick may still save it
+                dying.append(heapq.heappop(heap))
+            else:
+                alpha = wolf
+                break
+        for entry in dying:
+            heapq.heappush(heap, entry)
+        return alpha
 
-        males = [w for w in self.members if w.gender == 'male' and w.is_alive()]
-        females = [w for w in self.members if w.gender == 'female' and w.is_alive()]
+    @property
+    def alpha_male(self):
+        return self.alpha('male')
 
-        self.alpha_male = max(males, key=lambda w: w.pack_dominance) if males else None
-        self.alpha_female = max(females, key=lambda w: w.pack_dominance) if females else None
+    @property
+    def alpha_female(self):
+        return self.alpha('female')
 
     def get_pack_size(self):
-        return len([w for w in self.members if w.is_alive()])
+        if self.stale:
+            self.refresh()
+        return self.live_count
 
     def is_hunting(self):
         return self.hunting_target is not None
 
 
 class Wolf(Animal):
-    def __init__(self, x, y, world_width, world_height, gender=None, pack_id=None):
-        super().__init__(x, y, world_width, world_height, gender)
-        self.brain = NeuralNetwork(input_size=14, hidden_sizes=[16, 14], output_size=3)
-        self.vision_range = 100
-        self.hunt_range = 20
+    kills = Column()  # Fractional, kills are shared within a pack
+    pack_dominance = Column()
+    howl_cooldown = Column(np.int64)
+    pack_loyalty = Column()
+    hunting_coordination = Column()
+
+    vision_range = 100
+    hunt_range = 20
+
+    def __init__(self, x, y, world_width, world_height, gender=None, pack_id=None, rng=None):
+        super().__init__(x, y, world_width, world_height, gender, rng)
+        self.brain = NeuralNetwork(input_size=14, hidden_sizes=[16, 14], output_size=3, rng=self.rng)
         self.reproduction_energy = 100
         self.kills = 0
         self.pack = None
         self.pack_id = pack_id
-        self.pack_dominance = random.uniform(0.3, 1.0)
+        self.pack_dominance = self.rng.uniform(0.3, 1.0)
         self.howl_cooldown = 0
-        self.pack_loyalty = random.uniform(0.5, 1.0)
-        self.hunting_coordination = random.uniform(0.3, 0.8)
+        self.pack_loyalty = self.rng.uniform(0.5, 1.0)
+        self.hunting_coordination = self.rng.uniform(0.3, 0.8)
         self.max_age = 2500
         self.energy = 120
 
-    def get_inputs(self, world):
-        inputs = super().get_inputs(world)
-
-        # Find nearest rabbit
-        nearest_prey_dist = float('inf')
-        nearest_prey_angle = 0
-        prey_count_nearby = 0
-        for rabbit in world.rabbits:
-            dist = self.distance_to(rabbit)
-            if dist < self.vision_range:
-                prey_count_nearby += 1
-                if dist < nearest_prey_dist:
-                    nearest_prey_dist = dist
-                    angle = math.atan2(rabbit.y - self.y, rabbit.x - self.x)
-                    nearest_prey_angle = angle - self.direction
-
-        # Find nearest fox (competition)
-        nearest_competitor_dist = float('inf')
-        for fox in world.foxes:
-            dist = self.distance_to(fox)
-            if dist < nearest_competitor_dist and dist < self.vision_range:
-                nearest_competitor_dist = dist
-
-        # Pack information
-        pack_center_dist = float('inf')
-        pack_center_angle = 0
-        pack_size = 0
-        is_alpha = 0
-
-        if self.pack:
-            pack_size = self.pack.get_pack_size()
-            is_alpha = 1 if (self == self.pack.alpha_male or self == self.pack.alpha_female) else 0
-            self.pack.update_pack_center()
-            pack_center_dist = math.sqrt((self.x - self.pack.pack_center_x)**2 +
-                                       (self.y - self.pack.pack_center_y)**2)
-            if pack_center_dist > 0:
-                angle = math.atan2(self.pack.pack_center_y - self.y, self.pack.pack_center_x - self.x)
-                pack_center_angle = angle - self.direction
-
-        # Find nearest potential mate
-        nearest_mate_dist = float('inf')
-        nearest_mate_angle = 0
-        if self.mate_seeking:
-            mate = self.find_mate(world.wolves)
-            if mate:
-                nearest_mate_dist = self.distance_to(mate)
-                angle = math.atan2(mate.y - self.y, mate.x - self.x)
-                nearest_mate_angle = angle - self.direction
-
-        inputs.extend([
-            min(nearest_prey_dist / self.vision_range, 1.0) if nearest_prey_dist < self.vision_range else 0,
-            math.cos(nearest_prey_angle) if nearest_prey_dist < self.vision_range else 0,
-            min(prey_count_nearby / 10.0, 1.0),  # Prey density
-            min(nearest_competitor_dist / self.vision_range, 1.0) if nearest_competitor_dist < self.vision_range else 0,
-            min(pack_center_dist / 100.0, 1.0),  # Distance to pack center
-            math.cos(pack_center_angle),
-            min(pack_size / 8.0, 1.0),  # Pack size normalized
+    @classmethod
+    def brood(cls, count, world_width, world_height, genders, rng):
+        wolves = super().brood(count, world_width, world_height, genders, rng)
+        traits = zip(rng.uniform(0.3, 1.0, count).tolist(),
+                     rng.uniform(0.5, 1.0, count).tolist(),
+                     rng.uniform(0.3, 0.8, count).tolist())
+        for wolf, (dominance, loyalty, coordination) in zip(wolves, traits):
+            wolf.pack_dominance = dominance
+            wolf.pack_loyalty = loyalty
+            wolf.hunting_coordination = coordination
+        return wolves
+
+    @classmethod
+    def sense(cls, world, population):
+        x, y, direction = population['x'], population['y'], population['direction']
+        features = super().sense(world, population)
+        vision = cls.vision_range
+        count = len(population)
+
+        # Nearest rabbit and prey density
+        rabbit_x, rabbit_y = world.targets(world.rabbit_population)
+        points, targets, dists, checked = pairs_within(x, y, rabbit_x, rabbit_y, vision, world.space)
+        world.rabbit_grid.distance_checks += checked
+        prey_at, prey_dist = nearest_of_pairs(count, points, targets, dists)
+        prey_count = np.bincount(points, minlength=count)
+        seen = prey_at >= 0
+
+        # Nearest fox (competition)
+        fox_x, fox_y = world.targets(world.fox_population)
+        fox_at, fox_dist, checked = nearest_within(x, y, fox_x, fox_y, vision, world.space)
+        world.fox_grid.distance_checks += checked
+
+        # Pack information, read once per pack from its cached state
+        pack_x = np.zeros(count)
+        pack_y = np.zeros(count)
+        pack_size = np.zeros(count)
+        is_alpha = np.zeros(count)
+        in_pack = np.zeros(count, dtype=bool)
+        packs = {}
+        for row, wolf in enumerate(population.agents):
+            pack = wolf.pack
+            if pack:
+                if pack not in packs:
+                    packs[pack] = (pack.pack_center_x, pack.pack_center_y, pack.get_pack_size(),
+                                   pack.alpha_male, pack.alpha_female)
+                center_x, center_y, size, alpha_male, alpha_female = packs[pack]
+                pack_x[row] = center_x
+                pack_y[row] = center_y
+                pack_size[row] = size
+                is_alpha[row] = 1 if (wolf == alpha_male or wolf == alpha_female) else 0
+                in_pack[row] = True
+        pack_dist = np.full(count, np.inf)
+        space = world.space
+        pack_dist[in_pack] = space.distances(x[in_pack], y[in_pack], pack_x[in_pack], pack_y[in_pack])
+        away = in_pack & (pack_dist > 0)
+        pack_angle = np.zeros(count)
+        pack_angle[away] = space.angles(x[away], y[away], pack_x[away], pack_y[away]) - direction[away]
+
+        # Nearest potential mate
+        _, mate_dist = nearest_mates(population)
+
+        features.extend([
+            np.where(seen, np.minimum(prey_dist / vision, 1.0), 0),
+            np.where(seen, np.cos(relative_angles(x, y, direction, rabbit_x, rabbit_y, prey_at, world.space)), 0),
+            np.minimum(prey_count / 10.0, 1.0),  # Prey density
+            np.where(fox_at >= 0, np.minimum(fox_dist / vision, 1.0), 0),
+            np.minimum(pack_dist / 100.0, 1.0),  # Distance to pack center
+            np.cos(pack_angle),
+            np.minimum(pack_size / 8.0, 1.0),  # Pack size normalized
             is_alpha,
-            min(nearest_mate_dist / self.vision_range, 1.0) if self.mate_seeking and nearest_mate_dist < self.vision_range else 0,
+            np.where(mate_dist < vision, np.minimum(mate_dist / vision, 1.0), 0),
         ])
+        return features
 
-        return inputs
+    @classmethod
+    def decide(cls, world, population, rows, outputs):
+        # Wolf by wolf, in row order: a howl turns the pack mates that decide
+        # after it
+        agents = population.agents
+        for row in rows:
+            agents[row].process_outputs(outputs[row])
 
     def process_outputs(self, outputs):
         # outputs[0]: turn left/right (-1 to 1)
@@ -437,8 +564,8 @@ class Wolf(Animal):
                     wolf.fitness += 1
                     # Help lost pack members find the group
                     if self.distance_to(wolf) > 80:
-                        angle_to_pack = math.atan2(self.y - wolf.y, self.x - wolf.x)
-                        wolf.direction = angle_to_pack + random.uniform(-0.3, 0.3)
+                        angle_to_pack = wolf.angle_to(self.x, self.y)
+                        wolf.direction = angle_to_pack + self.rng.uniform(-0.3, 0.3)
 
     def hunt(self, world):
         # Pack hunting is more effective
@@ -449,7 +576,7 @@ class Wolf(Animal):
 
         effective_hunt_range = self.hunt_range * hunt_bonus
 
-        for rabbit in world.rabbits[:]:
+        for rabbit in world.rabbit_grid.candidates(self.x, self.y, effective_hunt_range):
             if self.distance_to(rabbit) < effective_hunt_range:
                 # Pack hunting success rate
                 success_chance = 0.4  # Base chance
@@ -460,46 +587,49 @@ class Wolf(Animal):
                     success_chance += nearby_pack_members * 0.2
                     success_chance = min(success_chance, 0.9)  # Cap at 90%
 
-                if random.random() < success_chance:
-                    world.rabbits.remove(rabbit)
-                    # Shared kill - all nearby pack members get energy
-                    energy_gain = 60
-                    if self.pack:
-                        nearby_wolves = [w for w in self.pack.members
-                                       if w.distance_to(rabbit) < 60]
-                        if len(nearby_wolves) > 1:
-                            energy_per_wolf = energy_gain / len(nearby_wolves)
-                            for wolf in nearby_wolves:
-                                wolf.energy += energy_per_wolf
-                                wolf.kills += 1 / len(nearby_wolves)  # Shared kill credit
-                                wolf.fitness += 15
-                        else:
-                            self.energy += energy_gain
-                            self.kills += 1
-                            self.fitness += 12
-                    else:
-                        self.energy += energy_gain * 0.7  # Lone wolves less efficient
-                        self.kills += 1
-                        self.fitness += 8
+                if self.rng.random() < success_chance:
+                    if world.kill_rabbit(rabbit, self):
+                        self.feast(world, rabbit)
                     break
 
+    def feast(self, world, rabbit):
+        # Shared kill - all nearby pack members get energy
+        energy_gain = 60
+        if self.pack:
+            nearby_wolves = [w for w in self.pack.members
+                           if w.distance_to(rabbit) < 60]
+            if len(nearby_wolves) > 1:
+                energy_per_wolf = energy_gain / len(nearby_wolves)
+                for wolf in nearby_wolves:
+                    wolf.energy += energy_per_wolf
+                    wolf.kills += 1 / len(nearby_wolves)  # Shared kill credit
+                    wolf.fitness += 15
+            else:
+                self.energy += energy_gain
+                self.kills += 1
+                self.fitness += 12
+        else:
+            self.energy += energy_gain * 0.7  # Lone wolves less efficient
+            self.kills += 1
+            self.fitness += 8
+
     def give_birth(self):
         if not self.is_pregnant:
             return None
 
-        child = Wolf(self.x + random.uniform(-20, 20),
-                    self.y + random.uniform(-20, 20),
+        child = Wolf(self.x + self.rng.uniform(-20, 20),
+                    self.y + self.rng.uniform(-20, 20),
                     self.world_width, self.world_height,
-                    pack_id=self.pack_id if self.pack else None)
+                    pack_id=self.pack_id if self.pack else None, rng=self.rng)
 
         child.brain = self.brain.copy()
-        child.brain.mutate(mutation_rate=0.1, mutation_strength=0.15)
+        child.brain.mutate(mutation_rate=0.1, mutation_strength=0.15, rng=self.rng)
 
         # Inherit some pack traits
         if self.pack:
-            child.pack_loyalty = self.pack_loyalty + random.uniform(-0.1, 0.1)
-            child.hunting_coordination = self.hunting_coordination + random.uniform(-0.1, 0.1)
-            child.pack_dominance = self.pack_dominance + random.uniform(-0.2, 0.2)
+            child.pack_loyalty = self.pack_loyalty + self.rng.uniform(-0.1, 0.1)
+            child.hunting_coordination = self.hunting_coordination + self.rng.uniform(-0.1, 0.1)
+            child.pack_dominance = self.pack_dominance + self.rng.uniform(-0.2, 0.2)
             # Clamp values
             child.pack_loyalty = max(0.1, min(1.0, child.pack_loyalty))
             child.hunting_coordination = max(0.1, min(1.0, child.hunting_coordination))
@@ -508,26 +638,15 @@ class Wolf(Animal):
         self.is_pregnant = False
         return child
 
-    def update(self, world):
-        birth = super().update(world)
+    def act(self, world):
         self.hunt(world)
 
         # Pack behavior updates
         if self.pack:
             # Stay closer to pack if loyalty is high
-            pack_distance = math.sqrt((self.x - self.pack.pack_center_x)**2 +
-                                    (self.y - self.pack.pack_center_y)**2)
+            pack_distance = self.space.distance(self.x, self.y, self.pack.pack_center_x,
+                                                self.pack.pack_center_y)
             if pack_distance > 200 and self.pack_loyalty > 0.7:
                 # Move towards pack center
-                angle_to_pack = math.atan2(self.pack.pack_center_y - self.y,
-                                         self.pack.pack_center_x - self.x)
-                self.direction = angle_to_pack + random.uniform(-0.5, 0.5)
-
-        return birth
-
-
-class Food:
-    def __init__(self, x, y):
-        self.x = x
-        self.y = y
-        self.energy = 30
\ No newline at end of file
+                angle_to_pack = self.angle_to(self.pack.pack_center_x, self.pack.pack_center_y)
+                self.direction = angle_to_pack + self.rng.uniform(-0.5, 0.5)
@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+
+# Benchmark harness: python benchmark.py [--baseline benchmark_baseline.json]
+# Every world and brain is built from a fixed seed, so two runs do the same
+# work and only the timings differ.
+
+import argparse
+import contextlib
+import io
+import json
+import math
+import platform
+import sys
+import time
+import numpy as np
+from animals import Rabbit
+from evolution import EvolutionManager
+from neural_network import crossover
+from world import World
+
+# The default world: 40 rabbits, 12 foxes, 8 wolves and 30 food on 800x600.
+# Bigger worlds keep the same species mix and density.
+BASE_COUNTS = (40, 12, 8)
+BASE_FOOD = 30
+BASE_WIDTH = 800
+BASE_HEIGHT = 600
+
+SIZES = (100, 1000, 10000, 50000)
+TICKS = {100: 200, 1000: 50, 10000: 10, 50000: 3}
+SEED = 1234
+DEFAULT_BASELINE = 'benchmark_baseline.json'
+
+
+def scaled_world(size, seed=SEED):
+    scale = size / sum(BASE_COUNTS)
+    foxes = round(BASE_COUNTS[1] * scale)
+    wolves = round(BASE_COUNTS[2] * scale)
+    side = math.sqrt(scale)
+    return World(width=round(BASE_WIDTH * side), height=round(BASE_HEIGHT * side), seed=seed,
+                 initial_rabbits=size - foxes - wolves, initial_foxes=foxes,
+                 initial_wolves=wolves, initial_food=round(BASE_FOOD * scale))
+
+
+def evolution_world(size, seed=SEED):
+    # A world that looks like the end of a generation: uneven fitness and
+    # evolution targets matching the population
+    world = scaled_world(size, seed)
+    for population, _ in world.populations():
+        population['fitness'][:] = world.rng.exponential(20, len(population))
+    evolution_manager = EvolutionManager(world)
+    evolution_manager.rabbit_population_target = len(world.rabbits)
+    evolution_manager.fox_population_target = len(world.foxes)
+    evolution_manager.wolf_population_target = len(world.wolves)
+    return world, evolution_manager
+
+
+def best_time(fn, repeat, number=1, setup=None):
+    # Fastest of `repeat` runs, in seconds per call. setup() builds fresh
+    # arguments outside the timed region.
+    best = float('inf')
+    for _ in range(repeat):
+        args = setup() if setup else ()
+        start = time.perf_counter()
+        for _ in range(number):
+            fn(*args)
+        best = min(best, (time.perf_counter() - start) / number)
+    return best
+
+
+def bench_world(size, ticks):
+    world = scaled_world(size)
+    with contextlib.redirect_stdout(io.StringIO()):
+        world.update()  # Warm-up, first tick allocates the grids and banks
+        start = time.perf_counter()
+        for _ in range(ticks):
+            world.update()
+        elapsed = time.perf_counter() - start
+    return {
+        'value': ticks / elapsed,
+        'unit': 'ticks/s',
+        'higher_is_better': True,
+        'ticks': ticks,
+        'agents': size,
+        'width': world.width,
+        'height': world.height,
+    }
+
+
+def seconds(value):
+    return {'value': value, 'unit': 's', 'higher_is_better': False}
+
+
+def bench_brains(repeat):
+    rng = np.random.default_rng(SEED)
+    parent1 = Rabbit(0, 0, BASE_WIDTH, BASE_HEIGHT, 'male', rng=rng).brain
+    parent2 = Rabbit(0, 0, BASE_WIDTH, BASE_HEIGHT, 'female', rng=rng).brain
+    inputs = rng.random(parent1.layer_shapes()[0][0])
+    child = parent1.copy()
+    return {
+        'neural_network.forward': seconds(best_time(lambda: parent1.forward(inputs), repeat, 2000)),
+        'crossover': seconds(best_time(lambda: crossover(parent1, parent2, rng=rng), repeat, 500)),
+        'mutate': seconds(best_time(lambda: child.mutate(0.12, 0.18, rng=rng), repeat, 500)),
+    }
+
+
+def bench_evolution(size, repeat):
+    def evolve(world, evolution_manager):
+        evolution_manager.evolve()
+
+    def evolve_wolves(world, evolution_manager):
+        evolution_manager.evolve_wolf_population(world.wolves, evolution_manager.wolf_population_target)
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        return {
+            f'evolve@{size}': seconds(best_time(evolve, repeat, setup=lambda: evolution_world(size))),
+            f'evolve_wolf_population@{size}': seconds(
+                best_time(evolve_wolves, repeat, setup=lambda: evolution_world(size))),
+        }
+
+
+def run_benchmarks(sizes, ticks_scale=1.0, repeat=5, evolve_size=1000, log=None):
+    results = {}
+    for size in sizes:
+        ticks = max(1, round(TICKS.get(size, 10) * ticks_scale))
+        results[f'world.update@{size}'] = bench_world(size, ticks)
+        if log:
+            log(f"world.update@{size}: {results[f'world.update@{size}']['value']:,.2f} ticks/s")
+    for name, result in {**bench_brains(repeat), **bench_evolution(evolve_size, repeat)}.items():
+        results[name] = result
+        if log:
+            log(f"{name}: {result['value'] * 1e6:,.1f} us")
+    return {
+        'meta': {
+            'seed': SEED,
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'machine': platform.machine(),
+            'platform': platform.platform(),
+        },
+        'results': results,
+    }
+
+
+def compare(report, baseline, threshold):
+    # Relative change against the baseline, positive means faster. Anything
+    # slower by more than `threshold` is a regression.
+    comparison = {}
+    for name, result in report['results'].items():
+        base = baseline['results'].get(name)
+        if base is None or not base['value'] or not result['value']:
+            continue
+        if result['higher_is_better']:
+            speedup = result['value'] / base['value']
+        else:
+            speedup = base['value'] / result['value']
+        comparison[name] = {
+            'baseline': base['value'],
+            'current': result['value'],
+            'speedup': speedup,
+            'regression': speedup < 1 - threshold,
+        }
+    return comparison
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Benchmark the simulation at fixed seeds")
+    parser.add_argument('--sizes', type=int, nargs='+', default=list(SIZES),
+                        help="total agents per world.update benchmark")
+    parser.add_argument('--ticks-scale', type=float, default=1.0,
+                        help="multiply the ticks timed at every size")
+    parser.add_argument('--repeat', type=int, default=5,
+                        help="repeats of the brain and evolution timings (best is kept)")
+    parser.add_argument('--evolve-size', type=int, default=1000,
+                        help="total agents in the evolution benchmarks")
+    parser.add_argument('--output', help="write the results JSON here")
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE,
+                        help="results JSON to compare against")
+    parser.add_argument('--threshold', type=float, default=0.1,
+                        help="relative slowdown that counts as a regression")
+    parser.add_argument('--save-baseline', action='store_true',
+                        help="store these results as the new baseline instead of comparing")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    log = lambda line: print(line, file=sys.stderr)
+    report = run_benchmarks(args.sizes, args.ticks_scale, args.repeat, args.evolve_size, log)
+
+    if args.save_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump(report, f, indent=2)
+        log(f"Baseline written to {args.baseline}")
+    else:
+        try:
+            with open(args.baseline) as f:
+                baseline = json.load(f)
+        except FileNotFoundError:
+            log(f"No baseline at {args.baseline}, skipping comparison")
+        else:
+            report['comparison'] = compare(report, baseline, args.threshold)
+            for name, change in report['comparison'].items():
+                flag = "  REGRESSION" if change['regression'] else ""
+                log(f"{name}: {change['speedup']:.2f}x vs baseline{flag}")
+
+    print(json.dumps(report, indent=2))
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+
+    regressions = [name for name, change in report.get('comparison', {}).items() if change['regression']]
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
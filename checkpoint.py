@@ -0,0 +1,158 @@
+import json
+import os
+import numpy as np
+from animals import Rabbit, Fox, Wolf, Pack
+from config import Config
+from food import FoodField
+from evolution import EvolutionManager
+from fitness_cache import FitnessCache
+from neural_network import BrainBank
+from population import columns_of
+from world import World, TOTALS
+
+# Everything lives in one uncompressed .npz: the Population columns and the
+# float32 genome matrix of each species as flat arrays (stored in the bank's
+# dtype so a resumed run is bit-exact), links between animals as row indexes,
+# and the scalar state as a JSON document under 'meta'.
+
+SPECIES = (
+    ('rabbits', Rabbit, 'rabbit_population'),
+    ('foxes', Fox, 'fox_population'),
+    ('wolves', Wolf, 'wolf_population'),
+)
+FORMAT_VERSION = 2
+NO_ROW = -1
+
+
+def save_checkpoint(path, world, evolution_manager):
+    arrays = {}
+    meta = {
+        'version': FORMAT_VERSION,
+        'world': {
+            'width': world.width,
+            'height': world.height,
+            'wrap': world.space.wrap,
+            'chunk_size': world.chunk_size,
+            'seed': world.seed,
+            'tick': world.tick,
+            'generation_timer': world.generation_timer,
+            'generation_count': world.generation_count,
+            'next_pack_id': world.next_pack_id,
+        },
+        'rng': world.rng.bit_generator.state,
+        'totals': world.totals,
+        'config': world.config.to_dict(),
+        'evolution': {
+            'generation': evolution_manager.generation,
+            'rabbit_population_target': evolution_manager.rabbit_population_target,
+            'fox_population_target': evolution_manager.fox_population_target,
+            'wolf_population_target': evolution_manager.wolf_population_target,
+        },
+    }
+    if evolution_manager.fitness_cache is not None:
+        meta['fitness_cache'] = evolution_manager.fitness_cache.export()
+
+    for species, _, population_name in SPECIES:
+        population = getattr(world, population_name)
+        for name, array in population.export().items():
+            arrays[f'{species}.{name}'] = array
+        arrays[f'{species}.last_mate'] = np.array(
+            [population.row_of(animal.last_mate) for animal in population.agents], dtype=np.int64)
+
+    wolves = world.wolf_population
+    arrays['wolves.pack_id'] = np.array(
+        [NO_ROW if wolf.pack_id is None else wolf.pack_id for wolf in wolves.agents], dtype=np.int64)
+    meta['packs'] = [{
+        'pack_id': pack.pack_id,
+        'members': [wolves.row_of(wolf) for wolf in pack.members if wolf._population is wolves],
+        'pack_center_x': pack.pack_center_x,
+        'pack_center_y': pack.pack_center_y,
+        'pack_coordination': pack.pack_coordination,
+    } for pack in world.packs]
+
+    food_rows = world.food.living_rows()
+    for name in ('x', 'y', 'energy'):
+        arrays[f'food.{name}'] = world.food[name][food_rows]
+
+    arrays['meta'] = np.array(json.dumps(meta))
+
+    # Write next to the target and swap it in, so a crash mid-save never
+    # leaves a truncated checkpoint behind
+    partial = f'{path}.partial'
+    with open(partial, 'wb') as f:
+        np.savez(f, **arrays)
+    os.replace(partial, path)
+
+
+def bare_animals(animal_class, count, world):
+    # Animal objects without state of their own: non-column attributes come
+    # from one throwaway instance, everything else is in the restored rows
+    prototype = animal_class(0, 0, world.width, world.height, 'male', rng=np.random.default_rng(0))
+    columns = columns_of(animal_class)
+    template = {name: value for name, value in prototype.__dict__.items()
+                if name not in columns and name != 'brain'}
+    animals = []
+    for _ in range(count):
+        animal = animal_class.__new__(animal_class)
+        animal.__dict__.update(template)
+        animal.rng = world.rng
+        animals.append(animal)
+    return animals, BrainBank.like(prototype.brain)
+
+
+def load_checkpoint(path):
+    with np.load(path, allow_pickle=False) as data:
+        arrays = {name: data[name] for name in data.files}
+    meta = json.loads(str(arrays.pop('meta')))
+    if meta['version'] != FORMAT_VERSION:
+        raise ValueError(f"unsupported checkpoint version {meta['version']}")
+
+    settings = meta['world']
+    # Checkpoints from before the config existed ran on the defaults
+    world = World(width=settings['width'], height=settings['height'], seed=settings['seed'],
+                  config=Config(**meta.get('config', {})), wrap=settings.get('wrap', False),
+                  chunk_size=settings.get('chunk_size'))
+    world.tick = settings['tick']
+    world.generation_timer = settings['generation_timer']
+    world.generation_count = settings['generation_count']
+    world.next_pack_id = settings['next_pack_id']
+    world.rng.bit_generator.state = meta['rng']
+    # Checkpoints from before the counters existed start them from zero
+    world.totals = {name: meta.get('totals', {}).get(name, 0) for name in TOTALS}
+
+    for species, animal_class, population_name in SPECIES:
+        population = getattr(world, population_name)
+        prefix = f'{species}.'
+        state = {name[len(prefix):]: array for name, array in arrays.items() if name.startswith(prefix)}
+        animals, brains = bare_animals(animal_class, len(state['x']), world)
+        population.restore(animals, state, brains)
+        for animal, row in zip(animals, state['last_mate']):
+            animal.last_mate = animals[row] if row != NO_ROW else None
+
+    wolves = world.wolves
+    for wolf, pack_id in zip(wolves, arrays['wolves.pack_id']):
+        wolf.pack = None
+        wolf.pack_id = None if pack_id == NO_ROW else int(pack_id)
+
+    world.packs = []
+    for saved in meta['packs']:
+        pack = Pack(saved['pack_id'])
+        # Alphas follow from the members' dominance and join order
+        for row in saved['members']:
+            pack.add_member(wolves[row])
+        pack.refresh()
+        pack.pack_center_x = saved['pack_center_x']
+        pack.pack_center_y = saved['pack_center_y']
+        pack.pack_coordination = saved['pack_coordination']
+        world.packs.append(pack)
+
+    world.food = FoodField(space=world.space)
+    world.food.add(arrays['food.x'], arrays['food.y'], arrays['food.energy'])
+
+    evolution_manager = EvolutionManager(world)
+    for name, value in meta['evolution'].items():
+        setattr(evolution_manager, name, value)
+    if 'fitness_cache' in meta:
+        evolution_manager.fitness_cache = FitnessCache.restore(meta['fitness_cache'])
+
+    return world, evolution_manager
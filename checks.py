@@ -0,0 +1,221 @@
+#!/usr/bin/env python3
+
+# Consistency checks: python checks.py [NAME ...]
+# Each check builds what it needs from a fixed seed and fails with an
+# AssertionError when the simulation no longer behaves the way it should.
+# Exits non-zero when any check fails.
+
+import argparse
+import collections
+import contextlib
+import io
+import math
+import sys
+import traceback
+import numpy as np
+from animals import MATING_RANGE, Animal, Rabbit, Fox, Wolf
+from world import World
+
+
+def check_wolf_defaults():
+    # Wolves live longer and start with more energy than the other species,
+    # however they are made
+    built = Wolf(1, 1, 800, 600, 'male', rng=np.random.default_rng(0))
+    brooded = Wolf.brood(4, 800, 600, ['male', 'female'] * 2, np.random.default_rng(0))
+    for wolf in [built] + brooded:
+        assert wolf.max_age == 2500, wolf.max_age
+        assert wolf.energy == 120, wolf.energy
+
+
+def reference_inputs(world, population, animal):
+    # One animal's inputs the way the per-agent code worked them out,
+    # scanning every animal and food item of the world
+    space = world.space
+    vision = animal.vision_range
+
+    def nearest(points, radius=math.inf):
+        # Distance and angle off the animal's heading to the nearest point
+        # within radius, or (inf, 0)
+        best, angle = math.inf, 0.0
+        for x, y in points:
+            dist = space.distance(animal.x, animal.y, x, y)
+            if dist < best and dist < radius:
+                dx, dy = space.delta(animal.x, animal.y, x, y)
+                best, angle = dist, math.atan2(dy, dx) - animal.direction
+        return best, angle
+
+    def living(population):
+        return [(other.x, other.y) for other in population.agents if other.alive]
+
+    def seen(dist, value):
+        return value if dist < vision else 0
+
+    mate_dist, mate_angle = math.inf, 0.0
+    if animal.mate_seeking:
+        mate_dist, mate_angle = nearest(
+            [(other.x, other.y) for other in population.agents
+             if other.alive and other is not animal and other.gender != animal.gender and
+             other.can_reproduce() and other is not animal.last_mate], MATING_RANGE)
+
+    inputs = [animal.x / world.width, animal.y / world.height, animal.energy / 100,
+              math.cos(animal.direction), math.sin(animal.direction)]
+    if isinstance(animal, Rabbit):
+        food = world.food
+        food_dist, food_angle = nearest(zip(food['x'][food['alive']], food['y'][food['alive']]))
+        fox_dist, fox_angle = nearest(living(world.fox_population), vision)
+        inputs += [min(food_dist / vision, 1.0), math.cos(food_angle),
+                   seen(fox_dist, min(fox_dist / vision, 1.0)), seen(fox_dist, math.cos(fox_angle)),
+                   seen(mate_dist, min(mate_dist / vision, 1.0))]
+    elif isinstance(animal, Fox):
+        prey_dist, prey_angle = nearest(living(world.rabbit_population), vision)
+        inputs += [seen(prey_dist, min(prey_dist / vision, 1.0)), seen(prey_dist, math.cos(prey_angle)),
+                   seen(mate_dist, min(mate_dist / vision, 1.0)), seen(mate_dist, math.cos(mate_angle))]
+    else:
+        rabbits = living(world.rabbit_population)
+        prey_dist, prey_angle = nearest(rabbits, vision)
+        prey_count = sum(space.distance(animal.x, animal.y, x, y) < vision for x, y in rabbits)
+        fox_dist, _ = nearest(living(world.fox_population), vision)
+        pack = animal.pack
+        pack_dist, pack_angle, pack_size, is_alpha = math.inf, 0.0, 0, 0
+        if pack:
+            pack_size = pack.get_pack_size()
+            is_alpha = 1 if animal is pack.alpha_male or animal is pack.alpha_female else 0
+            pack_dist = space.distance(animal.x, animal.y, pack.pack_center_x, pack.pack_center_y)
+            if pack_dist > 0:
+                dx, dy = space.delta(animal.x, animal.y, pack.pack_center_x, pack.pack_center_y)
+                pack_angle = math.atan2(dy, dx) - animal.direction
+        inputs += [seen(prey_dist, min(prey_dist / vision, 1.0)), seen(prey_dist, math.cos(prey_angle)),
+                   min(prey_count / 10.0, 1.0), seen(fox_dist, min(fox_dist / vision, 1.0)),
+                   min(pack_dist / 100.0, 1.0), math.cos(pack_angle), min(pack_size / 8.0, 1.0), is_alpha,
+                   seen(mate_dist, min(mate_dist / vision, 1.0))]
+    return inputs
+
+
+def check_sensing(ticks=1500):
+    # The vectorized sense passes give every living animal the inputs the
+    # per-agent reference above does
+    world = World(seed=3, wrap=True)
+    senses = {cls: cls.__dict__['sense'] for cls in (Rabbit, Fox, Wolf)}
+    worst = [0.0, 0]
+
+    def checked(sense):
+        def check(cls, world, population):
+            features = sense.__get__(None, cls)(world, population)
+            inputs = np.column_stack(features)
+            for row in np.flatnonzero(population['alive']):
+                expected = reference_inputs(world, population, population.agents[row])
+                worst[0] = max(worst[0], float(np.max(np.abs(inputs[row] - expected))))
+                worst[1] += 1
+            return features
+        return classmethod(check)
+
+    for cls, sense in senses.items():
+        cls.sense = checked(sense)
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            for _ in range(ticks):
+                world.update()
+    finally:
+        for cls, sense in senses.items():
+            cls.sense = sense
+    assert worst[1], "nobody sensed anything"
+    assert worst[0] < 1e-9, f"inputs differ from the reference by up to {worst[0]}"
+
+
+def run_domains(processes, ticks, each, **kwargs):
+    # Run a split world the way sim domains does, calling each(world) after
+    # every tick
+    from domains import Domains
+
+    settings = dict(strips=4, seed=4, width=1600, height=600, wrap=True,
+                    initial_rabbits=200, initial_foxes=50, initial_wolves=30, initial_food=100)
+    settings.update(kwargs)
+    world = Domains(processes=processes, **settings)
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            for _ in range(ticks):
+                world.update()
+                if world.should_evolve():
+                    world.evolve()
+                world.prevent_extinction()
+                each(world)
+    finally:
+        world.close()
+
+
+def domain_states(processes, ticks):
+    # Every strip's stats, pack layout and population columns, once per tick
+    states = []
+    run_domains(processes, ticks, lambda world: states.append(world.call('state', [()] * len(world.boards))))
+    return states
+
+
+def check_domains_replay(ticks=2000):
+    # A split world runs the same with its strips in worker processes as
+    # in one process
+    serial = domain_states(False, ticks)
+    parallel = domain_states(True, ticks)
+    for tick, (expected, found) in enumerate(zip(serial, parallel), 1):
+        assert expected == found, f"strips differ at tick {tick}"
+
+
+def check_domains_mating(ticks=1500):
+    # Nobody mates twice in a tick, across strip borders included
+    mated = collections.Counter()
+    twice = []
+    mate_with = Animal.mate_with
+
+    def counting(animal, partner, *args):
+        mated[id(animal)] += 1
+        if not partner.ghost:
+            mated[id(partner)] += 1
+        return mate_with(animal, partner, *args)
+
+    def tally(world):
+        twice.extend(count for count in mated.values() if count > 1)
+        mated.clear()
+
+    Animal.mate_with = counting
+    try:
+        run_domains(False, ticks, tally, initial_rabbits=400, initial_foxes=80, initial_wolves=40,
+                    initial_food=200)
+    finally:
+        Animal.mate_with = mate_with
+    assert not twice, f"{len(twice)} animals mated more than once in a tick"
+
+
+CHECKS = {
+    'wolf_defaults': check_wolf_defaults,
+    'sensing': check_sensing,
+    'domains_replay': check_domains_replay,
+    'domains_mating': check_domains_mating,
+}
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Run the simulation's consistency checks")
+    parser.add_argument('names', nargs='*', metavar='NAME',
+                        help=f"checks to run (default: all of {', '.join(CHECKS)})")
+    return parser
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    unknown = [name for name in args.names if name not in CHECKS]
+    if unknown:
+        parser.error(f"unknown checks {unknown}, expected some of {list(CHECKS)}")
+    failed = 0
+    for name in args.names or CHECKS:
+        try:
+            CHECKS[name]()
+        except Exception:
+            failed += 1
+            print(f"FAIL {name}\n{traceback.format_exc()}", file=sys.stderr)
+        else:
+            print(f"ok   {name}", file=sys.stderr)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,49 @@
+# Tunable simulation constants, in one place so runs (and parameter sweeps)
+# can vary them. World holds a Config; animals, populations and the
+# EvolutionManager read it from there.
+
+DEFAULTS = {
+    # Energy every animal loses per tick (Population.advance)
+    'energy_decay': 0.2,
+    # Ticks a pregnancy lasts, and before both partners can mate again (Animal.mate_with)
+    'gestation_ticks': 300,
+    'mating_cooldown': 500,
+    # Ticks after which a generation ends anyway (EvolutionManager.should_evolve)
+    'generation_ticks': 8000,
+    # Food respawning (World.update): food_spawn_batch items every
+    # food_spawn_interval ticks while there are fewer than food_cap, plus one
+    # item with probability food_spawn_chance every tick
+    'food_spawn_interval': 100,
+    'food_spawn_batch': 5,
+    'food_cap': 40,
+    'food_spawn_chance': 0.03,
+}
+
+
+class Config:
+    def __init__(self, **overrides):
+        unknown = set(overrides) - set(DEFAULTS)
+        if unknown:
+            raise ValueError(f"unknown parameters {sorted(unknown)}, expected some of {list(DEFAULTS)}")
+        for name, default in DEFAULTS.items():
+            # Values keep the type of the default, so 300.0 ticks is 300, and
+            # 300.5 ticks is an error rather than 300
+            value = overrides.get(name, default)
+            if isinstance(default, int) and value != int(value):
+                raise ValueError(f"{name} takes whole numbers, got {value!r}")
+            setattr(self, name, type(default)(value))
+
+    def to_dict(self):
+        return {name: getattr(self, name) for name in DEFAULTS}
+
+    def replace(self, **changes):
+        return Config(**{**self.to_dict(), **changes})
+
+    def __eq__(self, other):
+        return isinstance(other, Config) and self.to_dict() == other.to_dict()
+
+    def __repr__(self):
+        return f"Config({', '.join(f'{name}={value!r}' for name, value in self.to_dict().items())})"
+
+
+DEFAULT_CONFIG = Config()
@@ -0,0 +1,633 @@
+import hashlib
+import multiprocessing
+import traceback
+from multiprocessing import resource_tracker, shared_memory
+import numpy as np
+from animals import Rabbit, Fox, Wolf, Pack
+from evolution import EvolutionManager
+from food import FoodField
+from population import GENDERS
+from world import World, TOTALS
+
+# One large world split into vertical strips (domains), each a World of its
+# own that only owns the animals and food with left <= x < right. Strips run
+# side by side, in worker processes or one after the other, and every tick
+#
+#   1. each strip publishes its border zone (everything within HALO of its
+#      edges) on a board, a shared memory table its neighbours read;
+#   2. each strip runs the first half of World.update (moving and hunting)
+#      with the neighbours' border zones as ghosts: sensed and hunted like
+#      its own, but whatever happens to a ghost only becomes a claim
+#      (World.claims);
+#   3. owners settle the kills on their rabbits in (claimant strip, claim)
+#      order, first come first served, and send back the granted ones, so a
+#      rabbit killed across the border never feeds or mates afterwards;
+#   4. claimants feast on their granted kills and run the second half of
+#      World.update (feeding and mating), which claims meals and matings
+#      across the border the same way;
+#   5. owners settle those, the partner of a granted mating doing its half;
+#   6. claimants collect their meals and do their half of granted matings,
+#      the strips compact, and animals that left their strip migrate to the
+#      one they are in now.
+#
+# Every step only depends on the strip's own state and seed, so a split world
+# replays the same run whether its strips run in processes or not. Food only
+# spawns in the chunks a strip owns (strip edges are whole chunks), so it
+# never has to migrate. Evolution and respawns gather every strip back into
+# one World, run the EvolutionManager on it and split it again.
+
+HALO = Wolf.vision_range  # Nobody senses or reaches further
+
+# Board columns; food is kind 3
+FIELDS = ('kind', 'x', 'y', 'gender', 'eligible', 'row')
+KIND, X, Y, GENDER, ELIGIBLE, ROW = range(len(FIELDS))
+FOOD = 3
+
+# Species populations in board kind order
+POPULATIONS = ('rabbit_population', 'fox_population', 'wolf_population')
+SPECIES = {Rabbit: 'rabbit_population', Fox: 'fox_population', Wolf: 'wolf_population'}
+PLURALS = {'rabbit': 'rabbits', 'fox': 'foxes', 'wolf': 'wolves'}
+
+
+class Ghost:
+    # Stand-in for an animal of a neighbouring strip near the border. Has the
+    # attributes hunting and mating read or write; whatever happens to it
+    # only counts once its owner grants the claim.
+    ghost = True
+    _population = None
+
+    def __init__(self, x, y, gender, owner, row, index):
+        self.x = x
+        self.y = y
+        self.gender = gender
+        self.owner = owner  # Strip it lives in
+        self.row = row  # Its row there
+        self.index = index  # Its row in the population's halo
+        self.alive = True
+        self.fitness = 0
+        self.mating_cooldown = 0
+        self.last_mate = None
+
+    def is_alive(self):
+        return self.alive
+
+
+def strip_edges(width, strips, chunk_size):
+    # Where each strip starts, plus width: equal shares rounded to whole
+    # chunks, none narrower than HALO so ghosts only come from next door
+    edges = [0] + [round(width * i / strips / chunk_size) * chunk_size for i in range(1, strips)] + [width]
+    if min(np.diff(edges)) < HALO:
+        raise ValueError(f"{strips} strips of {chunk_size} wide chunks do not fit a {width} wide world "
+                         f"with every strip at least {HALO} wide")
+    return np.array(edges, dtype=np.float64)
+
+
+def neighbours(index, count, wrap):
+    # Strips whose border zones `index` reads, in index order
+    found = {index - 1, index + 1}
+    if wrap:
+        found = {other % count for other in found}
+    return sorted(other for other in found if 0 <= other < count and other != index)
+
+
+def attach(name):
+    # Open a neighbour's board. Its owner unlinks it, so it is kept out of
+    # this process's resource tracker (which would unlink it at exit).
+    memory = shared_memory.SharedMemory(name=name)
+    resource_tracker.unregister(memory._name, 'shared_memory')
+    return memory
+
+
+class StripWorld(World):
+    # A World owning the strip left <= x < right of a larger one. Food only
+    # spawns in its own chunks, and compaction waits until the claims of the
+    # tick are settled (finish_tick), so that the rows its neighbours hold
+    # claims on stay put.
+    def __init__(self, left, right, **kwargs):
+        self.left = left
+        self.right = right
+        super().__init__(initial_rabbits=0, initial_foxes=0, initial_wolves=0, initial_food=0, **kwargs)
+
+    def occupied_chunks(self):
+        chunks = super().occupied_chunks()
+        left = (chunks // -(-self.height // self.chunk_size)) * self.chunk_size
+        return chunks[(left >= self.left) & (left < self.right)]
+
+    def compact(self):
+        pass
+
+    def finish_tick(self):
+        super().compact()
+
+
+class Strip:
+    # One domain: its StripWorld and the board it publishes its border zone
+    # on, in shared memory when the strips run in processes. The methods are
+    # the steps of a tick, called by Domains in order on every strip.
+    def __init__(self, index, edges, wrap, world, shared=False):
+        self.index = index
+        self.edges = edges
+        self.left = edges[index]
+        self.right = edges[index + 1]
+        self.neighbours = neighbours(index, len(edges) - 1, wrap)
+        self.world = world
+        self.shared = shared
+        self.board = None
+        self.memory = None
+        self.attached = {}  # Neighbour -> (board name, SharedMemory)
+        self.claimed = []  # (kind, claimant, ghost) of this round's claims, by number
+
+    def publish(self):
+        # Write the border zone onto the board. Returns what neighbours read
+        # it by: the array itself, or its shared memory name and length.
+        world = self.world
+        parts = []
+        for kind, name in enumerate(POPULATIONS):
+            population = getattr(world, name)
+            rows = np.flatnonzero(self.near_border(population['x']))
+            parts.append(np.column_stack((np.full(len(rows), kind), population['x'][rows], population['y'][rows],
+                                          population['gender'][rows], population.can_reproduce()[rows], rows)))
+        rows = world.food.living_rows()
+        rows = rows[self.near_border(world.food['x'][rows])]
+        parts.append(np.column_stack((np.full(len(rows), FOOD), world.food['x'][rows], world.food['y'][rows],
+                                      np.zeros(len(rows)), np.zeros(len(rows)), rows)))
+        table = np.concatenate(parts)
+        self.reserve(len(table))
+        self.board[0, 0] = len(table)
+        self.board[1:len(table) + 1] = table
+        if self.shared:
+            return self.memory.name, len(self.board)
+        return self.board
+
+    def near_border(self, x):
+        return (x - self.left < HALO) | (self.right - x <= HALO)
+
+    def reserve(self, count):
+        # A board for `count` rows behind the count row, doubled when it runs out
+        if self.board is not None and len(self.board) > count:
+            return
+        rows = max(count + 1, 64, 0 if self.board is None else 2 * len(self.board))
+        if not self.shared:
+            self.board = np.zeros((rows, len(FIELDS)))
+            return
+        old = self.memory
+        self.board = None
+        if old is not None:
+            old.close()
+            old.unlink()
+        self.memory = shared_memory.SharedMemory(create=True, size=rows * len(FIELDS) * 8)
+        self.board = np.ndarray((rows, len(FIELDS)), dtype=np.float64, buffer=self.memory.buf)
+
+    def read(self, neighbour, handle):
+        # A copy of the rows on a neighbour's board
+        if not self.shared:
+            board = handle
+        else:
+            name, rows = handle
+            name_attached, memory = self.attached.get(neighbour, (None, None))
+            if name_attached != name:
+                if memory is not None:
+                    memory.close()
+                memory = attach(name)
+                self.attached[neighbour] = (name, memory)
+            board = np.ndarray((rows, len(FIELDS)), dtype=np.float64, buffer=memory.buf)
+        return board[1:int(board[0, 0]) + 1].copy()
+
+    def install(self, tables):
+        # The neighbours' board rows ((owner, table) pairs) as the halos and
+        # ghosts of this strip's populations and food; none for no tables
+        world = self.world
+        for kind, name in enumerate(POPULATIONS):
+            population = getattr(world, name)
+            if not tables:
+                population.halo = None
+                population.ghosts = []
+                continue
+            rows, owners = self.rows_of(tables, kind)
+            population.halo = {
+                'x': rows[:, X],
+                'y': rows[:, Y],
+                'gender': rows[:, GENDER].astype(np.int8),
+                'eligible': rows[:, ELIGIBLE] > 0,
+                'alive': np.ones(len(rows), dtype=bool),
+                'owner': owners,
+                'row': rows[:, ROW].astype(np.int64),
+            }
+            halo = population.halo
+            population.ghosts = [Ghost(x, y, GENDERS[gender], owner, row, index)
+                                 for index, (x, y, gender, owner, row) in enumerate(zip(
+                                     halo['x'].tolist(), halo['y'].tolist(), halo['gender'].tolist(),
+                                     owners.tolist(), halo['row'].tolist()))]
+        if not tables:
+            world.food.halo = None
+            return
+        rows, owners = self.rows_of(tables, FOOD)
+        world.food.halo = {'x': rows[:, X], 'y': rows[:, Y], 'owner': owners, 'row': rows[:, ROW].astype(np.int64)}
+
+    def rows_of(self, tables, kind):
+        parts = [(owner, table[table[:, KIND] == kind]) for owner, table in tables]
+        rows = np.concatenate([part for _, part in parts])
+        owners = np.concatenate([np.full(len(part), owner) for owner, part in parts])
+        return rows, owners
+
+    def step(self, boards):
+        # The first half of World.update (moving and hunting) with the
+        # neighbours' border zones ((neighbour, handle) pairs) as ghosts.
+        # Returns the kills claimed on their rabbits, see claim.
+        self.install([(neighbour, self.read(neighbour, handle)) for neighbour, handle in boards])
+        self.world.update_animals()
+        return self.claim()
+
+    def claim(self):
+        # Turn World.claims into {owner: [claim]}, each claim (claimant strip,
+        # number, kind, target, row, x, y, gender, claimant row) with the
+        # claimant's position and gender, and remember what was claimed by
+        # number
+        world = self.world
+        claims, world.claims = world.claims, []
+        ghosts = {target: {(ghost.owner, ghost.row): ghost for ghost in getattr(world, target).ghosts}
+                  for target in POPULATIONS}
+        self.claimed = []
+        outgoing = {}
+        for number, (kind, owner, row, claimant) in enumerate(claims):
+            if kind == 'food':
+                target = 'food'
+                self.claimed.append((kind, claimant, None))
+            else:
+                target = 'rabbit_population' if kind == 'kill' else SPECIES[type(claimant)]
+                self.claimed.append((kind, claimant, ghosts[target][owner, row]))
+            outgoing.setdefault(owner, []).append((self.index, number, kind, target, row, float(claimant.x),
+                                                   float(claimant.y), claimant.gender, claimant._row))
+        return outgoing
+
+    def settle(self, claims):
+        # Grant or refuse the neighbours' claims on this strip's animals and
+        # food, first come first served in (claimant strip, number) order.
+        # Returns {claimant strip: [(number, energy)]} for the granted claims.
+        world = self.world
+        grants = {}
+        # Animals courting a partner across a border themselves may only mate
+        # once: claims on them are refused, unless it is their own partner
+        # courting them back, and then only the lower strip's claim stands
+        courting = {claimant: (ghost.owner, ghost.row) for kind, claimant, ghost in self.claimed if kind == 'mate'}
+        for claimant, number, kind, target, row, x, y, gender, origin in sorted(claims, key=lambda claim: claim[:2]):
+            if kind == 'food':
+                food = world.food
+                if food['alive'][row]:
+                    food['alive'][row] = False
+                    grants.setdefault(claimant, []).append((number, float(food['energy'][row])))
+                continue
+            animal = getattr(world, target).agents[row]
+            if kind == 'kill':
+                if animal.alive:
+                    animal.alive = False
+                    grants.setdefault(claimant, []).append((number, 0.0))
+            elif animal.alive and animal.can_reproduce():
+                partner = courting.get(animal)
+                if partner is not None and (partner != (claimant, origin) or claimant > self.index):
+                    continue
+                # The partner's half of the mating, the suitor does its own
+                # with the grant. Partners in other strips are never
+                # remembered as last mate.
+                animal.mate_with(Ghost(x, y, gender, claimant, -1, -1), world.config)
+                animal.last_mate = None
+                animal.fitness += 20
+                grants.setdefault(claimant, []).append((number, 0.0))
+        return grants
+
+    def encounter(self, grants):
+        # Collect the granted kills, then the second half of World.update
+        # (feeding, mating and the end of the tick). Returns the meals and
+        # matings claimed on the neighbours' food and animals, see claim.
+        world = self.world
+        for number, _ in sorted(grants):
+            _, claimant, rabbit = self.claimed[number]
+            claimant.feast(world, rabbit)
+            world.totals['rabbits_killed'] += 1
+        world.update_encounters()
+        return self.claim()
+
+    def finish(self, grants):
+        # Collect the granted meals and matings, compact, and send off the
+        # animals that left the strip. Returns {strip: {population: [animal]}}.
+        world = self.world
+        for number, energy in sorted(grants):
+            kind, claimant, ghost = self.claimed[number]
+            if kind == 'food':
+                claimant.energy = min(claimant.energy + energy, 200)  # Cap energy
+                claimant.fitness += 5
+                world.totals['food_eaten'] += 1
+            else:
+                claimant.mate_with(ghost, world.config)
+                claimant.last_mate = None
+                claimant.fitness += 20
+                world.totals[f'{type(claimant).__name__.lower()}_matings'] += 1
+        self.claimed = []
+        self.install([])
+        world.finish_tick()
+        return self.emigrate()
+
+    def emigrate(self):
+        world = self.world
+        emigrants = {}
+        for name in POPULATIONS:
+            population = getattr(world, name)
+            x = population['x']
+            leaving = (x < self.left) | (x >= self.right)
+            if not leaving.any():
+                continue
+            for row in np.flatnonzero(leaving).tolist():
+                animal = population.agents[row]
+                # Packs stay within a strip
+                if getattr(animal, 'pack', None):
+                    animal.pack.remove_member(animal)
+            owners = np.clip(np.searchsorted(self.edges, x[leaving], 'right') - 1, 0, len(self.edges) - 2)
+            for animal, owner in zip(population.compact(~leaving), owners.tolist()):
+                animal.last_mate = None
+                animal.rng = None
+                emigrants.setdefault(owner, {}).setdefault(name, []).append(animal)
+        self.keep_packs_local()
+        return emigrants
+
+    def keep_packs_local(self):
+        # No pack may list a wolf that is no longer in this strip: in process
+        # mode it would be a stale copy, in one process a wolf that lives on
+        # next door, and pack sizes, centres and alphas would differ
+        wolves = self.world.wolf_population
+        for pack in self.world.packs:
+            for wolf in [wolf for wolf in pack.members if wolf._population is not wolves]:
+                pack.remove_member(wolf)
+
+    def arrive(self, payloads):
+        # Take in animals and food (dicts as emigrate() and release() make
+        # them), then publish. Returns the species counts and the board handle.
+        for payload in payloads:
+            self.adopt(payload)
+        return self.counts(), self.publish()
+
+    def adopt(self, payload):
+        world = self.world
+        for name in POPULATIONS:
+            animals = payload.get(name, [])
+            for animal in animals:
+                animal.rng = world.rng
+            getattr(world, name).extend(animals)
+
+        # Wolves that come with a pack (splits) keep it, as a pack of this strip
+        packs = {}
+        for wolf in payload.get('wolf_population', []):
+            pack = wolf.pack
+            if pack is None:
+                continue
+            if pack not in packs:
+                packs[pack] = Pack(world.next_pack_id)
+                packs[pack].pack_coordination = pack.pack_coordination
+                world.packs.append(packs[pack])
+                world.next_pack_id += 1
+            packs[pack].add_member(wolf)
+
+        if 'food' in payload:
+            world.food.add(*payload['food'])
+
+    def release(self):
+        # Hand over every animal (detached) and food item, leaving the strip empty
+        world = self.world
+        payload = {}
+        for name in POPULATIONS:
+            population = getattr(world, name)
+            animals = list(population.agents)
+            population.clear()
+            for animal in animals:
+                animal.rng = None
+            payload[name] = animals
+        rows = world.food.living_rows()
+        payload['food'] = tuple(world.food[name][rows] for name in ('x', 'y', 'energy'))
+        world.food = FoodField(space=world.space)
+        world.packs = []
+        return payload
+
+    def counts(self):
+        world = self.world
+        return len(world.rabbits), len(world.foxes), len(world.wolves)
+
+    def stats(self):
+        return self.world.get_stats()
+
+    def state(self):
+        # Digest of everything in the strip's populations and packs, for
+        # comparing runs
+        world = self.world
+        digest = hashlib.sha1()
+        for name in POPULATIONS:
+            population = getattr(world, name)
+            for column in sorted(population.data):
+                digest.update(population[column].tobytes())
+        wolves = world.wolf_population
+        digest.update(repr([(pack.pack_id, pack.get_pack_size(), pack.pack_center_x, pack.pack_center_y,
+                             [wolves.row_of(wolf) for wolf in pack.members]) for pack in world.packs]).encode())
+        digest.update(world.food['x'].tobytes())
+        return digest.hexdigest()
+
+    def close(self):
+        for _, memory in self.attached.values():
+            memory.close()
+        self.attached = {}
+        self.board = None
+        if self.memory is not None:
+            self.memory.close()
+            self.memory.unlink()
+            self.memory = None
+
+
+def serve(strip, connection):
+    # Worker process: run Strip methods as the coordinator asks until it
+    # sends None. Answers (failed, result), a traceback when failed.
+    try:
+        while True:
+            request = connection.recv()
+            if request is None:
+                break
+            method, arguments = request
+            try:
+                connection.send((False, getattr(strip, method)(*arguments)))
+            except Exception:
+                connection.send((True, traceback.format_exc()))
+    finally:
+        strip.close()
+
+
+class Domains:
+    # A World split into `strips` strips, each in its own worker process when
+    # processes is set. Drive it like a World plus its EvolutionManager:
+    # update(), should_evolve()/evolve(), prevent_extinction(), get_stats(),
+    # and close() when done. The whole World (self.world) holds nothing
+    # between ticks but the tick and generation counters and the events of
+    # evolution; it is where the strips are gathered to evolve.
+    def __init__(self, strips=2, processes=False, width=800, height=600, seed=None, config=None,
+                 wrap=False, chunk_size=200, initial_rabbits=40, initial_foxes=12, initial_wolves=8,
+                 initial_food=30):
+        self.edges = strip_edges(width, strips, chunk_size)
+        self.world = World(width=width, height=height, seed=seed, config=config, wrap=wrap,
+                           chunk_size=chunk_size, initial_rabbits=initial_rabbits,
+                           initial_foxes=initial_foxes, initial_wolves=initial_wolves,
+                           initial_food=initial_food)
+        self.evolution_manager = EvolutionManager(self.world)
+        # Generations are bred back to the size the world started at
+        self.evolution_manager.rabbit_population_target = initial_rabbits
+        self.evolution_manager.fox_population_target = initial_foxes
+        self.evolution_manager.wolf_population_target = initial_wolves
+
+        seeds = np.random.SeedSequence(seed).spawn(strips)
+        self.strips = [Strip(index, self.edges, wrap,
+                             StripWorld(self.edges[index], self.edges[index + 1], width=width, height=height,
+                                        seed=seeds[index], config=self.world.config, wrap=wrap,
+                                        chunk_size=chunk_size),
+                             shared=processes)
+                       for index in range(strips)]
+        self.connections = None
+        self.workers = []
+        if processes:
+            self.connections = []
+            for strip in self.strips:
+                connection, worker_end = multiprocessing.Pipe()
+                worker = multiprocessing.Process(target=serve, args=(strip, worker_end), daemon=True)
+                worker.start()
+                worker_end.close()
+                self.connections.append(connection)
+                self.workers.append(worker)
+            self.strips = None  # They live in the workers now
+        self.counts = [(0, 0, 0)] * strips
+        self.boards = [None] * strips
+        self.split()
+
+    def call(self, method, arguments):
+        # Strip.method on every strip, each with its own argument tuple
+        if self.connections is None:
+            return [getattr(strip, method)(*args) for strip, args in zip(self.strips, arguments)]
+        for connection, args in zip(self.connections, arguments):
+            connection.send((method, args))
+        results = [connection.recv() for connection in self.connections]
+        for index, (failed, result) in enumerate(results):
+            if failed:
+                raise RuntimeError(f"strip {index} failed in {method}:\n{result}")
+        return [result for _, result in results]
+
+    def neighbours_of(self, index):
+        return neighbours(index, len(self.boards), self.world.space.wrap)
+
+    def update(self):
+        world = self.world
+        world.tick += 1
+        world.generation_timer += 1
+        count = len(self.boards)
+
+        # Kills are settled before anyone feeds or mates, meals and matings
+        # at the end of the tick
+        kills = self.call('step', [([(other, self.boards[other]) for other in self.neighbours_of(index)],)
+                                   for index in range(count)])
+        grants = self.call('settle', [(claims,) for claims in self.route(kills, list.extend)])
+        claims = self.call('encounter', [(granted,) for granted in self.route(grants, list.extend)])
+        grants = self.call('settle', [(owned,) for owned in self.route(claims, list.extend)])
+        departures = self.call('finish', [(granted,) for granted in self.route(grants, list.extend)])
+        self.record(self.call('arrive', [(payloads,) for payloads in self.route(departures, list.append)]))
+
+    def route(self, sent, add):
+        # Regroup every strip's {strip: items} by the strip they are for
+        routed = [[] for _ in self.boards]
+        for items in sent:
+            for index, item in items.items():
+                add(routed[index], item)
+        return routed
+
+    def record(self, results):
+        self.counts = [counts for counts, _ in results]
+        self.boards = [board for _, board in results]
+
+    def population_counts(self):
+        return tuple(int(total) for total in np.sum(self.counts, axis=0))
+
+    def gather(self):
+        # Every strip's animals and food back into the whole world
+        world = self.world
+        payloads = self.call('release', [()] * len(self.boards))
+        for name in POPULATIONS:
+            getattr(world, name).reset([animal for payload in payloads for animal in payload[name]])
+        for payload in payloads:
+            world.food.add(*payload['food'])
+
+    def split(self):
+        # The whole world's animals and food out to the strips they are in
+        world = self.world
+        count = len(self.boards)
+        payloads = [{} for _ in range(count)]
+        for name in POPULATIONS:
+            population = getattr(world, name)
+            owners = self.owners_of(population['x'])
+            animals = list(population.agents)
+            population.clear()
+            for animal, owner in zip(animals, owners.tolist()):
+                animal.rng = None
+                payloads[owner].setdefault(name, []).append(animal)
+        rows = world.food.living_rows()
+        owners = self.owners_of(world.food['x'][rows])
+        for owner in range(count):
+            mine = rows[owners == owner]
+            payloads[owner]['food'] = tuple(world.food[name][mine] for name in ('x', 'y', 'energy'))
+        world.food = FoodField(space=world.space)
+        world.packs = []
+        self.record(self.call('arrive', [([payload],) for payload in payloads]))
+
+    def owners_of(self, x):
+        return np.clip(np.searchsorted(self.edges, x, 'right') - 1, 0, len(self.boards) - 1)
+
+    def should_evolve(self):
+        # EvolutionManager.should_evolve over every strip
+        rabbits, foxes, wolves = self.population_counts()
+        manager = self.evolution_manager
+        return (rabbits < manager.rabbit_population_target * 0.2 or
+                foxes < manager.fox_population_target * 0.2 or
+                wolves < manager.wolf_population_target * 0.2 or
+                self.world.generation_timer > self.world.config.generation_ticks)
+
+    def evolve(self):
+        self.gather()
+        self.evolution_manager.evolve()
+        self.split()
+
+    def prevent_extinction(self):
+        if all(self.population_counts()):
+            return
+        self.gather()
+        self.evolution_manager.prevent_extinction()
+        self.split()
+
+    def get_stats(self):
+        # World.get_stats of the whole: sums over the strips, with the
+        # averages weighted by head count
+        parts = self.call('stats', [()] * len(self.boards))
+        world = self.world
+        stats = {'tick': world.tick, 'generation': world.generation_count}
+        for name in parts[0]:
+            if name in stats:
+                continue
+            if '_avg_' in name:
+                plural = PLURALS[name.split('_')[0]]
+                total = sum(part[plural] for part in parts)
+                stats[name] = sum(part[name] * part[plural] for part in parts) / total if total else 0
+            else:
+                stats[name] = sum(part[name] for part in parts)
+        # Food spawned by the whole world (at the start, after evolving)
+        for name in TOTALS:
+            stats[name] += world.totals[name]
+        return stats
+
+    def close(self):
+        if self.connections is None:
+            for strip in self.strips:
+                strip.close()
+            return
+        for connection in self.connections:
+            connection.send(None)
+        for worker in self.workers:
+            worker.join()
+        self.connections = []
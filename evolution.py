@@ -1,6 +1,21 @@
-import random
+import numpy as np
 from animals import Rabbit, Fox, Wolf, Pack
-from neural_network import crossover
+from fitness_cache import genome_key
+from neural_network import NeuralNetwork
+from population import GENDERS
+from reproduction import breed, child_genders
+
+
+def genome_matrix(animals):
+    # The animals' genomes as rows of one matrix, plus their layer shapes
+    brains = [animal.brain for animal in animals]
+    return np.stack([brain.genome for brain in brains]), brains[0].layer_shapes()
+
+
+def give_genomes(animals, genomes, layer_shapes):
+    for animal, genome in zip(animals, genomes):
+        animal.brain = NeuralNetwork.from_genome(genome, layer_shapes)
+
 
 class EvolutionManager:
     def __init__(self, world):
@@ -9,125 +24,158 @@ class EvolutionManager:
         self.rabbit_population_target = 40
         self.fox_population_target = 12
         self.wolf_population_target = 8
+        # Crossover cuts genomes at one point; True swaps gene by gene instead
+        self.uniform_crossover = False
+        # Fitness history per genome across generations
+        # (fitness_cache.FitnessCache), off unless set
+        self.fitness_cache = None
+        # Elite survivors the last evolve kept per animal class, the first
+        # animals of the new population; the rest are bred children
+        self.survivors = {}
+
+    @property
+    def rng(self):
+        return self.world.rng
 
     def evolve_population(self, animals, target_population, animal_class):
         if len(animals) == 0:
+            self.survivors[animal_class] = 0
             return self.create_random_population(target_population, animal_class)
 
         # Sort by fitness
-        animals.sort(key=lambda x: x.fitness, reverse=True)
+        animals, fitness = self.rank(animals, animal_class)
 
         # Statistics
-        avg_fitness = sum(a.fitness for a in animals) / len(animals)
-        max_fitness = animals[0].fitness if animals else 0
-        males = sum(1 for a in animals if a.gender == 'male')
-        females = sum(1 for a in animals if a.gender == 'female')
-        total_children = sum(a.children for a in animals)
+        stats = self.generation_stats(animals, animal_class)
+        self.world.telemetry.generation(stats)
 
         print(f"Generation {self.generation} - {animal_class.__name__}s:")
-        print(f"  Population: {len(animals)} (M:{males}, F:{females})")
-        print(f"  Total Children Born: {total_children}")
-        print(f"  Avg Fitness: {avg_fitness:.2f}")
-        print(f"  Max Fitness: {max_fitness:.2f}")
+        print(f"  Population: {len(animals)} (M:{stats['males']}, F:{stats['females']})")
+        print(f"  Total Children Born: {stats['children']}")
+        print(f"  Avg Fitness: {stats['avg_fitness']:.2f}")
+        print(f"  Max Fitness: {stats['max_fitness']:.2f}")
         if animal_class.__name__ == 'Fox' and animals:
-            total_kills = sum(getattr(a, 'kills', 0) for a in animals)
-            print(f"  Total Kills: {total_kills}")
+            print(f"  Total Kills: {stats['kills']}")
+        self.report_cache()
 
         # Select the best individuals for reproduction
         elite_size = max(2, len(animals) // 4)  # Top 25%
         elite = animals[:elite_size]
+        survivors = self.elite_survivors(elite, target_population)
+        self.survivors[animal_class] = len(survivors)
+
+        # Fill the rest through breeding pairs with gender balance, the whole
+        # cohort in one go
+        genomes, shapes = genome_matrix(elite)
+        genders = child_genders(target_population - len(survivors),
+                                sum(1 for i in survivors if elite[i].gender == 'male'),
+                                sum(1 for i in survivors if elite[i].gender == 'female'),
+                                target_population, self.rng)
+        children, _, _ = breed(genomes, fitness[:elite_size], [GENDERS.index(a.gender) for a in elite],
+                               len(genders), shapes, self.rng, mutation_rate=0.12, mutation_strength=0.18,
+                               uniform=self.uniform_crossover)
+
+        new_animals = animal_class.brood(target_population, self.world.width, self.world.height,
+                                         [elite[i].gender for i in survivors] +
+                                         [GENDERS[code] for code in genders], self.rng)
+        give_genomes(new_animals, np.concatenate([genomes[survivors], children]), shapes)
+        return new_animals
 
-        # Create new generation
-        new_animals = []
-
-        # Keep some elite (15% of target population) with gender balance
+    def rank(self, animals, animal_class):
+        # The animals best first, with the fitness selection goes by
+        fitness = self.selection_fitness(animals, animal_class)
+        order = sorted(range(len(animals)), key=lambda i: fitness[i], reverse=True)
+        return [animals[i] for i in order], [fitness[i] for i in order]
+
+    def selection_fitness(self, animals, animal_class):
+        # Each animal's fitness this generation, recorded in the fitness
+        # cache when there is one. An averaging cache hands back the mean over
+        # every generation the animal's genome lived instead.
+        fitness = [a.fitness for a in animals]
+        cache = self.fitness_cache
+        if cache is None:
+            return fitness
+        species = animal_class.__name__.lower()
+        genomes, _ = genome_matrix(animals)
+        means = [cache.record(genome_key(species, genome), value) for genome, value in zip(genomes, fitness)]
+        return means if cache.average else fitness
+
+    def report_cache(self):
+        cache = self.fitness_cache
+        if cache is not None:
+            print(f"  Fitness Cache: {len(cache)} genomes, {cache.hit_rate:.1%} hit rate")
+
+    def generation_stats(self, animals, animal_class):
+        # The telemetry record of one species at the end of a generation
+        stats = {
+            'tick': self.world.tick,
+            'generation': self.generation,
+            'species': animal_class.__name__.lower(),
+            'population': len(animals),
+            'males': sum(1 for a in animals if a.gender == 'male'),
+            'females': sum(1 for a in animals if a.gender == 'female'),
+            'children': int(sum(a.children for a in animals)),
+            'kills': int(sum(getattr(a, 'kills', 0) for a in animals)),
+            'avg_fitness': float(sum(a.fitness for a in animals) / len(animals)),
+            'max_fitness': float(max(a.fitness for a in animals)),
+        }
+        if self.fitness_cache is not None:
+            stats['fitness_cache_hit_rate'] = self.fitness_cache.hit_rate
+        return stats
+
+    def elite_survivors(self, elite, target_population):
+        # Indexes of the elite kept unchanged (15% of target population),
+        # with gender balance
         elite_survivors = min(len(elite), target_population // 7)
+        survivors = []
         male_survivors = 0
         female_survivors = 0
 
-        for survivor in elite:
-            if len(new_animals) >= elite_survivors:
+        for i, survivor in enumerate(elite):
+            if len(survivors) >= elite_survivors:
                 break
             # Try to maintain gender balance
             if ((survivor.gender == 'male' and male_survivors < elite_survivors // 2) or
                 (survivor.gender == 'female' and female_survivors < elite_survivors // 2) or
-                len(new_animals) == elite_survivors - 1):
-
-                new_animal = animal_class(
-                    random.uniform(50, self.world.width - 50),
-                    random.uniform(50, self.world.height - 50),
-                    self.world.width,
-                    self.world.height,
-                    survivor.gender
-                )
-                new_animal.brain = survivor.brain.copy()
-                new_animals.append(new_animal)
+                len(survivors) == elite_survivors - 1):
+                survivors.append(i)
 
                 if survivor.gender == 'male':
                     male_survivors += 1
                 else:
                     female_survivors += 1
-
-        # Fill the rest through breeding pairs with gender balance
-        males_created = sum(1 for a in new_animals if a.gender == 'male')
-        females_created = sum(1 for a in new_animals if a.gender == 'female')
-
-        while len(new_animals) < target_population:
-            # Determine child gender to maintain balance
-            if males_created < target_population // 2:
-                child_gender = 'male'
-                males_created += 1
-            elif females_created < target_population // 2:
-                child_gender = 'female'
-                females_created += 1
-            else:
-                child_gender = random.choice(['male', 'female'])
-
-            if len(elite) >= 2 and random.random() < 0.8:  # 80% crossover (breeding)
-                # Select breeding pair (preferably different genders)
-                male_parents = [a for a in elite if a.gender == 'male']
-                female_parents = [a for a in elite if a.gender == 'female']
-
-                if male_parents and female_parents:
-                    parent1 = random.choices(male_parents, weights=[a.fitness + 1 for a in male_parents])[0]
-                    parent2 = random.choices(female_parents, weights=[a.fitness + 1 for a in female_parents])[0]
-                else:
-                    parent1, parent2 = random.choices(elite, k=2, weights=[a.fitness + 1 for a in elite])
-
-                child_brain = crossover(parent1.brain, parent2.brain)
-            else:  # 20% mutation of single parent
-                parent = random.choices(elite, k=1, weights=[a.fitness + 1 for a in elite])[0]
-                child_brain = parent.brain.copy()
-
-            # Create new animal
-            child = animal_class(
-                random.uniform(50, self.world.width - 50),
-                random.uniform(50, self.world.height - 50),
-                self.world.width,
-                self.world.height,
-                child_gender
-            )
-            child.brain = child_brain
-            child.brain.mutate(mutation_rate=0.12, mutation_strength=0.18)
-
-            new_animals.append(child)
-
-        return new_animals
+        return survivors
 
     def create_random_population(self, size, animal_class):
         animals = []
         for i in range(size):
             gender = 'male' if i % 2 == 0 else 'female'  # Even gender distribution
             animal = animal_class(
-                random.uniform(50, self.world.width - 50),
-                random.uniform(50, self.world.height - 50),
+                self.rng.uniform(50, self.world.width - 50),
+                self.rng.uniform(50, self.world.height - 50),
                 self.world.width,
                 self.world.height,
-                gender
+                gender,
+                rng=self.rng
             )
             animals.append(animal)
         return animals
 
+    def prevent_extinction(self):
+        # Respawn any species that died out completely
+        if len(self.world.rabbits) == 0:
+            print("Rabbits extinct! Respawning...")
+            self.world.rabbits = self.create_random_population(20, Rabbit)
+
+        if len(self.world.foxes) == 0:
+            print("Foxes extinct! Respawning...")
+            self.world.foxes = self.create_random_population(8, Fox)
+
+        if len(self.world.wolves) == 0:
+            print("Wolves extinct! Respawning...")
+            self.world.wolves = self.create_random_population(6, Wolf)
+            self.world.create_initial_packs()
+
     def should_evolve(self):
         # Evolve when population gets too low or after certain time
         rabbit_count = len(self.world.rabbits)
@@ -138,25 +186,30 @@ class EvolutionManager:
         return (rabbit_count < self.rabbit_population_target * 0.2 or
                 fox_count < self.fox_population_target * 0.2 or
                 wolf_count < self.wolf_population_target * 0.2 or
-                self.world.generation_timer > 8000)  # Every 8000 ticks (longer generations)
+                self.world.generation_timer > self.world.config.generation_ticks)  # Every 8000 ticks by default (longer generations)
 
     def evolve(self):
+        # Runs between ticks, so its phases are profiled with the next tick
+        profiler = self.world.profiler
         print(f"\n=== EVOLUTION - Generation {self.generation} ===")
 
         # Evolve rabbits
-        self.world.rabbits = self.evolve_population(
-            self.world.rabbits, self.rabbit_population_target, Rabbit
-        )
+        with profiler.phase('evolve.rabbits'):
+            self.world.rabbits = self.evolve_population(
+                self.world.rabbits, self.rabbit_population_target, Rabbit
+            )
 
         # Evolve foxes
-        self.world.foxes = self.evolve_population(
-            self.world.foxes, self.fox_population_target, Fox
-        )
+        with profiler.phase('evolve.foxes'):
+            self.world.foxes = self.evolve_population(
+                self.world.foxes, self.fox_population_target, Fox
+            )
 
         # Evolve wolves with pack considerations
-        self.world.wolves = self.evolve_wolf_population(
-            self.world.wolves, self.wolf_population_target
-        )
+        with profiler.phase('evolve.wolves'):
+            self.world.wolves = self.evolve_wolf_population(
+                self.world.wolves, self.wolf_population_target
+            )
 
         self.generation += 1
         self.world.generation_timer = 0
@@ -167,6 +220,7 @@ class EvolutionManager:
 
     def evolve_wolf_population(self, wolves, target_population):
         if len(wolves) == 0:
+            self.survivors[Wolf] = 0
             return self.create_random_population(target_population, Wolf)
 
         # Group wolves by pack for evolution
@@ -182,11 +236,13 @@ class EvolutionManager:
                 lone_wolves.append(wolf)
 
         # Sort all wolves by fitness
-        all_wolves = sorted(wolves, key=lambda x: x.fitness, reverse=True)
+        all_wolves, fitness = self.rank(wolves, Wolf)
 
         # Statistics
-        avg_fitness = sum(w.fitness for w in all_wolves) / len(all_wolves)
-        max_fitness = all_wolves[0].fitness if all_wolves else 0
+        stats = self.generation_stats(all_wolves, Wolf)
+        self.world.telemetry.generation(stats)
+        avg_fitness = stats['avg_fitness']
+        max_fitness = stats['max_fitness']
         avg_pack_coordination = sum(w.pack.pack_coordination for w in all_wolves if w.pack) / len([w for w in all_wolves if w.pack]) if any(w.pack for w in all_wolves) else 0
 
         print(f"Generation {self.generation} - Wolves:")
@@ -196,103 +252,39 @@ class EvolutionManager:
         print(f"  Avg Fitness: {avg_fitness:.2f}")
         print(f"  Max Fitness: {max_fitness:.2f}")
         print(f"  Avg Pack Coordination: {avg_pack_coordination:.2f}")
+        self.report_cache()
 
         # Select elite wolves for breeding
         elite_size = max(2, len(all_wolves) // 4)
         elite = all_wolves[:elite_size]
-
-        # Create new wolf generation
-        new_wolves = []
-
-        # Keep some elite survivors (15% of target)
-        elite_survivors = min(len(elite), target_population // 7)
-        male_survivors = 0
-        female_survivors = 0
-
-        for survivor in elite:
-            if len(new_wolves) >= elite_survivors:
-                break
-            if ((survivor.gender == 'male' and male_survivors < elite_survivors // 2) or
-                (survivor.gender == 'female' and female_survivors < elite_survivors // 2) or
-                len(new_wolves) == elite_survivors - 1):
-
-                new_wolf = Wolf(
-                    random.uniform(50, self.world.width - 50),
-                    random.uniform(50, self.world.height - 50),
-                    self.world.width,
-                    self.world.height,
-                    survivor.gender
-                )
-                new_wolf.brain = survivor.brain.copy()
-                # Inherit pack traits
-                new_wolf.pack_loyalty = survivor.pack_loyalty
-                new_wolf.hunting_coordination = survivor.hunting_coordination
-                new_wolf.pack_dominance = survivor.pack_dominance
-
-                new_wolves.append(new_wolf)
-
-                if survivor.gender == 'male':
-                    male_survivors += 1
-                else:
-                    female_survivors += 1
+        survivors = self.elite_survivors(elite, target_population)
+        self.survivors[Wolf] = len(survivors)
 
         # Fill the rest through breeding
-        males_created = sum(1 for w in new_wolves if w.gender == 'male')
-        females_created = sum(1 for w in new_wolves if w.gender == 'female')
-
-        while len(new_wolves) < target_population:
-            # Determine child gender to maintain balance
-            if males_created < target_population // 2:
-                child_gender = 'male'
-                males_created += 1
-            elif females_created < target_population // 2:
-                child_gender = 'female'
-                females_created += 1
-            else:
-                child_gender = random.choice(['male', 'female'])
-
-            if len(elite) >= 2 and random.random() < 0.8:  # 80% crossover
-                # Prefer breeding within successful packs
-                male_parents = [w for w in elite if w.gender == 'male']
-                female_parents = [w for w in elite if w.gender == 'female']
-
-                if male_parents and female_parents:
-                    parent1 = random.choices(male_parents, weights=[w.fitness + 1 for w in male_parents])[0]
-                    parent2 = random.choices(female_parents, weights=[w.fitness + 1 for w in female_parents])[0]
-                else:
-                    parent1, parent2 = random.choices(elite, k=2, weights=[w.fitness + 1 for w in elite])
-
-                child_brain = crossover(parent1.brain, parent2.brain)
-
-                # Inherit pack traits from both parents
-                child_pack_loyalty = (parent1.pack_loyalty + parent2.pack_loyalty) / 2 + random.uniform(-0.1, 0.1)
-                child_hunting_coordination = (parent1.hunting_coordination + parent2.hunting_coordination) / 2 + random.uniform(-0.1, 0.1)
-                child_pack_dominance = (parent1.pack_dominance + parent2.pack_dominance) / 2 + random.uniform(-0.2, 0.2)
-            else:  # 20% mutation
-                parent = random.choices(elite, k=1, weights=[w.fitness + 1 for w in elite])[0]
-                child_brain = parent.brain.copy()
-
-                child_pack_loyalty = parent.pack_loyalty + random.uniform(-0.1, 0.1)
-                child_hunting_coordination = parent.hunting_coordination + random.uniform(-0.1, 0.1)
-                child_pack_dominance = parent.pack_dominance + random.uniform(-0.2, 0.2)
-
-            # Create new wolf
-            child = Wolf(
-                random.uniform(50, self.world.width - 50),
-                random.uniform(50, self.world.height - 50),
-                self.world.width,
-                self.world.height,
-                child_gender
-            )
-            child.brain = child_brain
-            child.brain.mutate(mutation_rate=0.1, mutation_strength=0.15)
-
+        genomes, shapes = genome_matrix(elite)
+        genders = child_genders(target_population - len(survivors),
+                                sum(1 for i in survivors if elite[i].gender == 'male'),
+                                sum(1 for i in survivors if elite[i].gender == 'female'),
+                                target_population, self.rng)
+        children, first, second = breed(genomes, fitness[:elite_size],
+                                        [GENDERS.index(w.gender) for w in elite], len(genders), shapes,
+                                        self.rng, mutation_rate=0.1, mutation_strength=0.15,
+                                        uniform=self.uniform_crossover)
+
+        new_wolves = Wolf.brood(target_population, self.world.width, self.world.height,
+                                [elite[i].gender for i in survivors] +
+                                [GENDERS[code] for code in genders], self.rng)
+        give_genomes(new_wolves, np.concatenate([genomes[survivors], children]), shapes)
+
+        # Survivors keep their pack traits, children inherit the mean of both
+        # parents' (a copied parent counts twice) with some noise
+        for trait, spread in (('pack_loyalty', 0.1), ('hunting_coordination', 0.1), ('pack_dominance', 0.2)):
+            values = np.array([getattr(w, trait) for w in elite])
+            inherited = (values[first] + values[second]) / 2 + self.rng.uniform(-spread, spread, len(first))
             # Clamp inherited traits
-            child.pack_loyalty = max(0.1, min(1.0, child_pack_loyalty))
-            child.hunting_coordination = max(0.1, min(1.0, child_hunting_coordination))
-            child.pack_dominance = max(0.1, min(1.0, child_pack_dominance))
-
-            new_wolves.append(child)
+            inherited = np.clip(inherited, 0.1, 1.0)
+            for wolf, value in zip(new_wolves, values[survivors].tolist() + inherited.tolist()):
+                setattr(wolf, trait, value)
 
         # Clear old packs and create new ones
         self.world.packs.clear()
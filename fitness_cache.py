@@ -0,0 +1,86 @@
+import hashlib
+from collections import OrderedDict
+
+# Fitness history of genomes across generations (episodes). Elite survivors
+# carry their genome into the next generation bit for bit, so a hash of the
+# genome's bytes recognises them: every generation they live through adds to
+# the same record, and selection can rank them by their mean fitness over all
+# of them rather than by one noisy generation. The least recently seen
+# genomes are evicted once the cache holds `capacity` of them.
+
+
+def genome_key(species, genome):
+    # Cache key of one genome (a row of the genome matrix)
+    return f"{species}:{hashlib.blake2b(genome.tobytes(), digest_size=16).hexdigest()}"
+
+
+class FitnessCache:
+    # average: rank animals by their genome's mean fitness over every
+    # generation it lived (EvolutionManager.selection_fitness) instead of by
+    # the last one alone
+    def __init__(self, capacity=10000, average=False):
+        self.capacity = capacity
+        self.average = average
+        self.records = OrderedDict()  # key -> [episodes, total, best, last], least recent first
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self.records)
+
+    def record(self, key, fitness):
+        # Add one generation's fitness to the genome's record. Returns its
+        # mean fitness so far.
+        fitness = float(fitness)
+        record = self.records.get(key)
+        if record is None:
+            self.misses += 1
+            record = self.records[key] = [0, 0.0, fitness, fitness]
+            if len(self.records) > self.capacity:
+                self.records.popitem(last=False)
+                self.evictions += 1
+        else:
+            self.hits += 1
+            self.records.move_to_end(key)
+        record[0] += 1
+        record[1] += fitness
+        record[2] = max(record[2], fitness)
+        record[3] = fitness
+        return record[1] / record[0]
+
+    @property
+    def hit_rate(self):
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def stats(self):
+        return {
+            'genomes': len(self.records),
+            'capacity': self.capacity,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_rate': self.hit_rate,
+        }
+
+    def export(self):
+        # JSON-friendly state, for checkpoints
+        return {
+            'capacity': self.capacity,
+            'average': self.average,
+            'records': [[key] + record for key, record in self.records.items()],
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+        }
+
+    @classmethod
+    def restore(cls, state):
+        cache = cls(state['capacity'], state['average'])
+        for key, *record in state['records']:
+            cache.records[key] = record
+        cache.hits = state['hits']
+        cache.misses = state['misses']
+        cache.evictions = state['evictions']
+        return cache
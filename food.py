@@ -0,0 +1,125 @@
+import numpy as np
+from spatial import PLANE, pairs_within
+
+FOOD_ENERGY = 30
+
+
+class FoodField:
+    # Every food item as one row of typed arrays. Eaten food is only marked
+    # (alive False) until compact() at the end of the tick, so rows stay put
+    # for the whole tick and are kept in the order the food was spawned in.
+    def __init__(self, capacity=64, space=PLANE):
+        self.space = space
+        self.data = {
+            'x': np.zeros(capacity),
+            'y': np.zeros(capacity),
+            'energy': np.zeros(capacity),
+            'alive': np.zeros(capacity, dtype=bool),
+        }
+        self.size = 0
+        # Food handed to a distance test so far, read by the profiler
+        self.distance_checks = 0
+        # Neighbouring domains' food near the border when the world is split
+        # (domains.py): arrays x, y, owner and row. Halo items count after the field's
+        # own rows wherever an index can point at either.
+        self.halo = None
+
+    def __len__(self):
+        return self.size
+
+    def __getitem__(self, name):
+        return self.data[name][:self.size]
+
+    @property
+    def capacity(self):
+        return len(self.data['x'])
+
+    def reserve(self, count):
+        if count <= self.capacity:
+            return
+        capacity = max(count, self.capacity * 2)
+        for name, array in self.data.items():
+            grown = np.zeros(capacity, dtype=array.dtype)
+            grown[:self.size] = array[:self.size]
+            self.data[name] = grown
+
+    def add(self, xs, ys, energy=FOOD_ENERGY):
+        # Append one row per position, in order
+        count = len(xs)
+        self.reserve(self.size + count)
+        rows = slice(self.size, self.size + count)
+        self.data['x'][rows] = xs
+        self.data['y'][rows] = ys
+        self.data['energy'][rows] = energy
+        self.data['alive'][rows] = True
+        self.size += count
+
+    def living_rows(self):
+        return np.flatnonzero(self['alive'])
+
+    def compact(self):
+        # Drop the eaten rows, keeping the order of the rest
+        kept_rows = self.living_rows()
+        if len(kept_rows) == self.size:
+            return
+        for array in self.data.values():
+            array[:len(kept_rows)] = array[kept_rows]
+        self.size = len(kept_rows)
+
+    def targets(self):
+        # Positions of the uneaten food, then of the halo's
+        rows = self.living_rows()
+        if self.halo is None:
+            return self['x'][rows], self['y'][rows]
+        return (np.concatenate((self['x'][rows], self.halo['x'])),
+                np.concatenate((self['y'][rows], self.halo['y'])))
+
+    def feed(self, xs, ys, reach):
+        # Resolve who eats what: every eater, in order, takes the first
+        # (lowest row) uneaten food within reach that no earlier eater took.
+        # Returns (eaters, rows) pairs, one per item eaten, and marks the food
+        # eaten. Rows from self.size on are halo items, which are left to
+        # their owner.
+        #
+        # Rather than walking the eaters one by one this settles them in
+        # rounds. Each unsettled eater proposes its first food still free;
+        # the proposal is final when no earlier unsettled eater can reach that
+        # food, because nobody before it can take it any more. The first
+        # unsettled eater always qualifies, so every round makes progress, and
+        # in practice a couple of rounds settle everyone.
+        rows = self.living_rows()
+        target_x, target_y = self.targets()
+        if self.halo is not None:
+            rows = np.concatenate((rows, self.size + np.arange(len(self.halo['x']))))
+        eaters, targets, _, checked = pairs_within(xs, ys, target_x, target_y, reach, self.space)
+        self.distance_checks += checked
+        targets = rows[targets]
+        order = np.lexsort((targets, eaters))
+        eaters, targets = eaters[order], targets[order]
+
+        slots = self.size if self.halo is None else self.size + len(self.halo['x'])
+        taken = np.zeros(slots, dtype=bool)
+        settled = np.zeros(len(xs), dtype=bool)
+        fed_eaters = []
+        fed_rows = []
+        while len(eaters):
+            free = ~taken[targets] & ~settled[eaters]
+            eaters, targets = eaters[free], targets[free]
+            if len(eaters) == 0:
+                break
+            first = np.flatnonzero(np.r_[True, eaters[1:] != eaters[:-1]])
+            earliest = np.full(slots, len(xs))
+            np.minimum.at(earliest, targets, eaters)
+            final = first[earliest[targets[first]] == eaters[first]]
+            taken[targets[final]] = True
+            settled[eaters[final]] = True
+            fed_eaters.append(eaters[final])
+            fed_rows.append(targets[final])
+
+        if not fed_eaters:
+            empty = np.zeros(0, dtype=np.int64)
+            return empty, empty
+        fed_eaters = np.concatenate(fed_eaters)
+        fed_rows = np.concatenate(fed_rows)
+        self.data['alive'][fed_rows[fed_rows < self.size]] = False
+        return fed_eaters, fed_rows
@@ -0,0 +1,166 @@
+import contextlib
+import io
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from world import World
+from evolution import EvolutionManager
+
+SPECIES = ('rabbits', 'foxes', 'wolves')
+TOPOLOGIES = ('ring', 'full')
+
+
+def neighbours(index, count, topology):
+    # Islands that `index` sends its migrants to
+    if count < 2:
+        return []
+    if topology == 'ring':
+        return [(index + 1) % count]
+    if topology == 'full':
+        return [other for other in range(count) if other != index]
+    raise ValueError(f"unknown topology {topology!r}, expected one of {TOPOLOGIES}")
+
+
+def species_stats(animals):
+    if not animals:
+        return {'population': 0, 'avg_fitness': 0.0, 'max_fitness': 0.0}
+    fitness = [float(a.fitness) for a in animals]
+    return {
+        'population': len(animals),
+        'avg_fitness': sum(fitness) / len(fitness),
+        'max_fitness': max(fitness),
+    }
+
+
+class Island:
+    # One independent World + EvolutionManager pair. The whole island is
+    # pickled to a worker process for every epoch and sent back afterwards.
+    def __init__(self, index, seed, width=800, height=600, champions=2):
+        self.index = index
+        self.keep_champions = champions
+        self.world = World(width=width, height=height, seed=seed)
+        self.evolution_manager = EvolutionManager(self.world)
+        self.champions = {species: [] for species in SPECIES}
+        self.history = []
+
+    def run_generations(self, count):
+        target = self.evolution_manager.generation + count
+        # Generation reports would interleave across workers, keep them quiet
+        with contextlib.redirect_stdout(io.StringIO()):
+            while self.evolution_manager.generation < target:
+                self.world.update()
+
+                if self.evolution_manager.should_evolve():
+                    self.end_generation()
+                    self.evolution_manager.evolve()
+
+                self.evolution_manager.prevent_extinction()
+        return self
+
+    def end_generation(self):
+        # Fitness resets with every evolve, so record the generation's results
+        # and best brains (fitness and a copy of the genome) just before it does
+        record = {
+            'generation': self.evolution_manager.generation,
+            'tick': self.world.tick,
+        }
+        for species in SPECIES:
+            animals = getattr(self.world, species)
+            record[species] = species_stats(animals)
+            ranked = sorted(animals, key=lambda a: a.fitness, reverse=True)
+            self.champions[species] = [(float(a.fitness), a.brain.get_weights().copy())
+                                       for a in ranked[:self.keep_champions]]
+        self.history.append(record)
+
+    def emigrants(self, count):
+        return {species: champions[:count] for species, champions in self.champions.items()}
+
+    def immigrate(self, migrants):
+        # Incoming brains replace the last animals of each population, which
+        # after an evolve are bred children rather than elite survivors. When
+        # more arrive than there are children (a full topology, small
+        # populations) only the fittest of them are taken.
+        for species, champions in migrants.items():
+            animals = getattr(self.world, species)
+            if not animals:
+                continue
+            children = len(animals) - self.evolution_manager.survivors.get(type(animals[0]), 0)
+            fittest = sorted(champions, key=lambda champion: champion[0], reverse=True)[:children]
+            for animal, (_, weights) in zip(reversed(animals), fittest):
+                animal.brain.set_weights(weights)
+
+    def summary(self):
+        return {
+            'island': self.index,
+            'seed': self.world.seed,
+            'generation': self.evolution_manager.generation,
+            'tick': self.world.tick,
+            'last_generation': self.history[-1] if self.history else None,
+        }
+
+
+def run_island(island, generations):
+    return island.run_generations(generations)
+
+
+class IslandModel:
+    # K islands evolve in parallel in a process pool. Every
+    # migration_interval generations each island sends its top `migrants`
+    # brains per species to its neighbours in the topology.
+    def __init__(self, islands=4, migration_interval=5, migrants=2, topology='ring',
+                 seed=None, width=800, height=600, workers=None):
+        if topology not in TOPOLOGIES:
+            raise ValueError(f"unknown topology {topology!r}, expected one of {TOPOLOGIES}")
+        self.migration_interval = migration_interval
+        self.migrants = migrants
+        self.topology = topology
+        self.workers = workers
+
+        # Independent, reproducible streams for every island
+        seeds = np.random.SeedSequence(seed).spawn(islands)
+        self.islands = [Island(i, int(s.generate_state(1)[0]), width, height, champions=migrants)
+                        for i, s in enumerate(seeds)]
+        self.epochs = 0
+
+    def run(self, epochs, on_epoch=None):
+        with ProcessPoolExecutor(max_workers=self.workers) as pool:
+            for _ in range(epochs):
+                self.islands = list(pool.map(run_island, self.islands,
+                                             [self.migration_interval] * len(self.islands)))
+                self.migrate()
+                self.epochs += 1
+                if on_epoch:
+                    on_epoch(self)
+        return self.stats()
+
+    def migrate(self):
+        outgoing = [island.emigrants(self.migrants) for island in self.islands]
+        incoming = [{species: [] for species in SPECIES} for _ in self.islands]
+        for source, migrants in enumerate(outgoing):
+            for target in neighbours(source, len(self.islands), self.topology):
+                for species, champions in migrants.items():
+                    incoming[target][species].extend(champions)
+
+        for island, migrants in zip(self.islands, incoming):
+            island.immigrate(migrants)
+
+    def stats(self):
+        islands = [island.summary() for island in self.islands]
+        overall = {}
+        for species in SPECIES:
+            results = [island['last_generation'][species] for island in islands
+                       if island['last_generation']]
+            if not results:
+                continue
+            overall[species] = {
+                'best_max_fitness': max(r['max_fitness'] for r in results),
+                'mean_avg_fitness': sum(r['avg_fitness'] for r in results) / len(results),
+                'population': sum(r['population'] for r in results),
+            }
+        return {
+            'epochs': self.epochs,
+            'topology': self.topology,
+            'migration_interval': self.migration_interval,
+            'migrants': self.migrants,
+            'islands': islands,
+            'overall': overall,
+        }
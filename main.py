@@ -1,10 +1,11 @@
 #!/usr/bin/env python3
 
 import sys
-import time
 from world import World
 from evolution import EvolutionManager
 from visualization import Visualizer
+from profiler import TickProfiler
+from snapshot import SnapshotBuffer, SimulationThread
 
 def main():
     print("Starting Neural Network Evolution Simulation...")
@@ -14,63 +15,48 @@ def main():
     print()
 
     # Create world and components
-    world = World(width=800, height=600)
+    # --profile times every tick phase, shows the slowest ones in the stats
+    # panel and writes the rolling stats to profile.json on exit
+    profiler = TickProfiler() if '--profile' in sys.argv else None
+    world = World(width=800, height=600, profiler=profiler)
     evolution_manager = EvolutionManager(world)
-    visualizer = Visualizer(width=800, height=600)
+    # --lod N draws a density heatmap instead of single animals once more
+    # than N are in view (zoom in with the mouse wheel to see them again)
+    lod_threshold = int(sys.argv[sys.argv.index('--lod') + 1]) if '--lod' in sys.argv else 3000
+    visualizer = Visualizer(width=800, height=600, lod_threshold=lod_threshold)
 
     print(f"Initial population: {len(world.rabbits)} rabbits, {len(world.foxes)} foxes")
     print("Starting simulation...")
 
-    # Main simulation loop
-    simulation_speed = 1  # Ticks per frame (slower updates)
-    frame_rate = 30  # Lower frame rate for more detailed observation
+    # The simulation runs in its own thread, as fast as it goes unless
+    # --tps N caps it at N ticks per second; the window draws the latest
+    # snapshot of it at its own frame rate
+    ticks_per_second = float(sys.argv[sys.argv.index('--tps') + 1]) if '--tps' in sys.argv else None
+    frame_rate = 30
+    buffer = SnapshotBuffer()
+    simulation = SimulationThread(world, evolution_manager, buffer, ticks_per_second)
+    simulation.start()
 
     try:
-        while visualizer.running:
+        while visualizer.running and simulation.is_alive():
             # Handle input events
             if not visualizer.handle_events():
                 break
-
-            # Update simulation if not paused
-            if not visualizer.paused:
-                for _ in range(simulation_speed):
-                    world.update()
-
-                    # Check for evolution
-                    if evolution_manager.should_evolve():
-                        print(f"\nTriggering evolution at tick {world.tick}")
-                        evolution_manager.evolve()
-
-                    # Prevent empty populations
-                    if len(world.rabbits) == 0:
-                        print("Rabbits extinct! Respawning...")
-                        from animals import Rabbit
-                        world.rabbits = evolution_manager.create_random_population(20, Rabbit)
-
-                    if len(world.foxes) == 0:
-                        print("Foxes extinct! Respawning...")
-                        from animals import Fox
-                        world.foxes = evolution_manager.create_random_population(8, Fox)
-
-                    if len(world.wolves) == 0:
-                        print("Wolves extinct! Respawning...")
-                        from animals import Wolf
-                        world.wolves = evolution_manager.create_random_population(6, Wolf)
-                        world.create_initial_packs()
+            simulation.paused = visualizer.paused
 
             # Update display
-            visualizer.update_display(world, evolution_manager, frame_rate)
-
-            # Print periodic stats
-            if world.tick % 1000 == 0 and world.tick > 0:
-                stats = world.get_stats()
-                print(f"Tick {stats['tick']:,} - Gen {stats['generation']} - "
-                      f"Rabbits: {stats['rabbits']}, Foxes: {stats['foxes']}, Food: {stats['food']}")
+            visualizer.update_display(buffer.latest(), frame_rate)
 
     except KeyboardInterrupt:
         print("\nSimulation interrupted by user")
 
     finally:
+        # The world is only safe to read once the simulation has stopped
+        simulation.stop()
+        simulation.join()
+        if simulation.error is not None:
+            raise simulation.error
+
         # Final statistics
         print(f"\n=== SIMULATION COMPLETE ===")
         stats = world.get_stats()
@@ -88,6 +74,10 @@ def main():
             best_fox = max(world.foxes, key=lambda f: f.fitness)
             print(f"  Best Fox - Fitness: {best_fox.fitness:.2f}, Kills: {best_fox.kills}, Children: {best_fox.children}")
 
+        if profiler:
+            profiler.dump('profile.json')
+            print("  Tick profile written to profile.json")
+
         visualizer.cleanup()
 
 if __name__ == "__main__":
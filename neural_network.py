@@ -1,25 +1,75 @@
+import functools
 import numpy as np
-import random
+
+GENOME_DTYPE = np.float32
+
+
+def genome_layout(layer_shapes):
+    # (weights slice, biases slice) of every layer within the flat genome,
+    # laid out as layer 0 weights, layer 0 biases, layer 1 weights, ...
+    return _genome_layout(tuple(tuple(shape) for shape in layer_shapes))
+
+
+@functools.lru_cache(maxsize=None)
+def _genome_layout(layer_shapes):
+    layout = []
+    offset = 0
+    for n_in, n_out in layer_shapes:
+        weights = slice(offset, offset + n_in * n_out)
+        offset = weights.stop
+        biases = slice(offset, offset + n_out)
+        offset = biases.stop
+        layout.append((weights, biases))
+    return tuple(layout)
+
+
+def genome_size(layer_shapes):
+    return sum(n_in * n_out + n_out for n_in, n_out in layer_shapes)
+
 
 class NeuralNetwork:
-    def __init__(self, input_size, hidden_sizes, output_size):
-        self.layers = []
-        prev_size = input_size
-
-        for hidden_size in hidden_sizes:
-            self.layers.append({
-                'weights': np.random.randn(prev_size, hidden_size) * 0.5,
-                'biases': np.random.randn(hidden_size) * 0.5
-            })
-            prev_size = hidden_size
-
-        self.layers.append({
-            'weights': np.random.randn(prev_size, output_size) * 0.5,
-            'biases': np.random.randn(output_size) * 0.5
-        })
+    # All parameters live in one contiguous float32 vector, the genome. The
+    # per-layer 'weights'/'biases' arrays are views into it, so the genome is
+    # what gets copied, crossed over, mutated and saved.
+    # rng is a numpy Generator; pass the World's so runs are reproducible
+    def __init__(self, input_size, hidden_sizes, output_size, rng=None):
+        rng = rng if rng is not None else np.random.default_rng()
+        sizes = [input_size] + list(hidden_sizes) + [output_size]
+        self._bind(np.empty(genome_size(zip(sizes, sizes[1:])), dtype=GENOME_DTYPE),
+                   list(zip(sizes, sizes[1:])))
+
+        for layer in self.layers:
+            layer['weights'][...] = rng.standard_normal(layer['weights'].shape) * 0.5
+            layer['biases'][...] = rng.standard_normal(layer['biases'].shape) * 0.5
+
+    @classmethod
+    def from_genome(cls, genome, layer_shapes):
+        # Wraps genome without copying it (it may be a row of a BrainBank)
+        network = cls.__new__(cls)
+        network._bind(genome, layer_shapes)
+        return network
+
+    def _bind(self, genome, layer_shapes):
+        self.genome = genome
+        self.shapes = [tuple(shape) for shape in layer_shapes]
+        layout = genome_layout(self.shapes)
+        self.layers = [{'weights': genome[w].reshape(shape), 'biases': genome[b]}
+                       for shape, (w, b) in zip(self.shapes, layout)]
+        # Per-layer weight and bias blocks, the units mutate() works on
+        self.blocks = [block for pair in layout for block in pair]
+
+    # Pickle the genome only, the layer views are rebuilt on load
+    def __getstate__(self):
+        return {'genome': self.genome, 'shapes': self.shapes}
+
+    def __setstate__(self, state):
+        self._bind(state['genome'], state['shapes'])
+
+    def layer_shapes(self):
+        return list(self.shapes)
 
     def forward(self, inputs):
-        x = np.array(inputs)
+        x = np.asarray(inputs, dtype=GENOME_DTYPE)
 
         for layer in self.layers[:-1]:
             x = np.tanh(np.dot(x, layer['weights']) + layer['biases'])
@@ -30,48 +80,94 @@ class NeuralNetwork:
         return x
 
     def get_weights(self):
-        weights = []
-        for layer in self.layers:
-            weights.extend(layer['weights'].flatten())
-            weights.extend(layer['biases'].flatten())
-        return np.array(weights)
+        # The genome itself, not a copy
+        return self.genome
 
     def set_weights(self, weights):
-        idx = 0
-        for layer in self.layers:
-            w_size = layer['weights'].size
-            b_size = layer['biases'].size
+        # Write in place, the genome may be a row of a BrainBank
+        self.genome[...] = weights
 
-            layer['weights'] = weights[idx:idx+w_size].reshape(layer['weights'].shape)
-            idx += w_size
+    def mutate(self, mutation_rate=0.1, mutation_strength=0.3, rng=None):
+        # Each layer's weight block and bias block is perturbed as a whole
+        # with probability mutation_rate
+        rng = rng if rng is not None else np.random.default_rng()
+        for block in self.blocks:
+            if rng.random() < mutation_rate:
+                self.genome[block] += rng.standard_normal(block.stop - block.start) * mutation_strength
 
-            layer['biases'] = weights[idx:idx+b_size].reshape(layer['biases'].shape)
-            idx += b_size
+    def copy(self):
+        return NeuralNetwork.from_genome(self.genome.copy(), self.shapes)
 
-    def mutate(self, mutation_rate=0.1, mutation_strength=0.3):
-        for layer in self.layers:
-            if random.random() < mutation_rate:
-                layer['weights'] += np.random.randn(*layer['weights'].shape) * mutation_strength
-            if random.random() < mutation_rate:
-                layer['biases'] += np.random.randn(*layer['biases'].shape) * mutation_strength
 
-    def copy(self):
-        new_nn = NeuralNetwork(0, [], 0)
-        new_nn.layers = []
-        for layer in self.layers:
-            new_nn.layers.append({
-                'weights': layer['weights'].copy(),
-                'biases': layer['biases'].copy()
-            })
-        return new_nn
-
-def crossover(parent1, parent2):
-    weights1 = parent1.get_weights()
-    weights2 = parent2.get_weights()
-
-    crossover_point = random.randint(0, len(weights1))
-    child_weights = np.concatenate([weights1[:crossover_point], weights2[crossover_point:]])
-
-    child = parent1.copy()
-    child.set_weights(child_weights)
-    return child
\ No newline at end of file
+class BrainBank:
+    # Every genome of one species as a row of a (capacity x genome size)
+    # matrix, row i being the brain of the animal in row i of its Population.
+    # weights[k]/biases[k] are (capacity x in x out)/(capacity x out) views of
+    # layer k across all rows, for the batched forward pass. Networks handed
+    # out by network() are views too, so mutating them writes into the bank.
+    def __init__(self, layer_shapes, capacity=64):
+        self.shapes = [tuple(shape) for shape in layer_shapes]
+        self._bind(np.zeros((capacity, genome_size(self.shapes)), dtype=GENOME_DTYPE))
+
+    @classmethod
+    def like(cls, network, capacity=64):
+        return cls(network.layer_shapes(), capacity)
+
+    def _bind(self, genomes):
+        self.genomes = genomes
+        layout = genome_layout(self.shapes)
+        self.weights = [genomes[:, w].reshape((len(genomes),) + shape)
+                        for shape, (w, _) in zip(self.shapes, layout)]
+        self.biases = [genomes[:, b] for _, b in layout]
+
+    def __getstate__(self):
+        return {'genomes': self.genomes, 'shapes': self.shapes}
+
+    def __setstate__(self, state):
+        self.shapes = state['shapes']
+        self._bind(state['genomes'])
+
+    @property
+    def capacity(self):
+        return len(self.genomes)
+
+    @property
+    def input_size(self):
+        return self.shapes[0][0]
+
+    def reserve(self, capacity, size):
+        # Grow to capacity rows, keeping the first size
+        if capacity <= self.capacity:
+            return
+        grown = np.zeros((capacity, self.genomes.shape[1]), dtype=GENOME_DTYPE)
+        grown[:size] = self.genomes[:size]
+        self._bind(grown)
+
+    def store(self, row, network):
+        self.genomes[row] = network.genome
+
+    def network(self, row):
+        return NeuralNetwork.from_genome(self.genomes[row], self.shapes)
+
+    def compact(self, kept_rows):
+        self.genomes[:len(kept_rows)] = self.genomes[kept_rows]
+
+    def forward(self, inputs):
+        # Batched NeuralNetwork.forward for rows 0..len(inputs)-1
+        n = len(inputs)
+        x = np.asarray(inputs, dtype=GENOME_DTYPE)
+
+        for weights, biases in zip(self.weights[:-1], self.biases[:-1]):
+            x = np.tanh(np.einsum('ni,nio->no', x, weights[:n]) + biases[:n])
+
+        # Output layer with sigmoid activation
+        x = np.einsum('ni,nio->no', x, self.weights[-1][:n]) + self.biases[-1][:n]
+        return 1 / (1 + np.exp(-x))
+
+def crossover(parent1, parent2, rng=None):
+    # Single-point crossover of the two genomes
+    rng = rng if rng is not None else np.random.default_rng()
+    genome = parent2.genome.copy()
+    crossover_point = rng.integers(0, len(genome) + 1)
+    genome[:crossover_point] = parent1.genome[:crossover_point]
+    return NeuralNetwork.from_genome(genome, parent1.shapes)
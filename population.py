@@ -0,0 +1,342 @@
+import math
+import numpy as np
+from neural_network import BrainBank, NeuralNetwork
+from spatial import PLANE, pairs_within, nearest_of_pairs
+
+GENDERS = ('male', 'female')
+
+
+class Column:
+    # Attribute that lives in the species' Population arrays while the animal
+    # belongs to a world, and on the instance itself while it is detached
+    # (newborns, freshly bred generations, the dead)
+    def __init__(self, dtype=np.float64):
+        self.dtype = dtype
+
+    def __set_name__(self, owner, name):
+        self.name = name
+
+    def __get__(self, animal, owner=None):
+        if animal is None:
+            return self
+        population = animal._population
+        if population is None:
+            try:
+                return animal.__dict__[self.name]
+            except KeyError:
+                raise AttributeError(self.name) from None
+        return population.data[self.name][animal._row]
+
+    def __set__(self, animal, value):
+        population = animal._population
+        if population is None:
+            animal.__dict__[self.name] = value
+        else:
+            population.data[self.name][animal._row] = value
+
+    def encode(self, value):
+        return value
+
+    def decode(self, value):
+        return value.item()
+
+    def decode_all(self, values):
+        return values.tolist()
+
+
+class GenderColumn(Column):
+    # Stored as an index into GENDERS so masks can be built without strings
+    def __init__(self):
+        super().__init__(np.int8)
+
+    def __get__(self, animal, owner=None):
+        if animal is None or animal._population is None:
+            return super().__get__(animal, owner)
+        return GENDERS[animal._population.data[self.name][animal._row]]
+
+    def __set__(self, animal, value):
+        if animal._population is None:
+            super().__set__(animal, value)
+        else:
+            super().__set__(animal, GENDERS.index(value))
+
+    def encode(self, value):
+        return GENDERS.index(value)
+
+    def decode(self, value):
+        return GENDERS[value]
+
+    def decode_all(self, values):
+        return [GENDERS[code] for code in values.tolist()]
+
+
+def columns_of(animal_class):
+    columns = {}
+    for klass in reversed(animal_class.__mro__):
+        for name, value in vars(klass).items():
+            if isinstance(value, Column):
+                columns[name] = value
+    return columns
+
+
+class Population:
+    # Columnar store for one species. Row i holds the state of agents[i]; the
+    # animal objects themselves only remember their row.
+    def __init__(self, animal_class, capacity=64, space=PLANE):
+        self.animal_class = animal_class
+        # Geometry of the world the species lives in, see spatial.Space
+        self.space = space
+        self.columns = columns_of(animal_class)
+        self.data = {name: np.zeros(capacity, dtype=column.dtype)
+                     for name, column in self.columns.items()}
+        self.brains = None  # BrainBank, created from the first brain added
+        self.agents = []
+        self.size = 0
+        self.mates = np.empty(0, dtype=np.int64)  # Mating index, see index_mates()
+        # Neighbouring domains' animals near the border when the world is
+        # split (domains.py): arrays x, y, gender, eligible (could mate),
+        # alive, owner and row, plus one domains.Ghost per halo row. Halo rows
+        # count after the population's own rows wherever an index can point
+        # at either.
+        self.halo = None
+        self.ghosts = []
+
+    def __len__(self):
+        return self.size
+
+    def __getitem__(self, name):
+        return self.data[name][:self.size]
+
+    @property
+    def capacity(self):
+        return len(self.data['x'])
+
+    def reserve(self, count):
+        if count <= self.capacity:
+            return
+        capacity = max(count, self.capacity * 2)
+        for name, array in self.data.items():
+            grown = np.zeros(capacity, dtype=array.dtype)
+            grown[:self.size] = array[:self.size]
+            self.data[name] = grown
+        if self.brains is not None:
+            self.brains.reserve(capacity, self.size)
+
+    def add(self, animal):
+        if animal._population is not None:
+            raise ValueError("animal already belongs to a population")
+        self.reserve(self.size + 1)
+        row = self.size
+        for name, column in self.columns.items():
+            self.data[name][row] = column.encode(animal.__dict__.pop(name))
+        brain = animal.__dict__.pop('brain')
+        if self.brains is None:
+            self.brains = BrainBank.like(brain, self.capacity)
+        self.brains.store(row, brain)
+        animal._population = self
+        animal._row = row
+        self.agents.append(animal)
+        self.size += 1
+
+    def extend(self, animals):
+        self.reserve(self.size + len(animals))
+        for animal in animals:
+            self.add(animal)
+
+    def reset(self, animals):
+        self.clear()
+        self.extend(animals)
+
+    def clear(self):
+        # detach() for everyone, reading each column back in one go
+        if self.size:
+            names = list(self.columns)
+            rows = zip(*(self.columns[name].decode_all(self[name]) for name in names))
+            genomes = self.brains.genomes[:self.size].copy()
+            for row, (animal, values) in enumerate(zip(self.agents, rows)):
+                animal.__dict__.update(zip(names, values))
+                animal.__dict__['brain'] = NeuralNetwork.from_genome(genomes[row], self.brains.shapes)
+                animal._population = None
+                animal._row = None
+        self.agents = []
+        self.size = 0
+        self.mates = np.empty(0, dtype=np.int64)
+
+    def detach(self, animal):
+        # Copy the row back onto the instance so the object stays usable
+        row = animal._row
+        for name, column in self.columns.items():
+            animal.__dict__[name] = column.decode(self.data[name][row])
+        animal.__dict__['brain'] = self.brains.network(row).copy()
+        animal._population = None
+        animal._row = None
+
+    def compact(self, keep):
+        # Drop every row where keep is False in one pass, preserving the order
+        # of the survivors. Returns the dropped (now detached) animals.
+        dropped_rows = np.flatnonzero(~keep)
+        if len(dropped_rows) == 0:
+            return []
+        dropped = [self.agents[row] for row in dropped_rows]
+        for animal in dropped:
+            self.detach(animal)
+
+        kept_rows = np.flatnonzero(keep)
+        for name, array in self.data.items():
+            array[:len(kept_rows)] = array[kept_rows]
+        self.brains.compact(kept_rows)
+        self.agents = [self.agents[row] for row in kept_rows]
+        for row, animal in enumerate(self.agents):
+            animal._row = row
+        self.size = len(kept_rows)
+        self.mates = np.empty(0, dtype=np.int64)  # Rows have moved
+        return dropped
+
+    def export(self):
+        # Live rows of every column and the brain genomes, keyed by name
+        state = {name: self[name] for name in self.data}
+        if self.brains is not None:
+            state['brain.genome'] = self.brains.genomes[:self.size]
+        return state
+
+    def restore(self, agents, state, brains):
+        # Inverse of export(). agents are bare animal objects, one per row;
+        # brains is an empty BrainBank of the right shape if none exists yet.
+        self.clear()
+        if self.brains is None:
+            self.brains = brains
+        size = len(agents)
+        self.reserve(size)
+        for name, array in self.data.items():
+            array[:size] = state[name]
+        self.brains.genomes[:size] = state['brain.genome']
+        for row, animal in enumerate(agents):
+            animal._population = self
+            animal._row = row
+        self.agents = list(agents)
+        self.size = size
+
+    # Vectorized lifecycle passes. Each one is the whole-species version of
+    # what Animal.update used to do for a single animal.
+
+    def advance(self, energy_decay=0.2):
+        # Ageing, energy decay and breeding timers. Returns the mask of
+        # mothers that reach the end of their pregnancy this tick.
+        self['age'][:] += 1
+        self['energy'][:] -= energy_decay  # Slower energy loss
+
+        cooldown = self['mating_cooldown']
+        cooldown[cooldown > 0] -= 1
+
+        pregnancy_time = self['pregnancy_time']
+        gestating = pregnancy_time > 0
+        pregnancy_time[gestating] -= 1
+        return gestating & (pregnancy_time == 0) & self['is_pregnant']
+
+    def can_reproduce(self):
+        return ((self['energy'] > 120) & (self['age'] > 200) &
+                (self['mating_cooldown'] == 0) & ~self['is_pregnant'])
+
+    def index_mates(self, mating_range):
+        # The mating index for this tick: a partner for every mate seeking
+        # row at once, kept in self.mates (the mate's row or -1) for
+        # both sensing and World.handle_species_mating. Seekers of each gender
+        # are bucketed against the other gender's rows that can reproduce, and
+        # the nearest one within mating_range that is not the seeker's last
+        # mate wins. Returns the distance checks made.
+        mates = np.full(self.size, -1, dtype=np.int64)
+        alive = self['alive']
+        seeking = self['mate_seeking'] & alive
+        eligible = self.partners()
+        gender = self.with_halo('gender')
+        x, y = self.with_halo('x'), self.with_halo('y')
+        checked = 0
+        for code in range(len(GENDERS)):
+            seekers = np.flatnonzero(seeking & (gender[:self.size] == code))
+            partners = np.flatnonzero(eligible & (gender != code))
+            if len(seekers) == 0 or len(partners) == 0:
+                continue
+            points, targets, dists, found = pairs_within(
+                x[seekers], y[seekers], x[partners], y[partners], mating_range, self.space)
+            checked += found
+            targets = partners[targets]
+            last_mates = np.array([self.row_of(self.agents[row].last_mate) for row in seekers.tolist()],
+                                  dtype=np.int64)
+            fresh = targets != last_mates[points]
+            mates[seekers], _ = nearest_of_pairs(len(seekers), points[fresh], targets[fresh], dists[fresh])
+        self.mates = mates
+        return checked
+
+    def with_halo(self, name):
+        # A column followed by the halo's values, for indexes that may point
+        # at ghosts
+        if self.halo is None:
+            return self[name]
+        return np.concatenate((self[name], self.halo[name].astype(self[name].dtype)))
+
+    def partners(self):
+        # Who could be mated with right now: own rows and halo rows
+        eligible = self.can_reproduce() & self['alive']
+        if self.halo is None:
+            return eligible
+        return np.concatenate((eligible, self.halo['eligible'] & self.halo['alive']))
+
+    def row_of(self, animal):
+        if animal is None or animal._population is not self:
+            return -1
+        return animal._row
+
+    def update_mate_seeking(self, active):
+        self['mate_seeking'][active] = self.can_reproduce()[active]
+
+    def move(self, active):
+        direction = self['direction'][active]
+        speed = self['speed'][active]
+        self['x'][active] += np.cos(direction) * speed
+        self['y'][active] += np.sin(direction) * speed
+
+    def check_boundaries(self, active, width, height):
+        x = self['x']
+        y = self['y']
+        direction = self['direction']
+
+        low = active & (x < 0)
+        high = active & (x >= width)
+        x[low] = 0
+        x[high] = width - 1
+        bounced = low | high
+        direction[bounced] = math.pi - direction[bounced]
+
+        low = active & (y < 0)
+        high = active & (y >= height)
+        y[low] = 0
+        y[high] = height - 1
+        bounced = low | high
+        direction[bounced] = -direction[bounced]
+
+    def wrap_around(self, rows, width, height):
+        # Torus edges: whoever crossed one comes in on the opposite side
+        for name, size in (('x', width), ('y', height)):
+            values = self[name]
+            wrapped = values[rows] % size
+            wrapped[wrapped >= size] = 0  # -1e-17 % size rounds up to size
+            values[rows] = wrapped
+
+    def update_fitness(self, active):
+        self['fitness'][active] += np.where(self['energy'][active] > 0, 0.1, -1)
+
+    def mark_deaths(self):
+        # Tombstone animals that starved or aged out this tick. Returns the
+        # rows that just died; they stay in place until cull().
+        alive = self['alive']
+        died = alive & ((self['energy'] <= 0) | (self['age'] >= self['max_age']))
+        alive[died] = False
+        return np.flatnonzero(died)
+
+    def living_rows(self):
+        return np.flatnonzero(self['alive'])
+
+    def cull(self):
+        # Drop every tombstoned row (deaths and kills) in one pass, returns
+        # the animals removed (detached)
+        return self.compact(self['alive'].copy())
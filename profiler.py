@@ -0,0 +1,138 @@
+import csv
+import json
+import time
+from collections import deque
+
+
+class _NullPhase:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+NULL_PHASE = _NullPhase()
+
+
+class NullProfiler:
+    # What World and EvolutionManager hold when profiling is off: every hook is
+    # a no-op, so the instrumented code pays one method call per phase
+    enabled = False
+
+    def phase(self, name):
+        return NULL_PHASE
+
+    def count(self, name, amount=1):
+        pass
+
+    def end_tick(self, tick):
+        pass
+
+
+class _Phase:
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        profiler = self.profiler
+        elapsed = time.perf_counter() - self.start
+        profiler.times[self.name] = profiler.times.get(self.name, 0.0) + elapsed
+        profiler.calls[self.name] = profiler.calls.get(self.name, 0) + 1
+        return False
+
+
+class TickProfiler:
+    # Wall time and call counts per phase plus free-form counters (distance
+    # checks, brain evaluations), accumulated per tick and kept for the last
+    # `window` ticks
+    enabled = True
+
+    def __init__(self, window=200):
+        self.window = window
+        self.history = deque(maxlen=window)
+        self.times = {}
+        self.calls = {}
+        self.counters = {}
+        self.ticks = 0
+
+    def phase(self, name):
+        return _Phase(self, name)
+
+    def count(self, name, amount=1):
+        self.counters[name] = self.counters.get(name, 0) + amount
+
+    def end_tick(self, tick):
+        self.history.append({
+            'tick': tick,
+            'times': self.times,
+            'calls': self.calls,
+            'counters': self.counters,
+        })
+        self.times = {}
+        self.calls = {}
+        self.counters = {}
+        self.ticks += 1
+
+    def summary(self):
+        # Per-phase mean/max milliseconds and per-tick averages of every
+        # counter over the rolling window. Phases that only run now and then
+        # (evolution) are averaged over the ticks they ran in.
+        records = list(self.history)
+        phases = {}
+        for record in records:
+            for name, seconds in record['times'].items():
+                stats = phases.setdefault(name, {'ticks': 0, 'calls': 0, 'total_ms': 0.0, 'max_ms': 0.0})
+                stats['ticks'] += 1
+                stats['calls'] += record['calls'][name]
+                stats['total_ms'] += seconds * 1000
+                stats['max_ms'] = max(stats['max_ms'], seconds * 1000)
+        for stats in phases.values():
+            stats['mean_ms'] = stats['total_ms'] / stats['ticks']
+
+        counters = {}
+        for record in records:
+            for name, amount in record['counters'].items():
+                counters[name] = counters.get(name, 0) + amount
+        if records:
+            counters = {name: total / len(records) for name, total in counters.items()}
+
+        return {
+            'window': len(records),
+            'ticks_profiled': self.ticks,
+            'phases': phases,
+            'counters_per_tick': counters,
+        }
+
+    def top_phases(self, count=5):
+        phases = self.summary()['phases']
+        ranked = sorted(phases.items(), key=lambda item: item[1]['mean_ms'], reverse=True)
+        return [(name, stats['mean_ms']) for name, stats in ranked[:count]]
+
+    def to_json(self, path):
+        with open(path, 'w') as f:
+            json.dump(self.summary(), f, indent=2)
+
+    def to_csv(self, path):
+        # One row per tick in the window, one column per phase/counter
+        records = list(self.history)
+        phases = sorted({name for record in records for name in record['times']})
+        counters = sorted({name for record in records for name in record['counters']})
+        with open(path, 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(['tick'] + [f'{name}_ms' for name in phases] + counters)
+            for record in records:
+                writer.writerow([record['tick']] +
+                                [record['times'].get(name, 0.0) * 1000 for name in phases] +
+                                [record['counters'].get(name, 0) for name in counters])
+
+    def dump(self, path):
+        if path.endswith('.csv'):
+            self.to_csv(path)
+        else:
+            self.to_json(path)
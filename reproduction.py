@@ -0,0 +1,85 @@
+import numpy as np
+from neural_network import genome_layout
+from population import GENDERS
+
+# Genetic operators for a whole cohort at once. Genomes are the rows of a
+# (animals x genome size) matrix, the layout a BrainBank stores them in, and
+# every function works on all rows with a handful of array operations.
+
+MALE = GENDERS.index('male')
+FEMALE = GENDERS.index('female')
+
+
+def select(fitness, count, rng):
+    # Fitness-proportional choice with replacement, weights fitness + 1
+    weights = np.asarray(fitness, dtype=float) + 1
+    return rng.choice(len(weights), size=count, p=weights / weights.sum())
+
+
+def select_pairs(fitness, genders, count, rng):
+    # `count` breeding pairs: a male and a female when both are available,
+    # otherwise any two animals
+    males = np.flatnonzero(genders == MALE)
+    females = np.flatnonzero(genders == FEMALE)
+    if len(males) and len(females):
+        return (males[select(fitness[males], count, rng)],
+                females[select(fitness[females], count, rng)])
+    pairs = select(fitness, 2 * count, rng).reshape(count, 2)
+    return pairs[:, 0], pairs[:, 1]
+
+
+def crossover(first, second, rng, uniform=False):
+    # Row-wise crossover of two genome matrices: a single cut point per row,
+    # or with uniform=True an independent coin flip per gene
+    count, size = first.shape
+    if uniform:
+        take_first = rng.random((count, size)) < 0.5
+    else:
+        points = rng.integers(0, size + 1, count)
+        take_first = np.arange(size) < points[:, None]
+    return np.where(take_first, first, second)
+
+
+def mutate(genomes, layer_shapes, rate, strength, rng):
+    # In place. Each layer's weight block and bias block of each row gets
+    # Gaussian noise with probability rate, as in NeuralNetwork.mutate
+    blocks = [block for pair in genome_layout(layer_shapes) for block in pair]
+    hit = rng.random((len(genomes), len(blocks))) < rate
+    genes = np.repeat(hit, [block.stop - block.start for block in blocks], axis=1)
+    genomes[genes] += rng.standard_normal(np.count_nonzero(genes)) * strength
+    return genomes
+
+
+def breed(genomes, fitness, genders, count, layer_shapes, rng, crossover_rate=0.8,
+          mutation_rate=0.12, mutation_strength=0.18, uniform=False):
+    # Offspring of the elite in `genomes`. Each child is, with probability
+    # crossover_rate, the crossover of a fitness-selected breeding pair and
+    # otherwise a copy of one fitness-selected parent; every child is then
+    # mutated. Returns the child genomes and both parents' indexes (equal for
+    # copies).
+    fitness = np.asarray(fitness, dtype=float)
+    genders = np.asarray(genders)
+    first = select(fitness, count, rng)
+    second = first.copy()
+    if len(genomes) >= 2:
+        crossed = np.flatnonzero(rng.random(count) < crossover_rate)
+        if len(crossed):
+            first[crossed], second[crossed] = select_pairs(fitness, genders, len(crossed), rng)
+
+    children = crossover(genomes[first], genomes[second], rng, uniform)
+    mutate(children, layer_shapes, mutation_rate, mutation_strength, rng)
+    return children, first, second
+
+
+def child_genders(count, males, females, target, rng):
+    # Gender codes for `count` children joining `males` and `females`: males
+    # until there are target // 2, then females until there are target // 2,
+    # then a coin flip
+    boys = min(count, max(0, target // 2 - males))
+    girls = min(count - boys, max(0, target // 2 - females))
+    rest = count - boys - girls
+    return np.concatenate([
+        np.full(boys, MALE, dtype=np.int8),
+        np.full(girls, FEMALE, dtype=np.int8),
+        np.where(rng.random(rest) < 0.5, MALE, FEMALE).astype(np.int8),
+    ])
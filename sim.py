@@ -0,0 +1,355 @@
+#!/usr/bin/env python3
+
+# Headless entry point: python -m sim run --ticks N --seed S
+# Runs the simulation as fast as it goes, without pygame.
+
+import argparse
+import contextlib
+import json
+import sys
+import time
+import numpy as np
+from world import World
+from evolution import EvolutionManager
+from checkpoint import save_checkpoint, load_checkpoint
+from config import Config
+from fitness_cache import FitnessCache
+from profiler import TickProfiler
+from telemetry import Telemetry
+
+
+def agent_count(world):
+    return len(world.rabbits) + len(world.foxes) + len(world.wolves)
+
+
+def to_json(value):
+    # NumPy scalars leak out of the Population columns
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+def parse_settings(specs):
+    # ['name=value', ...] -> Config overrides
+    settings = {}
+    for spec in specs:
+        name, _, value = spec.partition('=')
+        settings[name] = float(value)
+    return settings
+
+
+def run(args):
+    # Everything but the final stats goes to stderr so stdout stays parseable
+    with contextlib.redirect_stdout(sys.stderr):
+        if args.resume:
+            world, evolution_manager = load_checkpoint(args.resume)
+            print(f"Resumed from {args.resume} at tick {world.tick:,}")
+        else:
+            world = World(width=args.width, height=args.height, seed=args.seed,
+                          config=Config(**parse_settings(args.set)), wrap=args.wrap,
+                          chunk_size=args.chunk_size, initial_rabbits=args.rabbits,
+                          initial_foxes=args.foxes, initial_wolves=args.wolves, initial_food=args.food)
+            evolution_manager = EvolutionManager(world)
+        if args.fitness_cache and evolution_manager.fitness_cache is None:
+            evolution_manager.fitness_cache = FitnessCache(args.fitness_cache, average=args.average_fitness)
+        if args.profile:
+            world.profiler = TickProfiler(window=args.profile_window)
+        if args.telemetry:
+            world.telemetry = Telemetry.to_path(args.telemetry, interval=args.telemetry_interval)
+
+        start = time.perf_counter()
+        last_report = start
+        ticks_at_report = 0
+        agent_ticks = 0
+        agent_ticks_at_report = 0
+
+        for tick in range(1, args.ticks + 1):
+            agent_ticks += agent_count(world)
+            world.update()
+
+            if evolution_manager.should_evolve():
+                print(f"\nTriggering evolution at tick {world.tick}")
+                evolution_manager.evolve()
+
+            evolution_manager.prevent_extinction()
+
+            if args.checkpoint and args.checkpoint_interval and tick % args.checkpoint_interval == 0:
+                # Whatever the checkpoint covers is on disk too, so a resumed
+                # run appends without gaps
+                world.telemetry.flush()
+                save_checkpoint(args.checkpoint, world, evolution_manager)
+
+            now = time.perf_counter()
+            if now - last_report >= args.report_interval:
+                elapsed = now - last_report
+                print(f"Tick {world.tick:,} - Gen {world.generation_count} - "
+                      f"{(tick - ticks_at_report) / elapsed:,.1f} ticks/s, "
+                      f"{(agent_ticks - agent_ticks_at_report) / elapsed:,.0f} agent-ticks/s, "
+                      f"{agent_count(world)} agents")
+                last_report = now
+                ticks_at_report = tick
+                agent_ticks_at_report = agent_ticks
+
+        elapsed = time.perf_counter() - start
+
+        world.telemetry.close()
+        if args.checkpoint:
+            save_checkpoint(args.checkpoint, world, evolution_manager)
+
+    result = {
+        'ticks': args.ticks,
+        'seed': world.seed,
+        'width': world.width,
+        'height': world.height,
+        'elapsed_seconds': elapsed,
+        'ticks_per_second': args.ticks / elapsed if elapsed > 0 else 0,
+        'agent_ticks_per_second': agent_ticks / elapsed if elapsed > 0 else 0,
+        'stats': world.get_stats(),
+    }
+    if evolution_manager.fitness_cache is not None:
+        result['fitness_cache'] = evolution_manager.fitness_cache.stats()
+    if args.profile:
+        result['profile'] = world.profiler.summary()
+        world.profiler.dump(args.profile)
+    print(json.dumps(result, indent=2, default=to_json))
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(result, f, indent=2, default=to_json)
+
+
+def islands(args):
+    from islands import IslandModel
+
+    model = IslandModel(islands=args.islands, migration_interval=args.generations,
+                        migrants=args.migrants, topology=args.topology, seed=args.seed,
+                        width=args.width, height=args.height, workers=args.workers)
+
+    start = time.perf_counter()
+
+    def report(model):
+        elapsed = time.perf_counter() - start
+        ticks = sum(island.world.tick for island in model.islands)
+        print(f"Epoch {model.epochs} - {ticks:,} island ticks, "
+              f"{ticks / elapsed:,.1f} ticks/s across {len(model.islands)} islands",
+              file=sys.stderr)
+
+    result = model.run(args.epochs, on_epoch=report)
+    result['elapsed_seconds'] = time.perf_counter() - start
+    print(json.dumps(result, indent=2, default=to_json))
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(result, f, indent=2, default=to_json)
+
+
+def domains(args):
+    from domains import Domains
+
+    with contextlib.redirect_stdout(sys.stderr):
+        world = Domains(strips=args.strips, processes=args.processes, width=args.width, height=args.height,
+                        seed=args.seed, config=Config(**parse_settings(args.set)), wrap=args.wrap,
+                        chunk_size=args.chunk_size, initial_rabbits=args.rabbits, initial_foxes=args.foxes,
+                        initial_wolves=args.wolves, initial_food=args.food)
+        try:
+            start = time.perf_counter()
+            last_report = start
+            ticks_at_report = 0
+            agent_ticks = 0
+            agent_ticks_at_report = 0
+
+            for tick in range(1, args.ticks + 1):
+                agent_ticks += sum(world.population_counts())
+                world.update()
+
+                if world.should_evolve():
+                    print(f"\nTriggering evolution at tick {world.world.tick}")
+                    world.evolve()
+
+                world.prevent_extinction()
+
+                now = time.perf_counter()
+                if now - last_report >= args.report_interval:
+                    elapsed = now - last_report
+                    print(f"Tick {world.world.tick:,} - Gen {world.world.generation_count} - "
+                          f"{(tick - ticks_at_report) / elapsed:,.1f} ticks/s, "
+                          f"{(agent_ticks - agent_ticks_at_report) / elapsed:,.0f} agent-ticks/s, "
+                          f"{sum(world.population_counts())} agents")
+                    last_report = now
+                    ticks_at_report = tick
+                    agent_ticks_at_report = agent_ticks
+
+            elapsed = time.perf_counter() - start
+            stats = world.get_stats()
+        finally:
+            world.close()
+
+    result = {
+        'ticks': args.ticks,
+        'seed': args.seed,
+        'width': args.width,
+        'height': args.height,
+        'strips': args.strips,
+        'elapsed_seconds': elapsed,
+        'ticks_per_second': args.ticks / elapsed if elapsed > 0 else 0,
+        'agent_ticks_per_second': agent_ticks / elapsed if elapsed > 0 else 0,
+        'stats': stats,
+    }
+    print(json.dumps(result, indent=2, default=to_json))
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(result, f, indent=2, default=to_json)
+
+
+def parse_space(specs, separator):
+    # ['name=a,b,c', ...] (grid values) or ['name=low:high', ...] (random bounds)
+    space = {}
+    for spec in specs:
+        name, _, values = spec.partition('=')
+        space[name] = [float(value) for value in values.split(separator)]
+    return space
+
+
+def sweep(args):
+    from sweep import Sweep, grid, random_search
+
+    if args.samples:
+        points = random_search(parse_space(args.param, ':'), args.samples, args.sample_seed)
+    else:
+        points = grid(parse_space(args.param, ','))
+    sweeper = Sweep(points, args.seeds, args.ticks, args.results,
+                    width=args.width, height=args.height, workers=args.workers)
+
+    start = time.perf_counter()
+    total = len(sweeper.runs)
+    done = total - len(sweeper.pending())
+    print(f"{total} runs, {done} already in {args.results}", file=sys.stderr)
+
+    def report(record):
+        nonlocal done
+        done += 1
+        print(f"[{done}/{total}] run {record['run_id']} seed {record['seed']} - "
+              f"{record['elapsed_seconds']:.1f}s, {record['rabbits']} rabbits, "
+              f"{record['foxes']} foxes, {record['wolves']} wolves", file=sys.stderr)
+
+    ran = sweeper.run(on_result=report)
+    print(f"Ran {ran} runs in {time.perf_counter() - start:.1f}s", file=sys.stderr)
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='python -m sim',
+                                     description="Neural evolution simulation without a display")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    run_parser = commands.add_parser('run', help="run the simulation headless")
+    run_parser.add_argument('--ticks', type=int, default=10000, help="ticks to simulate")
+    run_parser.add_argument('--seed', type=int, default=None, help="random seed")
+    run_parser.add_argument('--width', type=int, default=800, help="world width")
+    run_parser.add_argument('--height', type=int, default=600, help="world height")
+    run_parser.add_argument('--wrap', action='store_true',
+                            help="make the world a torus: animals leaving one edge enter the opposite one")
+    run_parser.add_argument('--chunk-size', type=int, default=None,
+                            help="spawn food per occupied chunk of this size instead of world-wide "
+                                 "(for large worlds)")
+    run_parser.add_argument('--rabbits', type=int, default=40, help="initial rabbits")
+    run_parser.add_argument('--foxes', type=int, default=12, help="initial foxes")
+    run_parser.add_argument('--wolves', type=int, default=8, help="initial wolves")
+    run_parser.add_argument('--food', type=int, default=30, help="initial food")
+    run_parser.add_argument('--set', action='append', default=[], metavar='NAME=VALUE',
+                            help="override a config.DEFAULTS parameter (kept in checkpoints)")
+    run_parser.add_argument('--fitness-cache', type=int, default=0, metavar='CAPACITY',
+                            help="keep the fitness history of up to this many genomes across "
+                                 "generations (kept in checkpoints)")
+    run_parser.add_argument('--average-fitness', action='store_true',
+                            help="with --fitness-cache, select by a genome's mean fitness over every "
+                                 "generation it lived")
+    run_parser.add_argument('--report-interval', type=float, default=5.0,
+                            help="seconds between throughput reports")
+    run_parser.add_argument('--output', help="also write the final stats JSON here")
+    run_parser.add_argument('--checkpoint', help="save the full simulation state here at the end")
+    run_parser.add_argument('--checkpoint-interval', type=int, default=0,
+                            help="also save the checkpoint every N ticks")
+    run_parser.add_argument('--resume', help="continue from a checkpoint instead of a new world "
+                                             "(--seed/--width/--height are taken from it)")
+    run_parser.add_argument('--profile', help="time every tick phase and write the rolling stats "
+                                              "here (.csv for per-tick rows, JSON otherwise)")
+    run_parser.add_argument('--profile-window', type=int, default=200,
+                            help="ticks kept in the rolling profile")
+    run_parser.add_argument('--telemetry', help="append World.get_stats() every --telemetry-interval "
+                                                "ticks here (.csv, .jsonl, or else a column directory); "
+                                                "per-generation stats go to the .generations sibling")
+    run_parser.add_argument('--telemetry-interval', type=int, default=100,
+                            help="ticks between telemetry records")
+    run_parser.set_defaults(func=run)
+
+    islands_parser = commands.add_parser('islands', help="island-model evolution over a process pool")
+    islands_parser.add_argument('--islands', type=int, default=4, help="number of independent worlds")
+    islands_parser.add_argument('--epochs', type=int, default=10, help="migration rounds to run")
+    islands_parser.add_argument('--generations', type=int, default=5,
+                                help="generations each island evolves between migrations")
+    islands_parser.add_argument('--migrants', type=int, default=2,
+                                help="top brains per species sent to each neighbour")
+    islands_parser.add_argument('--topology', choices=('ring', 'full'), default='ring')
+    islands_parser.add_argument('--workers', type=int, default=None,
+                                help="worker processes (default: one per core)")
+    islands_parser.add_argument('--seed', type=int, default=None, help="random seed")
+    islands_parser.add_argument('--width', type=int, default=800, help="world width")
+    islands_parser.add_argument('--height', type=int, default=600, help="world height")
+    islands_parser.add_argument('--output', help="also write the final stats JSON here")
+    islands_parser.set_defaults(func=islands)
+
+    domains_parser = commands.add_parser('domains', help="one world split into strips, each in a worker "
+                                                         "process with --processes")
+    domains_parser.add_argument('--strips', type=int, default=2, help="strips the world is split into")
+    domains_parser.add_argument('--processes', action='store_true',
+                                help="run every strip in its own process (same results, one core each)")
+    domains_parser.add_argument('--ticks', type=int, default=10000, help="ticks to simulate")
+    domains_parser.add_argument('--seed', type=int, default=None, help="random seed")
+    domains_parser.add_argument('--width', type=int, default=800, help="world width")
+    domains_parser.add_argument('--height', type=int, default=600, help="world height")
+    domains_parser.add_argument('--wrap', action='store_true',
+                                help="make the world a torus: animals leaving one edge enter the opposite one")
+    domains_parser.add_argument('--chunk-size', type=int, default=200,
+                                help="food spawns per occupied chunk of this size; strip edges are whole chunks")
+    domains_parser.add_argument('--rabbits', type=int, default=40, help="initial rabbits")
+    domains_parser.add_argument('--foxes', type=int, default=12, help="initial foxes")
+    domains_parser.add_argument('--wolves', type=int, default=8, help="initial wolves")
+    domains_parser.add_argument('--food', type=int, default=30, help="initial food")
+    domains_parser.add_argument('--set', action='append', default=[], metavar='NAME=VALUE',
+                                help="override a config.DEFAULTS parameter")
+    domains_parser.add_argument('--report-interval', type=float, default=5.0,
+                                help="seconds between throughput reports")
+    domains_parser.add_argument('--output', help="also write the final stats JSON here")
+    domains_parser.set_defaults(func=domains)
+
+    sweep_parser = commands.add_parser('sweep', help="run a parameter sweep over a process pool")
+    sweep_parser.add_argument('--param', action='append', default=[], metavar='NAME=VALUES',
+                              help="a config.DEFAULTS parameter and its values: comma separated "
+                                   "for a grid (energy_decay=0.1,0.2), low:high bounds with --samples")
+    sweep_parser.add_argument('--samples', type=int, default=0,
+                              help="random search with this many points instead of the full grid")
+    sweep_parser.add_argument('--sample-seed', type=int, default=0,
+                              help="seed of the random search (keep it to resume)")
+    sweep_parser.add_argument('--seeds', type=int, nargs='+', default=[0],
+                              help="world seeds every point is run with")
+    sweep_parser.add_argument('--ticks', type=int, default=10000, help="ticks per run")
+    sweep_parser.add_argument('--results', required=True,
+                              help="results table, one row per run (.csv, .jsonl, or else a column "
+                                   "directory); runs already in it are skipped")
+    sweep_parser.add_argument('--workers', type=int, default=None,
+                              help="worker processes (default: one per core)")
+    sweep_parser.add_argument('--width', type=int, default=800, help="world width")
+    sweep_parser.add_argument('--height', type=int, default=600, help="world height")
+    sweep_parser.set_defaults(func=sweep)
+
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
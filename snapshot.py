@@ -0,0 +1,141 @@
+import threading
+import time
+import numpy as np
+from population import GENDERS
+
+# Rendering runs apart from the simulation: the simulation thread copies what
+# the visualizer draws into a Snapshot between ticks and publishes it through a
+# SnapshotBuffer, and the visualizer draws the latest one at its own frame rate.
+
+ANIMAL_FIELDS = ('x', 'y', 'direction', 'energy', 'is_pregnant', 'mate_seeking')
+
+
+def frozen(array):
+    array = np.array(array)
+    array.setflags(write=False)
+    return array
+
+
+def species_arrays(population, fields=ANIMAL_FIELDS):
+    # Read-only copies of the population columns the visualizer draws
+    arrays = {name: frozen(population[name]) for name in fields}
+    arrays['male'] = frozen(population['gender'] == GENDERS.index('male'))
+    return arrays
+
+
+class Snapshot:
+    # Immutable copy of a world's drawable state: per species column arrays,
+    # food, pack territories and the stats panel. Nothing in it refers back to
+    # the world, so the renderer can hold it while the world moves on.
+    def __init__(self, world):
+        self.width = world.width
+        self.height = world.height
+        self.tick = world.tick
+        self.generation_timer = world.generation_timer
+        self.generation_ticks = world.config.generation_ticks
+        self.stats = world.get_stats()
+        self.top_phases = world.profiler.top_phases(5) if world.profiler.enabled else None
+
+        self.food = {name: frozen(world.food[name][world.food.living_rows()]) for name in ('x', 'y')}
+        self.rabbits = species_arrays(world.rabbit_population)
+        self.foxes = species_arrays(world.fox_population)
+        self.wolves = species_arrays(world.wolf_population, ANIMAL_FIELDS + ('howl_cooldown',))
+
+        # Pack membership per wolf (-1 for lone wolves) and who leads
+        pack_ids = []
+        alphas = []
+        for wolf in world.wolves:
+            pack = wolf.pack
+            pack_ids.append(pack.pack_id if pack else -1)
+            alphas.append(bool(pack) and (wolf == pack.alpha_male or wolf == pack.alpha_female))
+        self.wolves['pack_id'] = frozen(np.array(pack_ids, dtype=np.int64))
+        self.wolves['is_alpha'] = frozen(np.array(alphas, dtype=bool))
+        self.packs = tuple((pack.pack_id, pack.pack_center_x, pack.pack_center_y)
+                           for pack in world.packs if pack.get_pack_size() > 1)
+
+
+class SnapshotBuffer:
+    # Double buffer between one producer and one consumer. publish() swaps a
+    # finished snapshot in; latest() hands out the newest one. The producer
+    # only builds a snapshot when wanted(), i.e. once the consumer has taken
+    # the previous one, so copying costs at most one snapshot per frame.
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.snapshot = None
+        self.taken = True
+
+    def wanted(self):
+        return self.taken
+
+    def publish(self, snapshot):
+        with self.lock:
+            self.snapshot = snapshot
+            self.taken = False
+
+    def latest(self):
+        with self.lock:
+            self.taken = True
+            return self.snapshot
+
+
+class SimulationThread(threading.Thread):
+    # Runs the world (and evolution) as fast as it goes, or at most
+    # ticks_per_second, publishing snapshots as the renderer asks for them.
+    # Only this thread touches the world until stop() and join().
+    def __init__(self, world, evolution_manager, buffer, ticks_per_second=None, log_interval=1000):
+        super().__init__(name='simulation', daemon=True)
+        self.world = world
+        self.evolution_manager = evolution_manager
+        self.buffer = buffer
+        self.ticks_per_second = ticks_per_second
+        self.log_interval = log_interval
+        self.paused = False
+        self.stopping = threading.Event()
+        self.error = None
+        buffer.publish(Snapshot(world))
+
+    def stop(self):
+        self.stopping.set()
+
+    def run(self):
+        try:
+            self.simulate()
+        except BaseException as error:
+            self.error = error
+
+    def simulate(self):
+        world = self.world
+        evolution_manager = self.evolution_manager
+        next_tick = time.perf_counter()
+        while not self.stopping.is_set():
+            if self.paused:
+                time.sleep(0.01)
+                next_tick = time.perf_counter()
+                continue
+
+            world.update()
+
+            # Check for evolution
+            if evolution_manager.should_evolve():
+                print(f"\nTriggering evolution at tick {world.tick}")
+                evolution_manager.evolve()
+
+            # Prevent empty populations
+            evolution_manager.prevent_extinction()
+
+            if self.buffer.wanted():
+                self.buffer.publish(Snapshot(world))
+
+            # Print periodic stats
+            if world.tick % self.log_interval == 0:
+                stats = world.get_stats()
+                print(f"Tick {stats['tick']:,} - Gen {stats['generation']} - "
+                      f"Rabbits: {stats['rabbits']}, Foxes: {stats['foxes']}, Food: {stats['food']}")
+
+            if self.ticks_per_second:
+                next_tick += 1 / self.ticks_per_second
+                delay = next_tick - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                else:
+                    next_tick = time.perf_counter()
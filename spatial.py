@@ -0,0 +1,309 @@
+import math
+import numpy as np
+
+
+class Space:
+    # Geometry of a world: the plane, where walls keep animals inside (see
+    # Population.check_boundaries), or a width x height torus when wrap is
+    # set, where leaving one edge enters the opposite one and every offset and
+    # distance is measured the short way round. Works on scalars and arrays.
+    def __init__(self, width=None, height=None, wrap=False):
+        self.width = width
+        self.height = height
+        self.wrap = wrap
+
+    def delta(self, x0, y0, x1, y1):
+        # Offset (dx, dy) from (x0, y0) to (x1, y1)
+        if not self.wrap:
+            return x1 - x0, y1 - y0
+        half_width = self.width / 2
+        half_height = self.height / 2
+        return ((x1 - x0 + half_width) % self.width - half_width,
+                (y1 - y0 + half_height) % self.height - half_height)
+
+    def distance(self, x0, y0, x1, y1):
+        dx, dy = self.delta(x0, y0, x1, y1)
+        return math.sqrt(dx**2 + dy**2)
+
+    def distances(self, x0, y0, x1, y1):
+        dx, dy = self.delta(x0, y0, x1, y1)
+        return np.sqrt(dx**2 + dy**2)
+
+    def angles(self, x0, y0, x1, y1):
+        # Direction from (x0, y0) to (x1, y1)
+        dx, dy = self.delta(x0, y0, x1, y1)
+        return np.arctan2(dy, dx)
+
+    def wrapped(self, x, y):
+        # A position brought back into [0, width) x [0, height) on the torus
+        if not self.wrap:
+            return x, y
+        return x % self.width, y % self.height
+
+    def images(self, x, y, margin):
+        # The offsets (sx, sy) under which a box of `margin` around (x, y)
+        # also shows up across the edges of the torus, (0, 0) first
+        xs = [0]
+        ys = [0]
+        if self.wrap:
+            if x - margin < 0:
+                xs.append(self.width)
+            if x + margin >= self.width:
+                xs.append(-self.width)
+            if y - margin < 0:
+                ys.append(self.height)
+            if y + margin >= self.height:
+                ys.append(-self.height)
+        return [(sx, sy) for sx in xs for sy in ys]
+
+
+PLANE = Space()
+
+
+class SpatialGrid:
+    # Uniform bucket grid over anything with x/y attributes. Each item keeps the
+    # order it was inserted in, so queries hand candidates back in the same order
+    # as the list they were built from and tie-breaking matches a linear scan.
+    def __init__(self, cell_size=50, space=PLANE):
+        self.cell_size = cell_size
+        # On a torus queries near an edge also look across it
+        self.space = space
+        self.cells = {}
+        self.entries = {}
+        self.next_order = 0
+        # Items handed to a distance test so far, read by the profiler
+        self.distance_checks = 0
+
+    def cell_of(self, x, y):
+        return (math.floor(x / self.cell_size), math.floor(y / self.cell_size))
+
+    def rebuild(self, items, xs=None, ys=None):
+        # xs/ys, when given, are the items' positions as arrays (Population
+        # columns), which saves reading them back one attribute at a time
+        self.cells = {}
+        self.entries = {}
+        self.next_order = 0
+        if xs is None:
+            for item in items:
+                self.insert(item)
+            return
+
+        cxs = np.floor(xs / self.cell_size).astype(np.int64).tolist()
+        cys = np.floor(ys / self.cell_size).astype(np.int64).tolist()
+        for order, (item, cell) in enumerate(zip(items, zip(cxs, cys))):
+            self.cells.setdefault(cell, {})[item] = order
+            self.entries[item] = (cell, order)
+        self.next_order = len(self.entries)
+
+    def insert(self, item):
+        cell = self.cell_of(item.x, item.y)
+        order = self.next_order
+        self.next_order += 1
+        self.cells.setdefault(cell, {})[item] = order
+        self.entries[item] = (cell, order)
+
+    def remove(self, item):
+        entry = self.entries.pop(item, None)
+        if entry is None:
+            return
+        cell = entry[0]
+        bucket = self.cells[cell]
+        del bucket[item]
+        if not bucket:
+            del self.cells[cell]
+
+    def __len__(self):
+        return len(self.entries)
+
+    def candidates(self, x, y, radius):
+        # Every item that could lie within radius of (x, y), in insertion order.
+        # Callers still apply their own distance test (Space.distance).
+        images = self.space.images(x, y, radius)
+        if len(images) == 1:
+            found = self.box(x - radius, y - radius, x + radius, y + radius)
+        else:
+            # The box sticks out over an edge of the torus: look at its image
+            # on the other side too, each item once
+            found = {}
+            for sx, sy in images:
+                found.update(self.box(x + sx - radius, y + sy - radius, x + sx + radius, y + sy + radius))
+            found = list(found.items())
+
+        found.sort(key=lambda entry: entry[1])
+        self.distance_checks += len(found)
+        return [item for item, _ in found]
+
+    def box(self, left, top, right, bottom):
+        # (item, order) of every item in the cells the box touches
+        x0, y0 = self.cell_of(left, top)
+        x1, y1 = self.cell_of(right, bottom)
+
+        found = []
+        if (x1 - x0 + 1) * (y1 - y0 + 1) > len(self.cells):
+            for (cx, cy), bucket in self.cells.items():
+                if x0 <= cx <= x1 and y0 <= cy <= y1:
+                    found.extend(bucket.items())
+        else:
+            for cx in range(x0, x1 + 1):
+                for cy in range(y0, y1 + 1):
+                    bucket = self.cells.get((cx, cy))
+                    if bucket:
+                        found.extend(bucket.items())
+        return found
+
+
+# Array versions of the grid queries, for a whole species at once. Points and
+# targets are coordinate arrays; distances are computed exactly as
+# Animal.distance_to does, and ties go to the lowest target index, which is
+# what a scan in insertion order with a strict '<' picks. On a torus (space)
+# distances go the short way round; radius must stay below half its size.
+
+def edge_images(txs, tys, radius, space):
+    # Targets within radius of an edge of the torus copied across it, so a
+    # plain search finds them from the other side: the copies' coordinates
+    # and the index of the target each one is a copy of
+    index = [np.arange(len(txs))]
+    image_xs = [txs]
+    image_ys = [tys]
+    width, height = space.width, space.height
+    for sx, sy in ((width, 0), (-width, 0), (0, height), (0, -height),
+                   (width, height), (width, -height), (-width, height), (-width, -height)):
+        near = np.ones(len(txs), dtype=bool)
+        if sx:
+            near &= (txs < radius) if sx > 0 else (txs >= width - radius)
+        if sy:
+            near &= (tys < radius) if sy > 0 else (tys >= height - radius)
+        rows = np.flatnonzero(near)
+        index.append(rows)
+        image_xs.append(txs[rows] + sx)
+        image_ys.append(tys[rows] + sy)
+    return np.concatenate(image_xs), np.concatenate(image_ys), np.concatenate(index)
+
+
+# Below this many point/target pairs pairs_within tests every pair
+SCAN_PAIRS = 10000
+
+
+def pairs_within(xs, ys, txs, tys, radius, space=PLANE):
+    # Every (point, target, distance) with distance < radius. Targets are
+    # bucketed in cells of `radius`, so only the 3x3 cells around each point
+    # are looked at. Also returns how many pairs were distance-tested.
+    empty = np.zeros(0, dtype=np.int64)
+    if len(xs) == 0 or len(txs) == 0:
+        return empty, empty, np.zeros(0), 0
+
+    if len(xs) * len(txs) <= SCAN_PAIRS:
+        # Few enough pairs to test them all at once, which beats bucketing
+        # them (small worlds)
+        dists = space.distances(xs[:, None], ys[:, None], txs[None, :], tys[None, :])
+        points, targets = np.nonzero(dists < radius)
+        return points, targets, dists[points, targets], dists.size
+
+    if space.wrap:
+        image_xs, image_ys, index = edge_images(txs, tys, radius, space)
+        points, targets, _, checked = pairs_within(xs, ys, image_xs, image_ys, radius)
+        targets = index[targets]
+        return points, targets, space.distances(xs[points], ys[points], txs[targets], tys[targets]), checked
+
+    pcx = np.floor(xs / radius).astype(np.int64)
+    pcy = np.floor(ys / radius).astype(np.int64)
+    tcx = np.floor(txs / radius).astype(np.int64)
+    tcy = np.floor(tys / radius).astype(np.int64)
+    x0 = min(pcx.min(), tcx.min()) - 1
+    y0 = min(pcy.min(), tcy.min()) - 1
+    height = max(pcy.max(), tcy.max()) - y0 + 2
+
+    keys = (tcx - x0) * height + (tcy - y0)
+    order = np.argsort(keys, kind='stable')
+    keys = keys[order]
+
+    points = []
+    targets = []
+    for dx in (-1, 0, 1):
+        for dy in (-1, 0, 1):
+            cell = (pcx + dx - x0) * height + (pcy + dy - y0)
+            start = np.searchsorted(keys, cell, 'left')
+            counts = np.searchsorted(keys, cell, 'right') - start
+            total = counts.sum()
+            if total == 0:
+                continue
+            # Positions start[i] .. start[i] + counts[i] - 1 for every point i
+            first = np.cumsum(counts) - counts
+            positions = np.arange(total) - np.repeat(first - start, counts)
+            points.append(np.repeat(np.arange(len(xs)), counts))
+            targets.append(order[positions])
+
+    if not points:
+        return empty, empty, np.zeros(0), 0
+    points = np.concatenate(points)
+    targets = np.concatenate(targets)
+    dists = np.sqrt((xs[points] - txs[targets])**2 + (ys[points] - tys[targets])**2)
+    near = dists < radius
+    return points[near], targets[near], dists[near], len(dists)
+
+
+def nearest_of_pairs(count, points, targets, dists):
+    # Nearest target of each of `count` points among the pairs, -1/inf where a
+    # point has none
+    nearest = np.full(count, -1, dtype=np.int64)
+    distance = np.full(count, np.inf)
+    if len(points):
+        order = np.lexsort((targets, dists, points))
+        points = points[order]
+        first = np.ones(len(points), dtype=bool)
+        first[1:] = points[1:] != points[:-1]
+        nearest[points[first]] = targets[order][first]
+        distance[points[first]] = dists[order][first]
+    return nearest, distance
+
+
+def nearest_within(xs, ys, txs, tys, radius, space=PLANE):
+    points, targets, dists, checked = pairs_within(xs, ys, txs, tys, radius, space)
+    return nearest_of_pairs(len(xs), points, targets, dists) + (checked,)
+
+
+def nearest_scan(xs, ys, txs, tys, space, block=256):
+    # Nearest target of every point by brute force, a block of points at a time
+    nearest = np.empty(len(xs), dtype=np.int64)
+    distance = np.empty(len(xs))
+    for start in range(0, len(xs), block):
+        rows = slice(start, start + block)
+        dists = space.distances(xs[rows, None], ys[rows, None], txs[None, :], tys[None, :])
+        nearest[rows] = np.argmin(dists, axis=1)
+        distance[rows] = dists[np.arange(len(dists)), nearest[rows]]
+    return nearest, distance
+
+
+def nearest_unbounded(xs, ys, txs, tys, radius, space=PLANE):
+    # Nearest target at any distance: rounds of nearest_within, doubling the
+    # radius for the points that have not found one yet
+    nearest = np.full(len(xs), -1, dtype=np.int64)
+    distance = np.full(len(xs), np.inf)
+    checked = 0
+    if len(xs) == 0 or len(txs) == 0:
+        return nearest, distance, checked
+
+    # Once the radius spans the bounding box every point finds something
+    span = math.hypot(max(xs.max(), txs.max()) - min(xs.min(), txs.min()),
+                      max(ys.max(), tys.max()) - min(ys.min(), tys.min()))
+    remaining = np.arange(len(xs))
+    while len(remaining):
+        if space.wrap and 2 * radius >= min(space.width, space.height):
+            # Past half the torus the edge copies would overlap: whoever is
+            # still looking is far from everything, scan for them directly
+            found_at, found_dist = nearest_scan(xs[remaining], ys[remaining], txs, tys, space)
+            checked += len(remaining) * len(txs)
+            nearest[remaining] = found_at
+            distance[remaining] = found_dist
+            break
+        found_at, found_dist, round_checked = nearest_within(
+            xs[remaining], ys[remaining], txs, tys, radius, space)
+        checked += round_checked
+        found = found_at >= 0
+        nearest[remaining[found]] = found_at[found]
+        distance[remaining[found]] = found_dist[found]
+        remaining = remaining[~found]
+        if radius > span:
+            break
+        radius *= 2
+    return nearest, distance, checked
@@ -0,0 +1,120 @@
+import contextlib
+import csv
+import hashlib
+import io
+import itertools
+import json
+import math
+import os
+import time
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from config import Config, DEFAULTS
+from evolution import EvolutionManager
+from telemetry import open_sink, read_columns
+from world import World
+
+# Parameter sweeps: every point of a grid or random search over the Config
+# parameters, run headless once per seed across a process pool. Each finished
+# run is appended to one results table as it comes in; rerunning the same sweep
+# against the same table skips the runs already in it, so an interrupted sweep
+# resumes where it stopped.
+
+
+def grid(space):
+    # {name: [values]} -> every combination, as Config overrides
+    names = list(space)
+    return [dict(zip(names, values)) for values in itertools.product(*(space[name] for name in names))]
+
+
+def random_search(space, samples, seed=None):
+    # {name: (low, high)} -> `samples` points drawn uniformly, integers
+    # within the bounds for integer parameters. The same seed draws the same
+    # points, which is what lets a random sweep resume.
+    rng = np.random.default_rng(seed)
+    points = [{} for _ in range(samples)]
+    for name, (low, high) in space.items():
+        if isinstance(DEFAULTS[name], int):
+            values = rng.integers(math.ceil(low), math.floor(high), samples, endpoint=True).tolist()
+        else:
+            values = rng.uniform(low, high, samples).tolist()
+        for point, value in zip(points, values):
+            point[name] = value
+    return points
+
+
+def run_id(params, seed, ticks):
+    # Stable name of one run, the key a resumed sweep skips finished runs by
+    key = json.dumps({'params': Config(**params).to_dict(), 'seed': seed, 'ticks': ticks}, sort_keys=True)
+    return hashlib.sha1(key.encode()).hexdigest()[:16]
+
+
+def run_point(params, seed, ticks, width=800, height=600):
+    # One headless run, as sim.py runs them. Returns its results table row:
+    # the run, its parameters and the final World.get_stats().
+    config = Config(**params)
+    world = World(width=width, height=height, seed=seed, config=config)
+    evolution_manager = EvolutionManager(world)
+    start = time.perf_counter()
+    # Generation reports would interleave across workers, keep them quiet
+    with contextlib.redirect_stdout(io.StringIO()):
+        for _ in range(ticks):
+            world.update()
+            if evolution_manager.should_evolve():
+                evolution_manager.evolve()
+            evolution_manager.prevent_extinction()
+
+    record = {'run_id': run_id(params, seed, ticks), 'seed': seed}
+    record.update(config.to_dict())
+    record['elapsed_seconds'] = time.perf_counter() - start
+    for name, value in world.get_stats().items():
+        record[name] = value.item() if isinstance(value, np.generic) else value
+    return record
+
+
+def finished_runs(path):
+    # run_ids already in a results table (.csv, .jsonl or a column directory)
+    if not os.path.exists(path):
+        return set()
+    if path.endswith('.csv'):
+        with open(path, newline='') as f:
+            return {row['run_id'] for row in csv.DictReader(f)}
+    if path.endswith('.jsonl'):
+        with open(path) as f:
+            return {json.loads(line)['run_id'] for line in f if line.strip()}
+    if not os.path.exists(os.path.join(path, 'schema.json')):
+        return set()
+    return set(read_columns(path)['run_id'].tolist())
+
+
+class Sweep:
+    # Runs every point x seed not yet in the results table at `path` over
+    # `workers` processes, appending each result as it finishes
+    def __init__(self, points, seeds, ticks, path, width=800, height=600, workers=None):
+        self.runs = [(params, seed) for params in points for seed in seeds]
+        self.ticks = ticks
+        self.path = path
+        self.width = width
+        self.height = height
+        self.workers = workers
+
+    def pending(self):
+        done = finished_runs(self.path)
+        return [(params, seed) for params, seed in self.runs
+                if run_id(params, seed, self.ticks) not in done]
+
+    def run(self, on_result=None):
+        pending = self.pending()
+        sink = open_sink(self.path)
+        try:
+            with ProcessPoolExecutor(max_workers=self.workers) as pool:
+                futures = [pool.submit(run_point, params, seed, self.ticks, self.width, self.height)
+                           for params, seed in pending]
+                for future in as_completed(futures):
+                    record = future.result()
+                    sink.write([record])
+                    if on_result:
+                        on_result(record)
+        finally:
+            sink.close()
+        return len(pending)
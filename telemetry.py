@@ -0,0 +1,179 @@
+import csv
+import json
+import os
+import numpy as np
+
+
+class NullTelemetry:
+    # What World holds when nothing is recorded: every hook is a no-op
+    enabled = False
+
+    def tick(self, world):
+        pass
+
+    def generation(self, record):
+        pass
+
+    def flush(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class CSVSink:
+    # One row per record, header from the first record. Appends to an
+    # existing file (resumed runs) without repeating the header.
+    def __init__(self, path):
+        self.path = path
+        self.file = None
+        self.writer = None
+
+    def write(self, records):
+        if self.writer is None:
+            fresh = not os.path.exists(self.path) or os.path.getsize(self.path) == 0
+            self.file = open(self.path, 'a', newline='')
+            self.writer = csv.DictWriter(self.file, fieldnames=list(records[0]))
+            if fresh:
+                self.writer.writeheader()
+        self.writer.writerows(records)
+        self.file.flush()
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = self.writer = None
+
+
+class JSONLSink:
+    # One JSON object per line, appended
+    def __init__(self, path):
+        self.path = path
+        self.file = None
+
+    def write(self, records):
+        if self.file is None:
+            self.file = open(self.path, 'a')
+        self.file.writelines(json.dumps(record) + '\n' for record in records)
+        self.file.flush()
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+
+class ColumnarSink:
+    # Append-only column store: a directory holding one raw array file per
+    # field (<field>.bin) and schema.json with the field order and dtypes.
+    # Every batch appends to each column, so a long run's series can be
+    # loaded with read_columns() without parsing text.
+    def __init__(self, path):
+        self.path = path
+        self.schema = None
+
+    def write(self, records):
+        if self.schema is None:
+            self.schema = self.load_schema() or self.create_schema(records[0])
+        for field, dtype in self.schema:
+            values = np.array([record[field] for record in records], dtype=dtype)
+            with open(os.path.join(self.path, f'{field}.bin'), 'ab') as f:
+                values.tofile(f)
+
+    def load_schema(self):
+        path = os.path.join(self.path, 'schema.json')
+        if not os.path.exists(path):
+            return None
+        with open(path) as f:
+            return [tuple(column) for column in json.load(f)]
+
+    def create_schema(self, record):
+        # Integers (and flags) as int64, everything else as float64; strings
+        # (the species name) as fixed-width unicode
+        schema = []
+        for field, value in record.items():
+            if isinstance(value, (bool, int, np.integer)):
+                dtype = '<i8'
+            elif isinstance(value, str):
+                dtype = '<U16'
+            else:
+                dtype = '<f8'
+            schema.append((field, dtype))
+        os.makedirs(self.path, exist_ok=True)
+        with open(os.path.join(self.path, 'schema.json'), 'w') as f:
+            json.dump(schema, f)
+        return schema
+
+    def close(self):
+        pass
+
+
+def read_columns(path):
+    # A ColumnarSink directory as {field: array}
+    with open(os.path.join(path, 'schema.json')) as f:
+        schema = json.load(f)
+    return {field: np.fromfile(os.path.join(path, f'{field}.bin'), dtype=dtype)
+            for field, dtype in schema}
+
+
+def open_sink(path):
+    # By extension: .csv, .jsonl, anything else is a ColumnarSink directory
+    if path.endswith('.csv'):
+        return CSVSink(path)
+    if path.endswith('.jsonl'):
+        return JSONLSink(path)
+    return ColumnarSink(path)
+
+
+def sibling_path(path, stream):
+    # run.csv -> run.generations.csv, run.cols -> run.generations.cols
+    root, ext = os.path.splitext(path.rstrip('/'))
+    return f'{root}.{stream}{ext}'
+
+
+class Telemetry:
+    # Time series for long runs: World.get_stats() every `interval` ticks into
+    # tick_sink and one record per species per generation into
+    # generation_sink. Records are buffered and written `batch` at a time.
+    enabled = True
+
+    def __init__(self, tick_sink=None, generation_sink=None, interval=100, batch=50):
+        self.tick_sink = tick_sink
+        self.generation_sink = generation_sink
+        self.interval = interval
+        self.batch = batch
+        self.ticks = []
+        self.generations = []
+
+    @classmethod
+    def to_path(cls, path, interval=100, batch=50):
+        # Tick series at path, generations next to it (see sibling_path)
+        return cls(open_sink(path), open_sink(sibling_path(path, 'generations')), interval, batch)
+
+    def tick(self, world):
+        if self.tick_sink is None or world.tick % self.interval:
+            return
+        self.ticks.append(world.get_stats())
+        if len(self.ticks) >= self.batch:
+            self.flush()
+
+    def generation(self, record):
+        if self.generation_sink is None:
+            return
+        self.generations.append(record)
+        if len(self.generations) >= self.batch:
+            self.flush()
+
+    def flush(self):
+        if self.ticks:
+            self.tick_sink.write(self.ticks)
+            self.ticks = []
+        if self.generations:
+            self.generation_sink.write(self.generations)
+            self.generations = []
+
+    def close(self):
+        self.flush()
+        for sink in (self.tick_sink, self.generation_sink):
+            if sink is not None:
+                sink.close()
@@ -1,12 +1,92 @@
 import pygame
 import math
 import sys
+import numpy as np
+
+
+# Cached sprites are SPRITE_SIZE squares with the animal at the centre, drawn
+# facing one of HEADINGS directions
+SPRITE_SIZE = 72
+SPRITE_CENTER = SPRITE_SIZE // 2
+HEADINGS = 32
+HEADING_STEP = 2 * math.pi / HEADINGS
+
+
+class View:
+    # The part of the world the window shows: world point (x0, y0) at the top
+    # left corner, `scale` pixels per world unit
+    def __init__(self, x0, y0, scale, width, height):
+        self.x0 = x0
+        self.y0 = y0
+        self.scale = scale
+        self.width = width
+        self.height = height
+
+    def project(self, xs, ys, margin=0):
+        # Screen positions (whole pixels) of the points within margin pixels
+        # of the window, and the mask of which points those are
+        sx = (xs - self.x0) * self.scale
+        sy = (ys - self.y0) * self.scale
+        visible = (sx >= -margin) & (sx < self.width + margin) & (sy >= -margin) & (sy < self.height + margin)
+        return sx[visible].astype(int), sy[visible].astype(int), visible
+
+    def histogram(self, xs, ys, cell, columns, rows):
+        # Points per cell of a columns x rows grid of cell-pixel squares
+        # covering the window, indexed [column, row] like pygame.surfarray
+        cx = np.floor((xs - self.x0) * (self.scale / cell)).astype(np.int64)
+        cy = np.floor((ys - self.y0) * (self.scale / cell)).astype(np.int64)
+        inside = (cx >= 0) & (cx < columns) & (cy >= 0) & (cy < rows)
+        counts = np.bincount(cx[inside] * rows + cy[inside], minlength=columns * rows)
+        return counts.reshape(columns, rows)
+
+
+def animal_rows(arrays, view, extra=()):
+    # (x, y, heading, energy, male, is_pregnant, mate_seeking, *extra) for
+    # every animal of a snapshot's species arrays that is in view, positions
+    # in screen pixels and the direction as the nearest of the HEADINGS steps
+    xs, ys, visible = view.project(arrays['x'], arrays['y'], SPRITE_CENTER)
+    headings = np.rint(arrays['direction'][visible] / HEADING_STEP).astype(int) % HEADINGS
+    return zip(xs.tolist(), ys.tolist(), headings.tolist(),
+               *(arrays[name][visible].tolist()
+                 for name in ('energy', 'male', 'is_pregnant', 'mate_seeking') + tuple(extra)))
+
+
+LEGEND = [
+    "Legend:",
+    "Brown/Light = Rabbits M/F",
+    "Red/Dark Red = Foxes M/F",
+    "Silver/Dark = Wolves M/F",
+    "Colored rings = Pack member",
+    "Gold crown = Alpha wolf",
+    "Gray ring = Lone wolf",
+    "Purple ring = Seeking mate",
+    "Pink ring = Pregnant",
+    "Orange dot = Recently howled",
+    "",
+    "Controls:",
+    "SPACE - Pause/Resume",
+    "Wheel or +/- - Zoom",
+    "Arrows - Pan, 0 - Reset view",
+    "ESC - Exit",
+]
+
+PAN_KEYS = {
+    pygame.K_LEFT: (-0.1, 0),
+    pygame.K_RIGHT: (0.1, 0),
+    pygame.K_UP: (0, -0.1),
+    pygame.K_DOWN: (0, 0.1),
+}
+
 
 class Visualizer:
-    def __init__(self, width=800, height=600):
+    # lod_threshold: animals in view above which the world is drawn as a
+    # density heatmap of lod_cell pixel squares instead of one by one
+    def __init__(self, width=800, height=600, lod_threshold=3000, lod_cell=4):
         pygame.init()
         self.width = width
         self.height = height
+        self.lod_threshold = lod_threshold
+        self.lod_cell = lod_cell
         self.screen = pygame.display.set_mode((width + 200, height))  # Extra space for stats
         pygame.display.set_caption("Neural Network Evolution - Wolves, Foxes and Rabbits")
 
@@ -35,10 +115,36 @@ class Visualizer:
         self.font = pygame.font.Font(None, 24)
         self.small_font = pygame.font.Font(None, 18)
 
+        self.pack_colors = [self.RED, self.BLUE, self.GREEN, self.PURPLE, self.ORANGE, self.GOLD, self.PINK]
+
+        # Render caches, see draw_world and draw_stats
+        self.sprites = {}
+        self.bars = {}
+        self.territories = {}
+        self.stat_lines = {}
+        self.title = self.font.render("SIMULATION STATS", True, self.BLACK)
+        self.pause_text = self.font.render("PAUSED", True, self.RED)
+        self.next_evolution = self.small_font.render("Next Evolution", True, self.BLACK)
+        self.legend = self.render_lines(LEGEND)
+
+        # Zoom and pan, see view_of; the view drawn last is what input acts on
+        self.zoom = 1.0
+        self.center = None
+        self.view = None
+        self.density = False
+
         self.clock = pygame.time.Clock()
         self.running = True
         self.paused = False
 
+    def render_lines(self, lines):
+        # Text lines 20 pixels apart on one transparent surface
+        surface = pygame.Surface((200, 20 * len(lines)), pygame.SRCALPHA)
+        for line, text in enumerate(lines):
+            if text:
+                surface.blit(self.small_font.render(text, True, self.BLACK), (0, 20 * line))
+        return surface
+
     def handle_events(self):
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
@@ -48,230 +154,327 @@ class Visualizer:
                     self.paused = not self.paused
                 elif event.key == pygame.K_ESCAPE:
                     self.running = False
+                elif event.key in (pygame.K_PLUS, pygame.K_EQUALS, pygame.K_KP_PLUS):
+                    self.zoom_at(1.5, self.width / 2, self.height / 2)
+                elif event.key in (pygame.K_MINUS, pygame.K_KP_MINUS):
+                    self.zoom_at(1 / 1.5, self.width / 2, self.height / 2)
+                elif event.key in PAN_KEYS:
+                    self.pan(*PAN_KEYS[event.key])
+                elif event.key == pygame.K_0:
+                    self.zoom = 1.0
+                    self.center = None
+            elif event.type == pygame.MOUSEWHEEL:
+                x, y = pygame.mouse.get_pos()
+                if x < self.width:
+                    self.zoom_at(1.25 ** event.y, x, y)
 
         return self.running
 
-    def draw_world(self, world):
+    # Sprites are drawn once per look and reused: the key is the species'
+    # painter plus gender, state and heading (in HEADINGS steps), and for
+    # wolves the pack colour, alpha and howl flags. Every animal then costs
+    # one blit for its sprite and one for its energy bar, all handed to
+    # pygame in a single blits() call.
+
+    def sprite(self, key, paint, *look):
+        # (surface, dx, dy): the painted pixels cropped to their bounding box,
+        # to be blitted at (x + dx, y + dy)
+        sprite = self.sprites.get(key)
+        if sprite is None:
+            canvas = pygame.Surface((SPRITE_SIZE, SPRITE_SIZE), pygame.SRCALPHA)
+            paint(canvas, SPRITE_CENTER, SPRITE_CENTER, *look)
+            box = canvas.get_bounding_rect()
+            sprite = (canvas.subsurface(box).convert_alpha(), box.x - SPRITE_CENTER, box.y - SPRITE_CENTER)
+            self.sprites[key] = sprite
+        return sprite
+
+    def energy_bar(self, energy, bar_width, bar_height):
+        energy_ratio = energy / 200  # Updated max energy
+        fill = max(0, int(bar_width * energy_ratio))
+        energy_color = self.GREEN if energy_ratio > 0.5 else (self.ORANGE if energy_ratio > 0.25 else self.RED)
+        key = (bar_width, bar_height, fill, energy_color)
+        surface = self.bars.get(key)
+        if surface is None:
+            surface = pygame.Surface((max(bar_width, fill) + 2, bar_height + 2), pygame.SRCALPHA)
+            pygame.draw.rect(surface, self.BLACK, (0, 0, bar_width+2, bar_height+2))
+            pygame.draw.rect(surface, self.GRAY, (1, 1, bar_width, bar_height))
+            pygame.draw.rect(surface, energy_color, (1, 1, fill, bar_height))
+            surface = surface.convert_alpha() if fill > bar_width else surface.convert()
+            self.bars[key] = surface
+        return surface
+
+    def territory(self, pack_color):
+        # Faint disc, one surface per pack colour
+        surface = self.territories.get(pack_color)
+        if surface is None:
+            surface = pygame.Surface((160, 160), pygame.SRCALPHA)
+            pygame.draw.circle(surface, (*pack_color, 30), (80, 80), 80)
+            surface = surface.convert_alpha()
+            self.territories[pack_color] = surface
+        return surface
+
+    def paint_food(self, surface, x, y):
+        # Food as a small grass cluster
+        pygame.draw.circle(surface, self.GREEN, (x, y), 5)
+        pygame.draw.circle(surface, self.LIGHT_GREEN, (x, y), 3)
+        # Add small stems
+        for i in range(3):
+            stem_x = x + (i - 1) * 2
+            pygame.draw.line(surface, self.GREEN, (stem_x, y + 2), (stem_x, y - 2), 1)
+
+    def paint_rabbit(self, surface, x, y, direction, male, is_pregnant, mate_seeking):
+        # Choose colors based on gender
+        body_color = self.BROWN if male else self.LIGHT_BROWN
+        accent_color = self.BLUE if male else self.PINK
+
+        # Draw rabbit body (oval shape)
+        pygame.draw.ellipse(surface, body_color, (x-7, y-5, 14, 10))
+        pygame.draw.circle(surface, body_color, (x, y), 6)
+
+        # Draw ears
+        ear1_x = x - 3 + math.cos(direction + 0.5) * 4
+        ear1_y = y - 3 + math.sin(direction + 0.5) * 4
+        ear2_x = x + 3 + math.cos(direction - 0.5) * 4
+        ear2_y = y + 3 + math.sin(direction - 0.5) * 4
+        pygame.draw.circle(surface, body_color, (int(ear1_x), int(ear1_y)), 3)
+        pygame.draw.circle(surface, body_color, (int(ear2_x), int(ear2_y)), 3)
+
+        # Gender indicator (small dot)
+        pygame.draw.circle(surface, accent_color, (x-8, y-8), 2)
+
+        # Special states
+        if is_pregnant:
+            pygame.draw.circle(surface, self.PINK, (x, y), 9, 2)
+        elif mate_seeking:
+            pygame.draw.circle(surface, self.PURPLE, (x, y), 10, 1)
+
+        # Draw direction indicator
+        end_x = x + math.cos(direction) * 12
+        end_y = y + math.sin(direction) * 12
+        pygame.draw.line(surface, self.DARK_GRAY, (x, y), (int(end_x), int(end_y)), 2)
+
+    def paint_fox(self, surface, x, y, direction, male, is_pregnant, mate_seeking):
+        # Choose colors based on gender
+        body_color = self.RED if male else self.DARK_RED
+        accent_color = self.BLUE if male else self.PINK
+
+        # Draw fox body (more fox-like shape)
+        pygame.draw.ellipse(surface, body_color, (x-9, y-6, 18, 12))
+        pygame.draw.circle(surface, body_color, (x, y), 8)
+
+        # Draw pointed ears
+        pygame.draw.polygon(surface, body_color, [
+            (x-4, y-8), (x-1, y-12), (x+1, y-8)
+        ])
+        pygame.draw.polygon(surface, body_color, [
+            (x+1, y-8), (x+4, y-12), (x+7, y-8)
+        ])
+
+        # Draw tail
+        tail_x = x - math.cos(direction) * 10
+        tail_y = y - math.sin(direction) * 10
+        pygame.draw.circle(surface, body_color, (int(tail_x), int(tail_y)), 4)
+
+        # Gender indicator
+        pygame.draw.circle(surface, accent_color, (x-10, y-10), 2)
+
+        # Special states
+        if is_pregnant:
+            pygame.draw.circle(surface, self.PINK, (x, y), 12, 2)
+        elif mate_seeking:
+            pygame.draw.circle(surface, self.PURPLE, (x, y), 13, 1)
+
+        # Draw direction indicator
+        end_x = x + math.cos(direction) * 15
+        end_y = y + math.sin(direction) * 15
+        pygame.draw.line(surface, self.BLACK, (x, y), (int(end_x), int(end_y)), 3)
+
+    def paint_wolf(self, surface, x, y, direction, male, is_pregnant, mate_seeking, pack_color, is_alpha,
+                   howling):
+        # Choose colors based on gender
+        body_color = self.SILVER if male else self.DARK_SILVER
+        accent_color = self.BLUE if male else self.PINK
+
+        # Draw wolf body (larger and more wolf-like)
+        pygame.draw.ellipse(surface, body_color, (x-10, y-7, 20, 14))
+        pygame.draw.circle(surface, body_color, (x, y), 9)
+
+        # Draw pointed ears
+        pygame.draw.polygon(surface, body_color, [
+            (x-5, y-9), (x-2, y-14), (x+1, y-9)
+        ])
+        pygame.draw.polygon(surface, body_color, [
+            (x-1, y-9), (x+2, y-14), (x+5, y-9)
+        ])
+
+        # Draw tail
+        tail_x = x - math.cos(direction) * 12
+        tail_y = y - math.sin(direction) * 12
+        pygame.draw.ellipse(surface, body_color, (int(tail_x-3), int(tail_y-2), 6, 4))
+
+        # Pack indicators
+        if pack_color is not None:
+            # Pack member indicator (colored ring)
+            pygame.draw.circle(surface, pack_color, (x, y), 14, 2)
+
+            # Alpha indicators
+            if is_alpha:
+                pygame.draw.circle(surface, self.GOLD, (x, y), 16, 3)
+                # Crown symbol for alpha
+                crown_points = [(x-4, y-12), (x-2, y-16), (x, y-14), (x+2, y-16), (x+4, y-12)]
+                pygame.draw.lines(surface, self.GOLD, False, crown_points, 2)
+        else:
+            # Lone wolf indicator
+            pygame.draw.circle(surface, self.GRAY, (x, y), 13, 1)
+
+        # Gender indicator
+        pygame.draw.circle(surface, accent_color, (x-12, y-12), 3)
+
+        # Special states
+        if is_pregnant:
+            pygame.draw.circle(surface, self.PINK, (x, y), 18, 2)
+        elif mate_seeking:
+            pygame.draw.circle(surface, self.PURPLE, (x, y), 17, 1)
+
+        # Draw direction indicator (longer for wolves)
+        end_x = x + math.cos(direction) * 18
+        end_y = y + math.sin(direction) * 18
+        pygame.draw.line(surface, self.BLACK, (x, y), (int(end_x), int(end_y)), 3)
+
+        # Howling indicator
+        if howling:  # Recently howled
+            pygame.draw.circle(surface, self.ORANGE, (x, y-25), 4)
+            pygame.draw.arc(surface, self.ORANGE, (x-8, y-33, 16, 16), 0, math.pi, 2)
+
+    def view_of(self, snapshot):
+        # The whole world fitted into the window, zoomed around self.center
+        scale = min(self.width / snapshot.width, self.height / snapshot.height) * self.zoom
+        center_x, center_y = self.center or (snapshot.width / 2, snapshot.height / 2)
+        return View(center_x - self.width / 2 / scale, center_y - self.height / 2 / scale, scale,
+                    self.width, self.height)
+
+    def zoom_at(self, factor, x, y):
+        # Zoom by factor keeping the world point under window pixel (x, y) in place
+        view = self.view
+        if view is None:
+            return
+        zoom = min(max(self.zoom * factor, 1.0), 256.0)
+        scale = view.scale * zoom / self.zoom
+        world_x = view.x0 + x / view.scale
+        world_y = view.y0 + y / view.scale
+        self.center = (world_x + (self.width / 2 - x) / scale, world_y + (self.height / 2 - y) / scale)
+        self.zoom = zoom
+
+    def pan(self, dx, dy):
+        # Move the view by a fraction of its size
+        view = self.view
+        if view is None:
+            return
+        center_x = view.x0 + self.width / 2 / view.scale
+        center_y = view.y0 + self.height / 2 / view.scale
+        self.center = (center_x + dx * self.width / view.scale, center_y + dy * self.height / view.scale)
+
+    def draw_world(self, snapshot):
         # Clear screen
         self.screen.fill(self.WHITE)
 
+        # Past lod_threshold animals in view, individual animals are
+        # unreadable and slow to draw: show where each species is instead
+        self.view = view = self.view_of(snapshot)
+        in_view = sum(int(np.count_nonzero(view.project(arrays['x'], arrays['y'])[2]))
+                      for arrays in (snapshot.rabbits, snapshot.foxes, snapshot.wolves))
+        self.density = in_view > self.lod_threshold
+        if self.density:
+            self.draw_density(snapshot, view)
+        else:
+            self.draw_animals(snapshot, view)
+
         # Draw simulation area border
         pygame.draw.rect(self.screen, self.BLACK, (0, 0, self.width, self.height), 2)
 
+    def draw_density(self, snapshot, view):
+        # Each species as a heatmap of lod_cell pixel squares: cells it occupies
+        # are tinted with its colour, more strongly the more animals (log scale)
+        cell = self.lod_cell
+        columns = -(-self.width // cell)
+        rows = -(-self.height // cell)
+        canvas = np.full((columns, rows, 3), 255.0)
+        for arrays, color in ((snapshot.food, self.GREEN), (snapshot.rabbits, self.BROWN),
+                              (snapshot.foxes, self.RED), (snapshot.wolves, self.DARK_GRAY)):
+            counts = view.histogram(arrays['x'], arrays['y'], cell, columns, rows)
+            densest = counts.max()
+            if densest == 0:
+                continue
+            alpha = np.where(counts > 0, 0.35 + 0.65 * np.log1p(counts) / np.log1p(densest), 0)[..., None]
+            canvas = canvas * (1 - alpha) + np.array(color, dtype=float) * alpha
+
+        heatmap = pygame.surfarray.make_surface(canvas.astype(np.uint8))
+        self.screen.blit(pygame.transform.scale(heatmap, (columns * cell, rows * cell)), (0, 0))
+
+        # Pack territories stay on top as in the detailed view
+        self.draw_territories(snapshot, view)
+
+    def draw_territories(self, snapshot, view):
+        # Draw pack territories (faint background circles)
+        # (the snapshot only lists packs of more than one wolf)
+        blits = []
+        for pack_id, pack_center_x, pack_center_y in snapshot.packs:
+            center_x = int((pack_center_x - view.x0) * view.scale)
+            center_y = int((pack_center_y - view.y0) * view.scale)
+            blits.append((self.territory(self.pack_colors[pack_id % 7]), (center_x - 80, center_y - 80)))
+        self.screen.blits(blits, doreturn=False)
+
+    def draw_animals(self, snapshot, view):
+        blits = []
+
         # Draw food with improved graphics
-        for food in world.food:
-            x, y = int(food.x), int(food.y)
-            # Food as a small grass cluster
-            pygame.draw.circle(self.screen, self.GREEN, (x, y), 5)
-            pygame.draw.circle(self.screen, self.LIGHT_GREEN, (x, y), 3)
-            # Add small stems
-            for i in range(3):
-                stem_x = x + (i - 1) * 2
-                pygame.draw.line(self.screen, self.GREEN, (stem_x, y + 2), (stem_x, y - 2), 1)
-
-        # Draw rabbits with gender and state indicators
-        for rabbit in world.rabbits:
-            x, y = int(rabbit.x), int(rabbit.y)
-
-            # Choose colors based on gender
-            body_color = self.BROWN if rabbit.gender == 'male' else self.LIGHT_BROWN
-            accent_color = self.BLUE if rabbit.gender == 'male' else self.PINK
-
-            # Draw rabbit body (oval shape)
-            pygame.draw.ellipse(self.screen, body_color, (x-7, y-5, 14, 10))
-            pygame.draw.circle(self.screen, body_color, (x, y), 6)
-
-            # Draw ears
-            ear1_x = x - 3 + math.cos(rabbit.direction + 0.5) * 4
-            ear1_y = y - 3 + math.sin(rabbit.direction + 0.5) * 4
-            ear2_x = x + 3 + math.cos(rabbit.direction - 0.5) * 4
-            ear2_y = y + 3 + math.sin(rabbit.direction - 0.5) * 4
-            pygame.draw.circle(self.screen, body_color, (int(ear1_x), int(ear1_y)), 3)
-            pygame.draw.circle(self.screen, body_color, (int(ear2_x), int(ear2_y)), 3)
-
-            # Gender indicator (small dot)
-            pygame.draw.circle(self.screen, accent_color, (x-8, y-8), 2)
-
-            # Special states
-            if rabbit.is_pregnant:
-                pygame.draw.circle(self.screen, self.PINK, (x, y), 9, 2)
-            elif rabbit.mate_seeking:
-                pygame.draw.circle(self.screen, self.PURPLE, (x, y), 10, 1)
-
-            # Draw direction indicator
-            end_x = x + math.cos(rabbit.direction) * 12
-            end_y = y + math.sin(rabbit.direction) * 12
-            pygame.draw.line(self.screen, self.DARK_GRAY, (x, y), (int(end_x), int(end_y)), 2)
-
-            # Draw energy bar
-            energy_ratio = rabbit.energy / 200  # Updated max energy
-            bar_width = 14
-            bar_height = 3
-            bar_x = x - bar_width // 2
-            bar_y = y - 15
-
-            pygame.draw.rect(self.screen, self.BLACK, (bar_x-1, bar_y-1, bar_width+2, bar_height+2))
-            pygame.draw.rect(self.screen, self.GRAY, (bar_x, bar_y, bar_width, bar_height))
-            energy_color = self.GREEN if energy_ratio > 0.5 else (self.ORANGE if energy_ratio > 0.25 else self.RED)
-            pygame.draw.rect(self.screen, energy_color, (bar_x, bar_y, int(bar_width * energy_ratio), bar_height))
-
-        # Draw foxes with gender and state indicators
-        for fox in world.foxes:
-            x, y = int(fox.x), int(fox.y)
-
-            # Choose colors based on gender
-            body_color = self.RED if fox.gender == 'male' else self.DARK_RED
-            accent_color = self.BLUE if fox.gender == 'male' else self.PINK
-
-            # Draw fox body (more fox-like shape)
-            pygame.draw.ellipse(self.screen, body_color, (x-9, y-6, 18, 12))
-            pygame.draw.circle(self.screen, body_color, (x, y), 8)
-
-            # Draw pointed ears
-            ear_tip_x = x + math.cos(rabbit.direction) * 6
-            ear_tip_y = y + math.sin(rabbit.direction) * 6
-            pygame.draw.polygon(self.screen, body_color, [
-                (x-4, y-8), (x-1, y-12), (x+1, y-8)
-            ])
-            pygame.draw.polygon(self.screen, body_color, [
-                (x+1, y-8), (x+4, y-12), (x+7, y-8)
-            ])
-
-            # Draw tail
-            tail_x = x - math.cos(fox.direction) * 10
-            tail_y = y - math.sin(fox.direction) * 10
-            pygame.draw.circle(self.screen, body_color, (int(tail_x), int(tail_y)), 4)
-
-            # Gender indicator
-            pygame.draw.circle(self.screen, accent_color, (x-10, y-10), 2)
-
-            # Special states
-            if fox.is_pregnant:
-                pygame.draw.circle(self.screen, self.PINK, (x, y), 12, 2)
-            elif fox.mate_seeking:
-                pygame.draw.circle(self.screen, self.PURPLE, (x, y), 13, 1)
-
-            # Draw direction indicator
-            end_x = x + math.cos(fox.direction) * 15
-            end_y = y + math.sin(fox.direction) * 15
-            pygame.draw.line(self.screen, self.BLACK, (x, y), (int(end_x), int(end_y)), 3)
-
-            # Draw energy bar
-            energy_ratio = fox.energy / 200  # Updated max energy
-            bar_width = 18
-            bar_height = 4
-            bar_x = x - bar_width // 2
-            bar_y = y - 18
-
-            pygame.draw.rect(self.screen, self.BLACK, (bar_x-1, bar_y-1, bar_width+2, bar_height+2))
-            pygame.draw.rect(self.screen, self.GRAY, (bar_x, bar_y, bar_width, bar_height))
-            energy_color = self.GREEN if energy_ratio > 0.5 else (self.ORANGE if energy_ratio > 0.25 else self.RED)
-            pygame.draw.rect(self.screen, energy_color, (bar_x, bar_y, int(bar_width * energy_ratio), bar_height))
+        food, dx, dy = self.sprite('food', self.paint_food)
+        xs, ys, _ = view.project(snapshot.food['x'], snapshot.food['y'], SPRITE_CENTER)
+        for x, y in zip(xs.tolist(), ys.tolist()):
+            blits.append((food, (x + dx, y + dy)))
+
+        # Draw rabbits and foxes with gender and state indicators, energy bar above
+        for arrays, species, paint, bar_width, bar_height, bar_offset in (
+                (snapshot.rabbits, 'rabbit', self.paint_rabbit, 14, 3, 15),
+                (snapshot.foxes, 'fox', self.paint_fox, 18, 4, 18)):
+            for (x, y, heading, energy, male, is_pregnant, mate_seeking) in animal_rows(arrays, view):
+                look = (heading * HEADING_STEP, male, is_pregnant, mate_seeking)
+                sprite, dx, dy = self.sprite((species, heading, male, is_pregnant, mate_seeking), paint, *look)
+                blits.append((sprite, (x + dx, y + dy)))
+                bar = self.energy_bar(energy, bar_width, bar_height)
+                blits.append((bar, (x - bar_width // 2 - 1, y - bar_offset - 1)))
 
         # Draw wolves with pack indicators
-        for wolf in world.wolves:
-            x, y = int(wolf.x), int(wolf.y)
-
-            # Choose colors based on gender
-            body_color = self.SILVER if wolf.gender == 'male' else self.DARK_SILVER
-            accent_color = self.BLUE if wolf.gender == 'male' else self.PINK
-
-            # Draw wolf body (larger and more wolf-like)
-            pygame.draw.ellipse(self.screen, body_color, (x-10, y-7, 20, 14))
-            pygame.draw.circle(self.screen, body_color, (x, y), 9)
-
-            # Draw pointed ears
-            pygame.draw.polygon(self.screen, body_color, [
-                (x-5, y-9), (x-2, y-14), (x+1, y-9)
-            ])
-            pygame.draw.polygon(self.screen, body_color, [
-                (x-1, y-9), (x+2, y-14), (x+5, y-9)
-            ])
-
-            # Draw tail
-            tail_x = x - math.cos(wolf.direction) * 12
-            tail_y = y - math.sin(wolf.direction) * 12
-            pygame.draw.ellipse(self.screen, body_color, (int(tail_x-3), int(tail_y-2), 6, 4))
-
-            # Pack indicators
-            if wolf.pack:
-                # Pack member indicator (colored ring)
-                pack_color_index = wolf.pack.pack_id % 7
-                pack_colors = [self.RED, self.BLUE, self.GREEN, self.PURPLE, self.ORANGE, self.GOLD, self.PINK]
-                pack_color = pack_colors[pack_color_index]
-                pygame.draw.circle(self.screen, pack_color, (x, y), 14, 2)
-
-                # Alpha indicators
-                if wolf == wolf.pack.alpha_male or wolf == wolf.pack.alpha_female:
-                    pygame.draw.circle(self.screen, self.GOLD, (x, y), 16, 3)
-                    # Crown symbol for alpha
-                    crown_points = [(x-4, y-12), (x-2, y-16), (x, y-14), (x+2, y-16), (x+4, y-12)]
-                    pygame.draw.lines(self.screen, self.GOLD, False, crown_points, 2)
-            else:
-                # Lone wolf indicator
-                pygame.draw.circle(self.screen, self.GRAY, (x, y), 13, 1)
-
-            # Gender indicator
-            pygame.draw.circle(self.screen, accent_color, (x-12, y-12), 3)
-
-            # Special states
-            if wolf.is_pregnant:
-                pygame.draw.circle(self.screen, self.PINK, (x, y), 18, 2)
-            elif wolf.mate_seeking:
-                pygame.draw.circle(self.screen, self.PURPLE, (x, y), 17, 1)
-
-            # Draw direction indicator (longer for wolves)
-            end_x = x + math.cos(wolf.direction) * 18
-            end_y = y + math.sin(wolf.direction) * 18
-            pygame.draw.line(self.screen, self.BLACK, (x, y), (int(end_x), int(end_y)), 3)
-
-            # Howling indicator
-            if wolf.howl_cooldown > 80:  # Recently howled
-                pygame.draw.circle(self.screen, self.ORANGE, (x, y-25), 4)
-                pygame.draw.arc(self.screen, self.ORANGE, (x-8, y-33, 16, 16), 0, math.pi, 2)
-
-            # Draw energy bar
-            energy_ratio = wolf.energy / 200  # Updated max energy
-            bar_width = 20
-            bar_height = 4
-            bar_x = x - bar_width // 2
-            bar_y = y - 22
-
-            pygame.draw.rect(self.screen, self.BLACK, (bar_x-1, bar_y-1, bar_width+2, bar_height+2))
-            pygame.draw.rect(self.screen, self.GRAY, (bar_x, bar_y, bar_width, bar_height))
-            energy_color = self.GREEN if energy_ratio > 0.5 else (self.ORANGE if energy_ratio > 0.25 else self.RED)
-            pygame.draw.rect(self.screen, energy_color, (bar_x, bar_y, int(bar_width * energy_ratio), bar_height))
-
-        # Draw pack territories (faint background circles)
-        for pack in world.packs:
-            if pack.get_pack_size() > 1:
-                pack_color_index = pack.pack_id % 7
-                pack_colors = [self.RED, self.BLUE, self.GREEN, self.PURPLE, self.ORANGE, self.GOLD, self.PINK]
-                pack_color = pack_colors[pack_color_index]
-                center_x, center_y = int(pack.pack_center_x), int(pack.pack_center_y)
-                # Create a surface for transparency
-                territory_surface = pygame.Surface((160, 160), pygame.SRCALPHA)
-                pygame.draw.circle(territory_surface, (*pack_color, 30), (80, 80), 80)
-                self.screen.blit(territory_surface, (center_x - 80, center_y - 80))
-
-    def draw_stats(self, world, evolution_manager):
+        for (x, y, heading, energy, male, is_pregnant, mate_seeking, pack_id, is_alpha,
+             howl_cooldown) in animal_rows(snapshot.wolves, view, ('pack_id', 'is_alpha', 'howl_cooldown')):
+            pack_color = self.pack_colors[pack_id % 7] if pack_id >= 0 else None
+            look = (heading * HEADING_STEP, male, is_pregnant, mate_seeking, pack_color,
+                    pack_color is not None and is_alpha, howl_cooldown > 80)
+            sprite, dx, dy = self.sprite(('wolf', heading) + look[1:], self.paint_wolf, *look)
+            blits.append((sprite, (x + dx, y + dy)))
+            blits.append((self.energy_bar(energy, 20, 4), (x - 20 // 2 - 1, y - 22 - 1)))
+
+        self.screen.blits(blits, doreturn=False)
+        self.draw_territories(snapshot, view)
+
+    def draw_stats(self, snapshot):
         # Stats panel background
         stats_x = self.width + 10
         pygame.draw.rect(self.screen, self.LIGHT_GREEN, (self.width, 0, 200, self.height))
         pygame.draw.line(self.screen, self.BLACK, (self.width, 0), (self.width, self.height), 2)
 
-        stats = world.get_stats()
+        stats = snapshot.stats
         y_offset = 20
 
         # Title
-        title = self.font.render("SIMULATION STATS", True, self.BLACK)
-        self.screen.blit(title, (stats_x, y_offset))
+        self.screen.blit(self.title, (stats_x, y_offset))
         y_offset += 40
 
         # Enhanced stats with breeding info
         stat_texts = [
             f"Generation: {stats['generation']}",
             f"Tick: {stats['tick']:,}",
+            f"View: {'density' if self.density else 'animals'}, zoom {self.zoom:.1f}x",
             "",
             f"Rabbits: {stats['rabbits']}",
             f"  Males: {stats['rabbit_males']}",
@@ -291,6 +494,15 @@ class Visualizer:
             "",
             f"Food: {stats['food']}",
             "",
+        ]
+
+        if snapshot.top_phases is not None:
+            stat_texts.append("Slowest phases (ms/tick):")
+            for name, mean_ms in snapshot.top_phases:
+                stat_texts.append(f"  {name}: {mean_ms:.2f}")
+            stat_texts.append("")
+
+        stat_texts += [
             f"Avg Energy:",
             f"  Rabbits: {stats['rabbit_avg_energy']:.1f}",
             f"  Foxes: {stats['fox_avg_energy']:.1f}",
@@ -301,45 +513,37 @@ class Visualizer:
             f"  Foxes: {stats['fox_avg_age']:.0f}",
             f"  Wolves: {stats['wolf_avg_age']:.0f}",
             "",
-            "Legend:",
-            "Brown/Light = Rabbits M/F",
-            "Red/Dark Red = Foxes M/F",
-            "Silver/Dark = Wolves M/F",
-            "Colored rings = Pack member",
-            "Gold crown = Alpha wolf",
-            "Gray ring = Lone wolf",
-            "Purple ring = Seeking mate",
-            "Pink ring = Pregnant",
-            "Orange dot = Recently howled",
-            "",
-            "Controls:",
-            "SPACE - Pause/Resume",
-            "ESC - Exit",
         ]
 
-        for text in stat_texts:
+        # Each line is only rendered again when its text changed
+        for line, text in enumerate(stat_texts):
             if text:
-                rendered_text = self.small_font.render(text, True, self.BLACK)
-                self.screen.blit(rendered_text, (stats_x, y_offset))
+                cached = self.stat_lines.get(line)
+                if cached is None or cached[0] != text:
+                    cached = (text, self.small_font.render(text, True, self.BLACK))
+                    self.stat_lines[line] = cached
+                self.screen.blit(cached[1], (stats_x, y_offset))
             y_offset += 20
 
+        # The legend never changes, it was rendered once
+        self.screen.blit(self.legend, (stats_x, y_offset))
+
         # Pause indicator
         if self.paused:
-            pause_text = self.font.render("PAUSED", True, self.RED)
-            self.screen.blit(pause_text, (stats_x, self.height - 40))
+            self.screen.blit(self.pause_text, (stats_x, self.height - 40))
 
         # Generation timer progress
-        progress = (world.generation_timer / 5000) * 180  # 180 pixels wide
+        progress = min(snapshot.generation_timer / snapshot.generation_ticks, 1) * 180  # 180 pixels wide
         pygame.draw.rect(self.screen, self.GRAY, (stats_x, self.height - 80, 180, 10))
         pygame.draw.rect(self.screen, self.BLUE, (stats_x, self.height - 80, int(progress), 10))
-        gen_text = self.small_font.render("Next Evolution", True, self.BLACK)
-        self.screen.blit(gen_text, (stats_x, self.height - 100))
+        self.screen.blit(self.next_evolution, (stats_x, self.height - 100))
 
-    def update_display(self, world, evolution_manager, frame_rate=30):
+    def update_display(self, snapshot, frame_rate=30):
+        # snapshot is a snapshot.Snapshot of the world, see SimulationThread
         if not self.paused:
-            self.draw_world(world)
+            self.draw_world(snapshot)
 
-        self.draw_stats(world, evolution_manager)
+        self.draw_stats(snapshot)
         pygame.display.flip()
         self.clock.tick(frame_rate)
 